@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark the streaming CSV import.
+
+Generates a session history CSV, streams it through csv_batches in fixed
+size chunks and validates every batch, as POST /api/import/csv does before
+writing. Reports rows per second and the peak traced memory, which should
+stay near one batch however long the file is. A second file has a stray
+quote in every name (Archer 6'2" tall), which must not be taken for an
+open quoted field.
+
+Usage (from backend/):
+    python benchmarks/bench_import.py [--rows 50000] [--chunk 65536]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import csvimport  # noqa: E402
+
+
+def generated_csv(rng: random.Random, rows: int, name: str = 'Archer {}') -> bytes:
+    lines = ["Date,Name,BowType,TotalScore,Distance,TargetType"]
+    for i in range(rows):
+        date = f"{rng.randint(1, 12)}/{rng.randint(1, 28)}/{rng.randint(2015, 2026)}"
+        bow = rng.choice(['Recurve', 'Compound', 'Barebow', 'Longbow', ''])
+        lines.append(f"{date},{name.format(i % 500)},{bow},{rng.randint(150, 330)},{rng.choice(['18m', '70m'])},wa_standard")
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def run(data: bytes, chunk: int):
+    columns = None
+    valid = invalid = 0
+    async for lines, rows in csvimport.csv_batches(chunked(data, chunk)):
+        if columns is None:
+            columns = csvimport.find_columns(rows[0])
+            lines, rows = lines[1:], rows[1:]
+        batch, errors = csvimport.validate_batch(lines, rows, columns)
+        valid += len(batch)
+        invalid += len(rows) - len(batch)
+    return valid, invalid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--chunk', type=int, default=65536, help='upload chunk size in bytes')
+    args = parser.parse_args()
+
+    cases = [('plain', 'Archer {}'), ('stray quotes', 'Archer {} 6\'2" tall')]
+    for label, name in cases:
+        data = generated_csv(random.Random(41), args.rows, name)
+        start = time.perf_counter()
+        valid, invalid = asyncio.run(run(data, args.chunk))
+        seconds = time.perf_counter() - start
+        # Traced separately, as tracing allocations slows the run several times over
+        tracemalloc.start()
+        asyncio.run(run(data, args.chunk))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(label)
+        print(f"  rows        {args.rows} ({len(data) / 1e6:.1f} MB, {valid} valid, {invalid} invalid)")
+        print(f"  time        {seconds:.2f} s ({args.rows / seconds:,.0f} rows/s)")
+        print(f"  peak memory {peak / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark QR decode strategies on a generated corpus of scorecard PDFs.
+
+The corpus is generated with the `qrcode` package: one-page scorecards
+carrying an Arrow Tracker QR code, printed at different sizes, embedded
+at different scan DPI, rotated, with reduced contrast and added noise.
+Each strategy of qrdecode is run alone on every rendered page, then the
+whole cost-ordered chain, then the full page decoder (embedded images
+first, page render as fallback), reporting the share of pages decoded
+and the median ms per page.
+
+Usage (from backend/):
+    python benchmarks/bench_qr.py [--pages 150] [--corpus /tmp/qr_corpus]
+"""
+import argparse
+import itertools
+import json
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+import qrcode
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import qrdecode  # noqa: E402
+
+PRINT_SIZES_PT = (144, 90, 54)  # 2 in, 1.25 in and 0.75 in wide codes
+SCAN_DPI = (300, 150, 96)
+ROTATIONS = (0, 7, 30, 90, 135)
+CONTRASTS = (1.0, 0.5, 0.25)
+NOISE_SIGMAS = (0, 12, 30)
+
+
+def scorecard_payload(rng: random.Random, index: int) -> str:
+    """A QR payload in the format the app exports"""
+    return json.dumps({
+        'v': 1,
+        't': qrdecode.ARROW_TRACKER_TYPE,
+        'n': f"Corpus Archer {index}",
+        's': rng.randint(150, 600),
+        'b': rng.choice(['Recurve', 'Compound', 'Barebow', 'Longbow']),
+        'd': rng.choice(['18m', '25m', '50m', '70m']),
+        'dt': f"{rng.randint(1, 12)}/{rng.randint(1, 28)}/2026",
+    }, separators=(',', ':'))
+
+
+def qr_scan(payload: str, size_pt: int, dpi: int, rotation: int, contrast: float, noise: float, rng: np.random.Generator) -> np.ndarray:
+    """The QR code as it would look scanned: resampled to `dpi`, rotated, faded and noisy"""
+    code = qrcode.QRCode(border=4)
+    code.add_data(payload)
+    code.make(fit=True)
+    modules = np.where(np.array(code.get_matrix()), 0, 255).astype(np.uint8)
+    side = max(int(size_pt / 72 * dpi), modules.shape[0])
+    image = cv2.resize(modules, (side, side), interpolation=cv2.INTER_AREA).astype(np.float32)
+    if rotation:
+        centre = (side / 2, side / 2)
+        matrix = cv2.getRotationMatrix2D(centre, rotation, 1.0)
+        cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+        bound = int(side * (cos + sin)) + 1
+        matrix[0, 2] += bound / 2 - centre[0]
+        matrix[1, 2] += bound / 2 - centre[1]
+        image = cv2.warpAffine(image, matrix, (bound, bound), flags=cv2.INTER_LINEAR, borderValue=255)
+    image = 255 - (255 - image) * contrast
+    if noise:
+        image = image + rng.normal(0, noise, image.shape)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def generate_corpus(directory: Path, pages: int, seed: int):
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    grid = list(itertools.product(PRINT_SIZES_PT, SCAN_DPI, ROTATIONS, CONTRASTS, NOISE_SIGMAS))
+    rng.shuffle(grid)
+    manifest = []
+    for index in range(pages):
+        size_pt, dpi, rotation, contrast, noise = grid[index % len(grid)]
+        payload = scorecard_payload(rng, index)
+        image = qr_scan(payload, size_pt, dpi, rotation, contrast, noise, np_rng)
+
+        doc = fitz.open()
+        page = doc.new_page(width=595, height=842)  # A4
+        page.insert_text((56, 72), f"Arrow Tracker scorecard #{index}", fontsize=16)
+        page.insert_text((56, 96), "Scan the code to import this session.", fontsize=10)
+        width = size_pt * image.shape[1] / max(int(size_pt / 72 * dpi), 1)
+        rect = fitz.Rect(56, 120, 56 + width, 120 + width)
+        page.insert_image(rect, stream=cv2.imencode('.png', image)[1].tobytes())
+        name = f"scorecard_{index:04d}.pdf"
+        doc.save(directory / name)
+        doc.close()
+        manifest.append({'file': name, 'payload': payload, 'size_pt': size_pt, 'dpi': dpi,
+                         'rotation': rotation, 'contrast': contrast, 'noise': noise})
+    (directory / 'manifest.json').write_text(json.dumps(manifest, indent=1))
+    return manifest
+
+
+def report(name: str, decoded: int, total: int, timings):
+    print(f"{name:<20}{decoded:>10}{decoded / total:>8.0%}{statistics.median(timings):>10.2f}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=150, help='scorecards to generate')
+    parser.add_argument('--corpus', type=Path, default=Path('/tmp/arrow_tracker_qr_corpus'))
+    parser.add_argument('--zoom', type=float, default=qrdecode.DEFAULT_ZOOM)
+    parser.add_argument('--seed', type=int, default=39)
+    args = parser.parse_args()
+
+    manifest_path = args.corpus / 'manifest.json'
+    if manifest_path.exists() and len(json.loads(manifest_path.read_text())) == args.pages:
+        manifest = json.loads(manifest_path.read_text())
+    else:
+        manifest = generate_corpus(args.corpus, args.pages, args.seed)
+
+    images, render_ms = [], []
+    for entry in manifest:
+        start = time.perf_counter()
+        with fitz.open(args.corpus / entry['file']) as doc:
+            images.append(qrdecode.render_page(doc[0], args.zoom))
+        render_ms.append((time.perf_counter() - start) * 1000)
+    print(f"{len(manifest)} pages, zbar {'available' if qrdecode.pyzbar else 'missing'}, "
+          f"render {statistics.median(render_ms):.1f} ms/page at zoom {args.zoom}\n")
+
+    print(f"{'strategy':<20}{'decoded':>10}{'rate':>8}{'ms/page':>10}")
+    candidates = [(s.name, (s,)) for s in qrdecode.STRATEGIES if s.available]
+    candidates.append(('chain', qrdecode.STRATEGIES))
+    for name, strategies in candidates:
+        decoded, timings = 0, []
+        for entry, image in zip(manifest, images):
+            start = time.perf_counter()
+            result = qrdecode.decode_image(image, strategies)
+            timings.append((time.perf_counter() - start) * 1000)
+            decoded += entry['payload'] in result.payloads
+        report(name, decoded, len(manifest), timings)
+
+    # The full page decoder, timed from the open document so rendering is included when it falls back
+    decoded, timings, winners, missed = 0, [], Counter(), Counter()
+    for entry in manifest:
+        with fitz.open(args.corpus / entry['file']) as doc:
+            start = time.perf_counter()
+            result = qrdecode.decode_page(doc[0], zoom=args.zoom)
+            timings.append((time.perf_counter() - start) * 1000)
+        if entry['payload'] in result.payloads:
+            decoded += 1
+            winners[f"{result.source}:{result.strategy}"] += 1
+        else:
+            missed[(entry['size_pt'], entry['dpi'], entry['contrast'], entry['noise'])] += 1
+    report('decode_page', decoded, len(manifest), timings)
+
+    print(f"\ndecode_page wins by source:strategy: {dict(winners.most_common())}")
+    if missed:
+        print("decode_page misses by (size_pt, dpi, contrast, noise):", dict(missed.most_common(8)))
+
+
+if __name__ == '__main__':
+    main()
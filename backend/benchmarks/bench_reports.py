@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark scorecard report rendering.
+
+Renders a batch of generated sessions three ways: one after another in
+this process, through ReportRenderer's process pool, and again through
+the renderer once every report is cached. Reports ms per report for each.
+
+Usage (from backend/):
+    python benchmarks/bench_reports.py [--sessions 40] [--rounds 30] [--workers 4]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import report  # noqa: E402
+
+
+def generated_session(rng: random.Random, index: int, rounds: int) -> dict:
+    session_rounds = []
+    for round_number in range(1, rounds + 1):
+        rings = [rng.choice([11, 10, 10, 9, 9, 9, 8, 8, 7, 6, 0]) for _ in range(6)]
+        session_rounds.append({
+            'round_number': round_number,
+            'shots': [{'ring': ring} for ring in rings],
+            'total_score': sum(10 if ring == 11 else ring for ring in rings),
+        })
+    return {
+        'id': f"bench-{index}",
+        'name': f"Bench Session {index}",
+        'distance': '70m',
+        'target_type': 'wa_standard',
+        'rounds': session_rounds,
+        'total_score': sum(r['total_score'] for r in session_rounds),
+        'created_at': '2026-03-01T09:00:00',
+        'updated_at': f"2026-03-01T09:{index % 60:02d}:00",
+    }
+
+
+def report_line(label: str, seconds: float, count: int):
+    print(f"{label:<12}{seconds * 1000 / count:>12.1f}{seconds:>10.2f}", flush=True)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=40)
+    parser.add_argument('--rounds', type=int, default=30, help='rounds of six arrows per session')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    rng = random.Random(40)
+    batch = [(generated_session(rng, index, args.rounds), 'Recurve') for index in range(args.sessions)]
+    report.render_report(*batch[0])  # import and font setup out of the timings
+
+    print(f"{'mode':<12}{'ms/report':>12}{'total s':>10}")
+    start = time.perf_counter()
+    for session, bow_type in batch:
+        report.render_report(session, bow_type)
+    report_line('serial', time.perf_counter() - start, len(batch))
+
+    renderer = report.ReportRenderer(max_entries=len(batch), workers=args.workers)
+    try:
+        # Start the workers before timing, as a running server would have them
+        await renderer.render_many([(dict(session, id=f"warmup-{i}"), bow_type) for i, (session, bow_type) in enumerate(batch[:renderer.workers])])
+        start = time.perf_counter()
+        await renderer.render_many(batch)
+        report_line(f"pool x{renderer.workers}", time.perf_counter() - start, len(batch))
+
+        start = time.perf_counter()
+        await renderer.render_many(batch)
+        report_line('cached', time.perf_counter() - start, len(batch))
+    finally:
+        renderer.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized scoring engine against per-shot scoring.
+
+Usage (from backend/):
+    python benchmarks/bench_scoring.py [--shots 5000000] [--loop-shots 200000]
+"""
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import scoring  # noqa: E402
+
+
+def score_one(x: float, y: float, target_type: str) -> int:
+    """Per-shot reference, written like calculateScore in the app"""
+    face = scoring.get_target_face(target_type)
+    dist = math.hypot(x - scoring.TARGET_CENTER, y - scoring.TARGET_CENTER) / scoring.TARGET_RADIUS
+    for radius, ring in zip(face.radii, face.rings):
+        if dist <= radius:
+            return ring
+    return scoring.MISS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--shots', type=int, default=5_000_000, help='shots scored by the vectorized engine')
+    parser.add_argument('--loop-shots', type=int, default=200_000, help='shots scored one at a time for comparison')
+    parser.add_argument('--seed', type=int, default=26)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    x = np.clip(rng.normal(0.5, 0.15, args.shots), 0, 1)
+    y = np.clip(rng.normal(0.5, 0.15, args.shots), 0, 1)
+    target_types = rng.choice(list(scoring.TARGET_FACES), args.shots)
+
+    print(f"{'strategy':<28}{'shots':>12}{'seconds':>10}{'Mshots/s':>10}")
+    for target_type in scoring.TARGET_FACES:
+        start = time.perf_counter()
+        scoring.score_shots(x, y, target_type)
+        elapsed = time.perf_counter() - start
+        print(f"{'vectorized ' + target_type:<28}{args.shots:>12,}{elapsed:>10.3f}{args.shots / elapsed / 1e6:>10.1f}")
+
+    start = time.perf_counter()
+    rings = scoring.score_batch(x, y, target_types)
+    elapsed = time.perf_counter() - start
+    print(f"{'vectorized mixed faces':<28}{args.shots:>12,}{elapsed:>10.3f}{args.shots / elapsed / 1e6:>10.1f}")
+
+    n = min(args.loop_shots, args.shots)
+    start = time.perf_counter()
+    expected = [score_one(x[i], y[i], target_types[i]) for i in range(n)]
+    elapsed = time.perf_counter() - start
+    print(f"{'per-shot python loop':<28}{n:>12,}{elapsed:>10.3f}{n / elapsed / 1e6:>10.1f}")
+
+    mismatches = int(np.count_nonzero(rings[:n] != np.asarray(expected)))
+    print(f"mismatches against per-shot reference: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark owner-scoped session listing as the number of tenants grows.
+
+Seeds tenants with sessions in steps and, after each step, times the
+query behind GET /api/sessions for one tenant (owner_id equality,
+newest first, limit 100) next to a scan-and-filter over the whole
+collection, which is what listing one archer's history costs without
+owner partitioning. Owner-scoped latency should stay flat while the
+scan grows with the user base.
+
+The emulator does not use composite indexes: it evaluates every query
+against the documents it holds, so its owner query latencies grow with
+the collection and cannot show the flat, index-backed cost. Treat an
+emulator run as a smoke test. For real numbers, run against a test project
+with firestore.indexes.json deployed, never production:
+    firebase deploy --only firestore:indexes --project <test-project>
+    python benchmarks/bench_tenants.py --project <test-project> [--tenants 10,100,1000]
+
+Sessions are seeded into bench_runs/<run>/sessions, so the `sessions`
+collection indexes apply to them, and they are deleted afterwards.
+
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/bench_tenants.py
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from google.cloud import firestore
+
+MAX_BATCH_WRITES = 500
+BENCH_COLLECTION = 'bench_runs'
+
+
+def seed(db, sessions, owners, sessions_per_owner: int):
+    batch, pending = db.batch(), 0
+    start = datetime(2026, 1, 1)
+    for owner_id in owners:
+        for i in range(sessions_per_owner):
+            session_id = str(uuid.uuid4())
+            created_at = (start + timedelta(hours=i)).isoformat()
+            batch.set(sessions.document(session_id), {
+                'id': session_id,
+                'owner_id': owner_id,
+                'name': f"Session {i}",
+                'rounds': [],
+                'total_score': 0,
+                'created_at': created_at,
+                'updated_at': created_at,
+            })
+            pending += 1
+            if pending == MAX_BATCH_WRITES:
+                batch.commit()
+                batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+
+
+def delete_all(db, sessions):
+    while True:
+        docs = list(sessions.limit(MAX_BATCH_WRITES).stream())
+        if not docs:
+            return
+        batch = db.batch()
+        for doc in docs:
+            batch.delete(doc.reference)
+        batch.commit()
+
+
+def timed(func, repeat: int) -> float:
+    """Median milliseconds of `repeat` calls"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tenants', default='10,100,1000', help='comma-separated tenant counts to measure at')
+    parser.add_argument('--sessions-per-tenant', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--project', help='test project with firestore.indexes.json deployed (omit with the emulator)')
+    args = parser.parse_args()
+
+    emulator = bool(os.environ.get('FIRESTORE_EMULATOR_HOST'))
+    if not emulator and not args.project:
+        sys.exit("Pass --project <test-project>, or set FIRESTORE_EMULATOR_HOST to run against the emulator")
+
+    db = firestore.Client(project=args.project or 'arrow-tracker-bench')
+    run = db.collection(BENCH_COLLECTION).document(uuid.uuid4().hex[:8])
+    sessions = run.collection('sessions')
+    probe_owner = 'tenant-0'
+    if emulator:
+        print("Firestore emulator: composite indexes are not used, so owner query times are not index-backed")
+
+    def owner_query():
+        query = sessions.where('owner_id', '==', probe_owner).order_by('created_at', direction=firestore.Query.DESCENDING)
+        return list(query.limit(100).stream())
+
+    def scan_and_filter():
+        return [doc for doc in sessions.stream() if doc.get('owner_id') == probe_owner]
+
+    print(f"{'tenants':>8}{'sessions':>10}{'owner query ms':>16}{'scan+filter ms':>16}")
+    seeded = 0
+    try:
+        for tenants in sorted(int(n) for n in args.tenants.split(',')):
+            seed(db, sessions, [f"tenant-{i}" for i in range(seeded, tenants)], args.sessions_per_tenant)
+            seeded = tenants
+            owner_ms = timed(owner_query, args.repeat)
+            scan_ms = timed(scan_and_filter, max(1, args.repeat // 5))
+            print(f"{tenants:>8,}{tenants * args.sessions_per_tenant:>10,}{owner_ms:>16.2f}{scan_ms:>16.2f}")
+    finally:
+        delete_all(db, sessions)
+
+
+if __name__ == '__main__':
+    main()
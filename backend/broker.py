@@ -0,0 +1,65 @@
+"""
+In-process fan-out of live scoring events to session subscribers.
+
+Spectators and team captains subscribe to a session's event stream
+instead of polling GET /sessions/{id}. add_round and update_round publish
+just the end that changed, and every subscriber has a bounded queue.
+Publishing never waits: when a slow client's queue is full, its pending
+events are replaced by a single `resync` event telling it to fetch the
+session again, so scoring writes are never held up by readers.
+
+Subscribers are per process and publishing must happen on the event loop
+thread (the async routes), which is where asyncio queues can be used.
+"""
+import asyncio
+from typing import Dict, Optional, Set
+
+DEFAULT_QUEUE_SIZE = 64
+
+
+class Subscription:
+    def __init__(self, session_id: str, queue_size: int):
+        self.session_id = session_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def offer(self, event: Dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'type': 'resync', 'session_id': self.session_id})
+
+    async def next_event(self, timeout: float) -> Optional[Dict]:
+        """The next event, or None if nothing arrived within `timeout` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class SessionBroker:
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscriptions: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, session_id: str) -> Subscription:
+        subscription = Subscription(session_id, self.queue_size)
+        self.subscriptions.setdefault(session_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self.subscriptions.get(subscription.session_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscriptions[subscription.session_id]
+
+    def publish(self, session_id: str, event: Dict):
+        """Queue an event for every subscriber of a session without blocking"""
+        subscribers = self.subscriptions.get(session_id)
+        if not subscribers:
+            return
+        event = dict(event, session_id=session_id)
+        for subscription in list(subscribers):
+            subscription.offer(event)
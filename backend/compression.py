@@ -0,0 +1,179 @@
+"""
+Response compression for the Arrow Tracker API.
+
+Large history and backup downloads (GET /api/sessions, exports) are fetched
+over mobile data at the range, so responses above a size threshold are
+compressed with brotli when the client accepts it and the optional `brotli`
+package is installed, and with gzip otherwise.
+"""
+from typing import Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+UNCOMPRESSED_MEDIA_TYPES = ("text/event-stream", "application/pdf", "application/zip")
+
+
+def header_quality(header: str, value: str) -> Tuple[float, int]:
+    """The q an Accept-style header (Accept, Accept-Encoding) gives `value`, with how specific the entry was
+
+    Specificity is 2 for the value itself, 1 for `type/*` and 0 for `*/*` or
+    `*`; the most specific entry applies. Values the header does not cover get (0, -1).
+    """
+    best = (0.0, -1)
+    major = value.split("/")[0]
+    for part in header.split(","):
+        name, *params = part.split(";")
+        name = name.strip().lower()
+        if name == value:
+            specificity = 2
+        elif name == f"{major}/*":
+            specificity = 1
+        elif name in ("*", "*/*"):
+            specificity = 0
+        else:
+            continue
+        if specificity <= best[1]:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, raw = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(raw.strip())
+                except ValueError:
+                    q = 0.0
+        best = (q, specificity)
+    return best
+
+
+def preferred_option(header: str, options: Sequence[str]) -> Optional[str]:
+    """The option the header gives the highest q, or None if it accepts none of them
+
+    Equal q goes to the option the header names more specifically, then to
+    the earlier option, so `options` lists the server's own preference.
+    """
+    ranked = [(header_quality(header, option), -index, option) for index, option in enumerate(options)]
+    (q, _), _, option = max(ranked, default=((0.0, -1), 0, None))
+    return option if q > 0 else None
+
+
+class CompressionMiddleware:
+    """Compress HTTP responses larger than `minimum_size` bytes with the accepted encoding of highest q
+
+    Brotli is preferred over gzip when the client gives both the same q.
+
+    Event streams are sent uncompressed: the gzip responder buffers small
+    chunks, which would hold live events back. PDF reports and zip archives
+    are already compressed.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        app = self.bypass_uncompressed(send)
+        accept_encoding = Headers(scope=scope).get("Accept-Encoding", "")
+        encoding = preferred_option(accept_encoding, ("br", "gzip") if brotli is not None else ("gzip",))
+        if encoding == "br":
+            responder = BrotliResponder(app, self.minimum_size, self.brotli_quality)
+        elif encoding == "gzip":
+            responder = GZipResponder(app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            await self.app(scope, receive, send)
+            return
+        await responder(scope, receive, send)
+
+    def bypass_uncompressed(self, send: Send) -> ASGIApp:
+        """Wrap the app so UNCOMPRESSED_MEDIA_TYPES responses skip the compressing responder"""
+        async def app(scope: Scope, receive: Receive, compressing_send: Send) -> None:
+            target = compressing_send
+
+            async def route(message: Message) -> None:
+                nonlocal target
+                if message["type"] == "http.response.start":
+                    media_type = Headers(raw=message["headers"]).get("content-type", "")
+                    if media_type.startswith(UNCOMPRESSED_MEDIA_TYPES):
+                        target = send
+                await target(message)
+
+            await self.app(scope, receive, route)
+        return app
+
+
+class BrotliResponder:
+    """Brotli counterpart of starlette's GZipResponder, including streamed bodies"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compressor = brotli.Compressor(quality=quality)
+        self.send: Send = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_brotli)
+
+    async def send_with_brotli(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Hold the start message until the first body chunk tells us
+            # whether the response is worth compressing.
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers
+            return
+
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            if self.passthrough or (len(body) < self.minimum_size and not more_body):
+                self.passthrough = True
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers["Content-Encoding"] = "br"
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+                message["body"] = self.compressor.process(body) + self.compressor.flush()
+            else:
+                message["body"] = self.compressor.process(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(message["body"]))
+            await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        if more_body:
+            # Flush per chunk so streamed downloads reach the client progressively
+            message["body"] = self.compressor.process(body) + self.compressor.flush()
+        else:
+            message["body"] = self.compressor.process(body) + self.compressor.finish()
+        await self.send(message)
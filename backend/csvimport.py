@@ -0,0 +1,243 @@
+"""
+Streaming CSV import of session histories.
+
+Accepts the layout of test_import.csv and of session-level exports
+(Date,Name,BowType,TotalScore, optionally Distance and TargetType), with the
+same flexible header matching as the app's CSV parser. The upload is
+decoded and split into CSV records incrementally, IMPORT_BATCH_ROWS at a
+time, so a long history is never held in memory. Each batch is validated
+column-wise with numpy string operations rather than row by row. Dates
+may be M/D/YYYY (the export layout) or YYYY-MM-DD; scores must be positive
+integers; bow types must be one the app knows.
+"""
+import codecs
+import csv
+import io
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import scoring
+
+IMPORT_BATCH_ROWS = 5000
+MAX_REPORTED_ERRORS = 100
+MAX_SCORE_DIGITS = 6
+MAX_NAME_LENGTH = 200
+MIN_YEAR, MAX_YEAR = 1900, 2100
+
+UNKNOWN_BOW_TYPE = 'Unknown'
+# The bow types of the app's bow and import screens, by lower-cased CSV value
+BOW_TYPES = {
+    'recurve': 'Recurve',
+    'compound': 'Compound',
+    'barebow': 'Barebow',
+    'longbow': 'Longbow',
+    'traditional': 'Traditional',
+    'other': 'Other',
+    'unknown': UNKNOWN_BOW_TYPE,
+    '': UNKNOWN_BOW_TYPE,
+}
+_BOW_KEYS = np.array(sorted(BOW_TYPES))
+_BOW_NAMES = np.array([BOW_TYPES[key] for key in _BOW_KEYS])
+
+DedupeKey = Tuple[str, str, int]  # (YYYY-MM-DD, name, total score)
+
+
+def dedupe_key(date: str, name: str, score: int) -> DedupeKey:
+    return date[:10], name.strip(), int(score)
+
+
+def find_columns(header: List[str]) -> Dict[str, int]:
+    """Column indices by field, matched like parseMultiArcherCSV in the app; missing fields are left out"""
+    names = [h.strip().lower() for h in header]
+
+    def first(match) -> Optional[int]:
+        return next((i for i, name in enumerate(names) if match(name)), None)
+
+    columns = {
+        'date': first(lambda h: 'date' in h),
+        'name': first(lambda h: 'name' in h or 'archer' in h or h == 'session'),
+        'bow_type': first(lambda h: 'bow' in h),
+        'score': first(lambda h: 'score' in h or 'total' in h or 'points' in h),
+        'distance': first(lambda h: h == 'distance'),
+        'target_type': first(lambda h: h in ('targettype', 'target type', 'target_type')),
+    }
+    return {key: index for key, index in columns.items() if index is not None}
+
+
+async def csv_batches(chunks: AsyncIterator[bytes], batch_rows: int = IMPORT_BATCH_ROWS) -> AsyncIterator[Tuple[List[int], List[List[str]]]]:
+    """Yield (line numbers, records) batches of an uploaded CSV as its bytes arrive
+
+    Text is only handed to the csv module up to the last line break that
+    is outside a quoted field, so quoted values may contain newlines.
+    Whether the scan is inside a quoted field is carried from chunk to
+    chunk, so each character is scanned once. Blank lines are skipped. The
+    line number of a record is the line it starts on.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    pending = ''
+    scanned = 0  # pending[:scanned] has been scanned for quotes
+    quoted = False
+    line = 1
+    lines: List[int] = []
+    rows: List[List[str]] = []
+
+    def parse(text: str):
+        nonlocal line
+        reader = csv.reader(io.StringIO(text))
+        start = line
+        for record in reader:
+            if any(value.strip() for value in record):
+                lines.append(start)
+                rows.append(record)
+            start = line + reader.line_num
+        line += text.count('\n')
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        cut = -1
+        while scanned < len(pending):
+            if quoted:
+                end = pending.find('"', scanned)
+                if end == -1 or end + 1 == len(pending):
+                    # A quote at the end may be the first of an escaped pair
+                    scanned = len(pending) if end == -1 else end
+                    break
+                quoted = pending[end + 1] == '"'
+                scanned = end + 2 if quoted else end + 1
+            else:
+                quote = pending.find('"', scanned)
+                if quote == -1:
+                    cut = max(cut, pending.rfind('\n', scanned))
+                    scanned = len(pending)
+                    break
+                cut = max(cut, pending.rfind('\n', scanned, quote))
+                scanned = quote + 1
+                # A quote opens a quoted field only where a field starts, as in
+                # the csv module; elsewhere (Archer 6'2" tall) it is a plain character
+                quoted = quote == 0 or pending[quote - 1] in ',\n'
+        if cut == -1:
+            continue
+        parse(pending[:cut + 1])
+        pending = pending[cut + 1:]
+        scanned -= cut + 1
+        while len(rows) >= batch_rows:
+            yield lines[:batch_rows], rows[:batch_rows]
+            del lines[:batch_rows], rows[:batch_rows]
+
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        parse(pending if pending.endswith('\n') else pending + '\n')
+    for start in range(0, len(rows), batch_rows):
+        yield lines[start:start + batch_rows], rows[start:start + batch_rows]
+
+
+@dataclass
+class ValidRows:
+    """The valid rows of a batch as parallel columns"""
+    lines: List[int]
+    dates: List[str]  # YYYY-MM-DD
+    names: List[str]
+    scores: List[int]
+    bow_types: List[str]
+    distances: List[str]
+    target_types: List[str]
+
+    def __len__(self):
+        return len(self.lines)
+
+
+def _digits(text: np.ndarray) -> np.ndarray:
+    """Non-empty and only ASCII digits (str.isdigit also accepts superscripts and other scripts)"""
+    return (np.strings.str_len(text) > 0) & (np.strings.strip(text, '0123456789') == '')
+
+
+def _column(table: np.ndarray, columns: Dict[str, int], name: str) -> np.ndarray:
+    if name not in columns:
+        return np.full(len(table), '', dtype=str)
+    return np.strings.strip(table[:, columns[name]])
+
+
+def _parse_dates(dates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(YYYY-MM-DD strings, valid mask) for M/D/YYYY or YYYY-MM-DD dates"""
+    iso = np.strings.find(dates, '-') == 4
+    parts = np.char.partition(np.where(iso, np.strings.replace(dates, '-', '/'), dates), '/')
+    rest = np.char.partition(parts[:, 2], '/')
+    first, second, third = parts[:, 0], rest[:, 0], rest[:, 2]
+    year_text = np.where(iso, first, third)
+    month_text = np.where(iso, second, first)
+    day_text = np.where(iso, third, second)
+
+    valid = (parts[:, 1] == '/') & (rest[:, 1] == '/') & (np.strings.str_len(year_text) == 4)
+    for text in (year_text, month_text, day_text):
+        valid &= _digits(text) & (np.strings.str_len(text) <= 4)
+
+    def as_int(text):
+        return np.where(valid, text, '0').astype(np.int64)
+
+    year, month, day = as_int(year_text), as_int(month_text), as_int(day_text)
+    valid &= (year >= MIN_YEAR) & (year <= MAX_YEAR) & (month >= 1) & (month <= 12) & (day >= 1)
+    month_start = np.where(valid, (year - 1970) * 12 + month - 1, 0).astype('datetime64[M]')
+    first_day = month_start.astype('datetime64[D]')
+    days_in_month = ((month_start + 1).astype('datetime64[D]') - first_day).astype(np.int64)
+    valid &= day <= days_in_month
+    iso_dates = np.datetime_as_string(first_day + np.where(valid, day - 1, 0), unit='D')
+    return iso_dates, valid
+
+
+def validate_batch(lines: List[int], rows: List[List[str]], columns: Dict[str, int]) -> Tuple[ValidRows, List[Tuple[int, str]]]:
+    """Split a batch into valid rows and (line, message) errors, checking whole columns at once"""
+    width = max(columns.values()) + 1
+    table = np.array([(row + [''] * width)[:width] for row in rows], dtype=str).reshape(len(rows), width)
+
+    date_text = _column(table, columns, 'date')
+    names = _column(table, columns, 'name')
+    score_text = _column(table, columns, 'score')
+    bow_text = _column(table, columns, 'bow_type')
+    bow_keys = np.strings.lower(bow_text)
+    target_text = _column(table, columns, 'target_type')
+
+    dates, date_ok = _parse_dates(date_text)
+    name_ok = (np.strings.str_len(names) > 0) & (np.strings.str_len(names) <= MAX_NAME_LENGTH)
+    score_ok = _digits(score_text) & (np.strings.str_len(score_text) <= MAX_SCORE_DIGITS)
+    scores = np.where(score_ok, score_text, '0').astype(np.int64)
+    score_ok &= scores > 0
+    bow_index = np.minimum(np.searchsorted(_BOW_KEYS, bow_keys), len(_BOW_KEYS) - 1)
+    bow_ok = _BOW_KEYS[bow_index] == bow_keys
+    target_ok = (target_text == '') | np.isin(target_text, list(scoring.TARGET_FACES))
+    valid = date_ok & name_ok & score_ok & bow_ok & target_ok
+
+    errors = []
+    checks = ((date_ok, date_text, "invalid date"), (name_ok, names, "missing or too long name"),
+              (score_ok, score_text, "score must be a positive integer"), (bow_ok, bow_text, "unknown bow type"),
+              (target_ok, target_text, "unknown target type"))
+    for i in np.flatnonzero(~valid)[:MAX_REPORTED_ERRORS]:
+        problems = [f"{message} '{values[i]}'" for ok, values, message in checks if not ok[i]]
+        errors.append((lines[i], '; '.join(problems)))
+
+    keep = np.flatnonzero(valid)
+    return ValidRows(
+        lines=[lines[i] for i in keep],
+        dates=dates[keep].tolist(),
+        names=names[keep].tolist(),
+        scores=scores[keep].tolist(),
+        bow_types=_BOW_NAMES[bow_index[keep]].tolist(),
+        distances=_column(table, columns, 'distance')[keep].tolist(),
+        target_types=np.where(target_text[keep] == '', scoring.DEFAULT_TARGET_TYPE, target_text[keep]).tolist(),
+    ), errors
+
+
+@dataclass
+class ImportSummary:
+    rows: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    bows_created: List[str] = field(default_factory=list)
+    errors: List[Dict] = field(default_factory=list)  # the first MAX_REPORTED_ERRORS invalid rows
+
+    def add_errors(self, errors: List[Tuple[int, str]], invalid: int):
+        self.invalid += invalid
+        room = MAX_REPORTED_ERRORS - len(self.errors)
+        self.errors.extend({'line': line, 'error': message} for line, message in errors[:max(room, 0)])
@@ -0,0 +1,174 @@
+"""
+Streaming export of sessions, rounds and shots.
+
+Every writer takes an iterator of session documents and yields encoded
+chunks, so a StreamingResponse can send an account's whole history while
+only one page of sessions and one chunk of output are held in memory.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# The first four columns match test_import.csv so session-level exports can be re-imported
+SESSION_COLUMNS = ['Date', 'Name', 'BowType', 'TotalScore', 'Distance', 'TargetType', 'Rounds', 'SessionId']
+SHOT_COLUMNS = ['Date', 'Name', 'BowType', 'TotalScore', 'Distance', 'TargetType', 'SessionId',
+                'RoundNumber', 'RoundScore', 'ShotNumber', 'Ring', 'X', 'Y']
+
+CSV_FLUSH_ROWS = 1000
+PARQUET_ROW_GROUP_SIZE = 50000
+
+
+def format_export_date(created_at) -> str:
+    """Format a stored created_at as M/D/YYYY, the date layout used by CSV imports"""
+    if isinstance(created_at, str):
+        try:
+            created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        except ValueError:
+            return created_at
+    if isinstance(created_at, datetime):
+        return f"{created_at.month}/{created_at.day}/{created_at.year}"
+    return ''
+
+
+def session_row(session: Dict, bow_types: Dict[str, str]) -> list:
+    """Session-level row in SESSION_COLUMNS order"""
+    return [
+        format_export_date(session.get('created_at')),
+        session.get('name', ''),
+        bow_types.get(session.get('bow_id'), 'Unknown'),
+        session.get('total_score', 0),
+        session.get('distance') or '',
+        session.get('target_type') or 'wa_standard',
+        len(session.get('rounds', [])),
+        session.get('id', ''),
+    ]
+
+
+def shot_rows(session: Dict, bow_types: Dict[str, str]) -> Iterator[list]:
+    """One row per shot in SHOT_COLUMNS order"""
+    prefix = [
+        format_export_date(session.get('created_at')),
+        session.get('name', ''),
+        bow_types.get(session.get('bow_id'), 'Unknown'),
+        session.get('total_score', 0),
+        session.get('distance') or '',
+        session.get('target_type') or 'wa_standard',
+        session.get('id', ''),
+    ]
+    for round_data in session.get('rounds', []):
+        for shot_number, shot in enumerate(round_data.get('shots', []), start=1):
+            yield prefix + [
+                round_data.get('round_number', 0),
+                round_data.get('total_score', 0),
+                shot_number,
+                shot.get('ring', 0),
+                shot.get('x', 0),
+                shot.get('y', 0),
+            ]
+
+
+def stream_csv(sessions: Iterable[Dict], bow_types: Dict[str, str], detail: str = 'session') -> Iterator[bytes]:
+    """Yield CSV output in chunks of CSV_FLUSH_ROWS rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(SHOT_COLUMNS if detail == 'shot' else SESSION_COLUMNS)
+    pending = 0
+    for session in sessions:
+        rows = shot_rows(session, bow_types) if detail == 'shot' else [session_row(session, bow_types)]
+        for row in rows:
+            writer.writerow(row)
+            pending += 1
+            if pending >= CSV_FLUSH_ROWS:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+    yield buffer.getvalue().encode('utf-8')
+
+
+def stream_ndjson(sessions: Iterable[Dict], bow_types: Dict[str, str], detail: str = 'session') -> Iterator[bytes]:
+    """Yield one JSON document per line: full sessions, or flattened shots"""
+    for session in sessions:
+        if detail == 'shot':
+            lines = [json.dumps(dict(zip(SHOT_COLUMNS, row))) for row in shot_rows(session, bow_types)]
+            if lines:
+                yield ('\n'.join(lines) + '\n').encode('utf-8')
+        else:
+            session = dict(session, bow_type=bow_types.get(session.get('bow_id'), 'Unknown'))
+            yield (json.dumps(session, default=str) + '\n').encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose contents are drained after each row group"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_parquet(sessions: Iterable[Dict], bow_types: Dict[str, str], detail: str = 'shot') -> Iterator[bytes]:
+    """Yield a Parquet file one row group at a time (always shot-level)"""
+    schema = pa.schema([
+        ('date', pa.string()), ('name', pa.string()), ('bow_type', pa.string()),
+        ('total_score', pa.int32()), ('distance', pa.string()), ('target_type', pa.string()),
+        ('session_id', pa.string()), ('round_number', pa.int32()), ('round_score', pa.int32()),
+        ('shot_number', pa.int32()), ('ring', pa.int8()), ('x', pa.float64()), ('y', pa.float64()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    columns = [[] for _ in schema.names]
+
+    def write_row_group():
+        writer.write_table(pa.table([pa.array(c, type=f.type) for c, f in zip(columns, schema)], schema=schema))
+        for column in columns:
+            column.clear()
+
+    for session in sessions:
+        for row in shot_rows(session, bow_types):
+            for column, value in zip(columns, row):
+                column.append(value)
+            if len(columns[0]) >= PARQUET_ROW_GROUP_SIZE:
+                write_row_group()
+                yield sink.drain()
+    if columns[0]:
+        write_row_group()
+    writer.close()
+    yield sink.drain()
+
+
+EXPORT_WRITERS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+    'parquet': stream_parquet,
+}
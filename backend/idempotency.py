@@ -0,0 +1,155 @@
+"""
+Idempotency-Key support for mutation routes.
+
+The app retries creates on patchy range Wi-Fi. A route wrapped with
+`idempotent` remembers the response of each (method, path, scope header,
+Idempotency-Key) for a TTL, where the scope header keeps the keys of
+different owners apart; a retry with the same key and body gets the stored response
+back (marked with an `Idempotent-Replayed: true` header) without running
+the route or touching storage. A retry that arrives while the first
+request is still running waits for its result instead of running twice.
+Reusing a key with a different body is rejected with 422, and failed
+requests are not stored, so they can be retried.
+
+Routes that read their body as a stream (the CSV import) are wrapped with
+`streamed=True`: the body is hashed as the route reads it instead of
+being read up front, so its fingerprint is known once the route is done,
+and a replay hashes the retried body as it arrives before answering.
+
+Responses are kept in memory (per process, like the other in-process
+indexes), bounded by a maximum number of keys with least recently used
+eviction.
+"""
+import asyncio
+import functools
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+StoreKey = Tuple[str, str, str, str]  # (method, path, scope header value, idempotency key)
+
+
+class IdempotencyStore:
+    def __init__(self, ttl: float = 24 * 3600, max_entries: int = 10000, scope_header: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.scope_header = scope_header
+        self.entries: 'OrderedDict[StoreKey, Tuple[float, str, object]]' = OrderedDict()
+        self.in_flight: Dict[StoreKey, Tuple[str, asyncio.Future]] = {}
+
+    def get(self, key: StoreKey) -> Optional[Tuple[str, object]]:
+        """(body fingerprint, stored response) for a live key, or None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, fingerprint, stored = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return fingerprint, stored
+
+    def put(self, key: StoreKey, fingerprint: str, stored):
+        self.entries[key] = (time.monotonic() + self.ttl, fingerprint, stored)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class HashedBody:
+    """A request body stream that hashes the chunks the route reads"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.hash = hashlib.sha256()
+
+    async def stream(self):
+        async for chunk in self.chunks:
+            self.hash.update(chunk)
+            yield chunk
+
+    async def fingerprint(self) -> str:
+        """Hash of the whole body, reading whatever the route left unread"""
+        async for _ in self.stream():
+            pass
+        return self.hash.hexdigest()
+
+
+def _stored_form(result):
+    """What to keep of a route's return value: the encoded response, or JSON-ready data"""
+    if isinstance(result, Response):
+        return 'response', (result.body, result.status_code, result.media_type, dict(result.headers))
+    return 'json', jsonable_encoder(result)
+
+
+def _replay(stored) -> Response:
+    kind, value = stored
+    if kind == 'json':
+        return JSONResponse(content=value, headers={REPLAYED_HEADER: 'true'})
+    body, status_code, media_type, headers = value
+    headers = {k: v for k, v in headers.items() if k.lower() not in ('content-length', 'content-type')}
+    headers[REPLAYED_HEADER] = 'true'
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
+
+
+def idempotent(store: IdempotencyStore, streamed: bool = False):
+    """Decorate a route that takes a `Request` argument so its responses can be replayed by key
+
+    With `streamed`, the route must read its body through `request.stream()`.
+    """
+    def decorate(route):
+        @functools.wraps(route)
+        async def wrapper(*args, **kwargs):
+            http_request = next(value for value in kwargs.values() if isinstance(value, Request))
+            idempotency_key = http_request.headers.get(IDEMPOTENCY_HEADER)
+            if idempotency_key is None:
+                return await route(*args, **kwargs)
+            if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+                raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters")
+
+            scope = http_request.headers.get(store.scope_header, '') if store.scope_header else ''
+            key = (http_request.method, http_request.url.path, scope, idempotency_key)
+            if streamed:
+                body = HashedBody(http_request.stream())
+                http_request.stream = body.stream
+                fingerprint = None  # known once the body has been read
+            else:
+                fingerprint = hashlib.sha256(await http_request.body()).hexdigest()
+
+            while True:
+                stored = store.get(key)
+                if stored is not None:
+                    if fingerprint is None:
+                        fingerprint = await body.fingerprint()
+                    if stored[0] != fingerprint:
+                        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} was already used with a different request body")
+                    return _replay(stored[1])
+                if key not in store.in_flight:
+                    break
+                in_flight_fingerprint, done = store.in_flight[key]
+                if None not in (fingerprint, in_flight_fingerprint) and in_flight_fingerprint != fingerprint:
+                    raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} is in use with a different request body")
+                await asyncio.shield(done)
+
+            done = asyncio.get_running_loop().create_future()
+            store.in_flight[key] = (fingerprint, done)
+            try:
+                result = await route(*args, **kwargs)
+                if fingerprint is None:
+                    fingerprint = await body.fingerprint()
+                store.put(key, fingerprint, _stored_form(result))
+                return result
+            finally:
+                del store.in_flight[key]
+                done.set_result(None)
+        return wrapper
+    return decorate
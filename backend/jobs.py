@@ -0,0 +1,378 @@
+"""
+Resumable background jobs over the sessions collection.
+
+A job is a document in the `jobs` collection holding its parameters,
+status, counters and a checkpoint. Jobs run on a daemon thread, process
+sessions in pages ordered by document id, commit changes with batched
+writes and save the checkpoint after every page, so a job that is
+cancelled or interrupted by a restart can be resumed where it stopped.
+
+A job's `owner_id` is the owner it was started for; rescore and rollup
+rebuilds then cover only that owner's sessions. Jobs with no owner span
+every owner and are visible to admin requests only.
+"""
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import rollups
+import scoring
+from owners import DEFAULT_OWNER
+
+logger = logging.getLogger(__name__)
+
+JOB_COLLECTION = 'jobs'
+MAX_BATCH_WRITES = 500  # Firestore limit per batched write
+MAX_DIFF_ENTRIES = 500  # keeps dry-run job documents well under the 1 MiB limit
+
+
+class Throttle:
+    """Pace operations to at most `rate` per second"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self.next_allowed = time.monotonic()
+
+    def wait(self, count: int = 1):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_allowed > now:
+            time.sleep(self.next_allowed - now)
+        self.next_allowed = max(now, self.next_allowed) + count * self.interval
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """What a job handler sees: storage, parameters, counters and checkpointing"""
+
+    def __init__(self, db, job: Dict, cancel_event: threading.Event, session_listeners: List[Callable],
+                 flush_session: Optional[Callable[[str], bool]] = None):
+        self.db = db
+        self.job = job
+        self.params = job.get('params', {})
+        self.checkpoint_data = job.get('checkpoint')
+        self.counters = job.setdefault('counters', {})
+        self.cancel_event = cancel_event
+        self.session_listeners = session_listeners
+        self.flush_session = flush_session
+        self.read_throttle = Throttle(self.params.get('max_reads_per_second', 0))
+        self.write_throttle = Throttle(self.params.get('max_writes_per_second', 0))
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def checkpoint(self, checkpoint, **fields):
+        """Persist progress; raises JobCancelled if a cancel was requested"""
+        self.checkpoint_data = checkpoint
+        self.job.update(fields)
+        update = dict(fields, checkpoint=checkpoint, counters=self.counters, updated_at=datetime.utcnow().isoformat())
+        self.db.collection(JOB_COLLECTION).document(self.job['id']).update(update)
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def iter_pages(self, query_factory: Callable, page_size: int):
+        """Yield pages of document snapshots ordered by id, starting after the checkpoint"""
+        last_id = (self.checkpoint_data or {}).get('last_id')
+        while True:
+            self.read_throttle.wait(page_size)
+            query = query_factory().order_by('id')
+            if last_id is not None:
+                query = query.start_after({'id': last_id})
+            docs = list(query.limit(page_size).stream())
+            self.count('scanned', len(docs))
+            if not docs:
+                return
+            yield docs
+            last_id = docs[-1].id
+            if len(docs) < page_size:
+                return
+
+    def commit(self, writes, method: str = 'update'):
+        """Commit (doc_ref, fields) writes in batches of at most MAX_BATCH_WRITES
+
+        `method` is the batch operation: 'update', 'set' or 'delete' (fields ignored).
+        """
+        for start in range(0, len(writes), MAX_BATCH_WRITES):
+            chunk = writes[start:start + MAX_BATCH_WRITES]
+            self.write_throttle.wait(len(chunk))
+            batch = self.db.batch()
+            for doc_ref, fields in chunk:
+                if method == 'delete':
+                    batch.delete(doc_ref)
+                else:
+                    getattr(batch, method)(doc_ref, fields)
+            batch.commit()
+            self.count('written', len(chunk))
+
+    def flushed(self, docs: List) -> List:
+        """A page of session snapshots after persisting their buffered edits
+
+        Sessions the write-behind buffer had edits for are read again, so a
+        job never rewrites a session from a copy older than its latest edit.
+        """
+        if self.flush_session is None:
+            return docs
+        fresh = [doc.reference.get() if self.flush_session(doc.id) else doc for doc in docs]
+        return [doc for doc in fresh if doc.exists]
+
+    def sessions_written(self, changes: List[Tuple[Dict, Dict]]):
+        """Tell listeners about (previous, new) sessions this job rewrote"""
+        for previous, session in changes:
+            for listener in self.session_listeners:
+                listener(session, previous)
+
+
+class JobManager:
+    """Registry of job kinds and the threads running them in this process"""
+
+    def __init__(self):
+        self.handlers: Dict[str, Callable] = {}
+        self.cancel_events: Dict[str, threading.Event] = {}
+        self.threads: Dict[str, threading.Thread] = {}
+        self.session_listeners: List[Callable] = []
+        # Persists a session's buffered edits, returning whether it was written (see JobContext.flushed)
+        self.flush_session: Optional[Callable[[str], bool]] = None
+        self.lock = threading.Lock()
+
+    def handler(self, kind: str):
+        def register(func):
+            self.handlers[kind] = func
+            return func
+        return register
+
+    def new(self, kind: str, params: Dict, owner_id: Optional[str] = None, job_id: Optional[str] = None) -> Dict:
+        """A pending job document, not yet stored"""
+        now = datetime.utcnow().isoformat()
+        return {
+            'id': job_id or str(uuid.uuid4()),
+            'kind': kind,
+            'owner_id': owner_id,
+            'status': 'pending',
+            'params': params,
+            'checkpoint': None,
+            'counters': {},
+            'error': '',
+            'created_at': now,
+            'updated_at': now,
+        }
+
+    def create(self, db, kind: str, params: Dict, owner_id: Optional[str] = None) -> Dict:
+        job = self.new(kind, params, owner_id)
+        db.collection(JOB_COLLECTION).document(job['id']).set(job)
+        return self.start(db, job)
+
+    def run(self, db, job: Dict) -> Dict:
+        """Run a stored job from its checkpoint on the calling thread and return it once it stops"""
+        with self.lock:
+            if self.is_running(job['id']):
+                raise RuntimeError(f"Job {job['id']} is already running")
+            self.cancel_events[job['id']] = threading.Event()
+        job['status'] = 'running'
+        db.collection(JOB_COLLECTION).document(job['id']).update({'status': 'running', 'error': '', 'updated_at': datetime.utcnow().isoformat()})
+        self._run(db, job)
+        return db.collection(JOB_COLLECTION).document(job['id']).get().to_dict()
+
+    def start(self, db, job: Dict) -> Dict:
+        """Run a pending, cancelled or failed job from its checkpoint"""
+        with self.lock:
+            thread = self.threads.get(job['id'])
+            if thread is not None and thread.is_alive():
+                return job
+            self.cancel_events[job['id']] = threading.Event()
+            job['status'] = 'running'
+            job['updated_at'] = datetime.utcnow().isoformat()
+            db.collection(JOB_COLLECTION).document(job['id']).update({'status': 'running', 'error': '', 'updated_at': job['updated_at']})
+            thread = threading.Thread(target=self._run, args=(db, job), name=f"job-{job['id']}", daemon=True)
+            self.threads[job['id']] = thread
+            thread.start()
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        event = self.cancel_events.get(job_id)
+        thread = self.threads.get(job_id)
+        if event is None or thread is None or not thread.is_alive():
+            return False
+        event.set()
+        return True
+
+    def is_running(self, job_id: str) -> bool:
+        thread = self.threads.get(job_id)
+        return thread is not None and thread.is_alive()
+
+    def _run(self, db, job: Dict):
+        job_ref = db.collection(JOB_COLLECTION).document(job['id'])
+        ctx = JobContext(db, job, self.cancel_events[job['id']], self.session_listeners, self.flush_session)
+        try:
+            self.handlers[job['kind']](ctx)
+            status, error = 'completed', ''
+        except JobCancelled:
+            status, error = 'cancelled', ''
+        except Exception as e:
+            logger.error(f"Job {job['id']} ({job['kind']}) failed: {e}")
+            status, error = 'failed', str(e)
+        job_ref.update({
+            'status': status,
+            'error': error,
+            'counters': ctx.counters,
+            'updated_at': datetime.utcnow().isoformat(),
+        })
+        logger.info(f"Job {job['id']} ({job['kind']}) {status}: {ctx.counters}")
+
+
+job_manager = JobManager()
+
+
+def owner_sessions(ctx: JobContext):
+    """The sessions a job covers: its owner's (needs an owner_id + id index), or all of them"""
+    sessions = ctx.db.collection('sessions')
+    if ctx.job.get('owner_id') is None:
+        return sessions
+    return sessions.where('owner_id', '==', ctx.job['owner_id'])
+
+
+@job_manager.handler('rescore')
+def run_rescore(ctx: JobContext):
+    """Recompute rings, round totals and session totals for the job owner's sessions, or every session
+
+    Only rings the server computed from x/y are rewritten; sent rings that
+    disagree with their position are counted as rings_kept. In dry-run mode
+    nothing is written; the first MAX_DIFF_ENTRIES session diffs are
+    stored on the job document instead.
+    """
+    dry_run = ctx.params.get('dry_run', True)
+    page_size = ctx.params.get('page_size', 200)
+    diff = list(ctx.job.get('diff') or [])
+
+    for page in ctx.iter_pages(lambda: owner_sessions(ctx), page_size):
+        docs = ctx.flushed(page)
+        previous = {doc.id: doc.to_dict() for doc in docs}
+        sessions = [doc.to_dict() for doc in docs]
+        diffs = scoring.rescore_sessions(sessions)
+        changed = {
+            d['session_id'] for d in diffs
+            if d['rounds'] or d['total_score'] or any(r['computed'] for r in d['rings'])
+        }
+        ctx.count('changed', len(changed))
+        ctx.count('rings_changed', sum(r['computed'] for d in diffs for r in d['rings']))
+        ctx.count('rings_kept', sum(not r['computed'] for d in diffs for r in d['rings']))
+
+        if dry_run:
+            diff.extend(diffs[:max(0, MAX_DIFF_ENTRIES - len(diff))])
+        else:
+            now = datetime.utcnow().isoformat()
+            written = []
+            for doc, session in zip(docs, sessions):
+                if session.get('id') in changed:
+                    session['updated_at'] = now
+                    written.append((doc.reference, session))
+            ctx.commit([
+                (doc_ref, {'rounds': session['rounds'], 'total_score': session['total_score'], 'updated_at': now})
+                for doc_ref, session in written
+            ])
+            ctx.sessions_written([(previous[doc_ref.id], session) for doc_ref, session in written])
+
+        ctx.checkpoint({'last_id': page[-1].id}, diff=diff)
+
+
+@job_manager.handler('rebuild_rollups')
+def run_rebuild_rollups(ctx: JobContext):
+    """Recompute the job owner's rollup documents, or all of them, from a scan of sessions
+
+    Totals are accumulated in memory (one entry per owner, bow, distance
+    and year) and written once the scan completes, replacing existing rollup
+    documents. Increments applied by routes while the scan runs can be
+    overwritten, so run it while scoring is quiet. Resuming restarts the
+    scan from the beginning.
+    """
+    page_size = ctx.params.get('page_size', 200)
+    ctx.checkpoint_data = None
+    totals = {}
+    for docs in ctx.iter_pages(lambda: owner_sessions(ctx), page_size):
+        rollups.accumulate((doc.to_dict() for doc in docs), totals)
+        if ctx.cancel_event.is_set():
+            raise JobCancelled()
+
+    collection = ctx.db.collection(rollups.ROLLUP_COLLECTION)
+    documents = list(rollups.rollup_documents(totals))
+    ctx.commit([(collection.document(doc_id), body) for doc_id, body in documents], method='set')
+
+    current = {doc_id for doc_id, _ in documents}
+    existing = collection if ctx.job.get('owner_id') is None else collection.where('owner_id', '==', ctx.job['owner_id'])
+    stale = [doc.reference for doc in existing.select([]).stream() if doc.id not in current]
+    ctx.commit([(doc_ref, None) for doc_ref in stale], method='delete')
+    ctx.checkpoint(None)
+
+
+@job_manager.handler('propagate_bow')
+def run_propagate_bow(ctx: JobContext):
+    """Copy a bow's current name onto its sessions, or detach them if it was deleted
+
+    Sessions are found with equality queries on owner_id and bow_id
+    (ordered by id, so Firestore needs a composite index on owner_id +
+    bow_id + id). The bow is re-read
+    for every page and only sessions that still differ are written, so
+    overlapping renames converge on the latest name and resuming is safe.
+    Deleting a bow clears bow_id and keeps bow_name, so history still
+    shows what was shot with.
+    """
+    bow_id = ctx.params['bow_id']
+    owner_id = ctx.params.get('owner_id', DEFAULT_OWNER)
+    page_size = ctx.params.get('page_size', 200)
+    sessions = ctx.db.collection('sessions').where('owner_id', '==', owner_id)
+
+    for page in ctx.iter_pages(lambda: sessions.where('bow_id', '==', bow_id), page_size):
+        docs = ctx.flushed(page)
+        bow_doc = ctx.db.collection('bows').document(bow_id).get()
+        if bow_doc.exists:
+            fields = {'bow_name': bow_doc.to_dict().get('name')}
+        else:
+            fields = {'bow_id': None}
+
+        now = datetime.utcnow().isoformat()
+        writes, changes = [], []
+        for doc in docs:
+            previous = doc.to_dict()
+            if all(previous.get(field) == value for field, value in fields.items()):
+                continue
+            session = dict(previous, updated_at=now, **fields)
+            writes.append((doc.reference, dict(fields, updated_at=now)))
+            changes.append((previous, session))
+        ctx.count('changed', len(writes))
+        ctx.commit(writes)
+        ctx.sessions_written(changes)
+        ctx.checkpoint({'last_id': page[-1].id})
+
+
+@job_manager.handler('assign_owner')
+def run_assign_owner(ctx: JobContext):
+    """Give documents written before owners existed to DEFAULT_OWNER
+
+    Owner-scoped queries filter on owner_id, so these documents stay
+    invisible until this has run; the server runs it at startup (see
+    migrate_unowned_documents). updated_at is stamped so devices that
+    synced before the migration receive the documents on their next sync.
+    Rebuild rollups afterwards to move their statistics into owner-scoped
+    rollup documents.
+    """
+    page_size = ctx.params.get('page_size', 200)
+    collections = ['sessions', 'bows', 'tombstones']
+    start = collections.index((ctx.checkpoint_data or {}).get('collection', collections[0]))
+    for collection in collections[start:]:
+        if (ctx.checkpoint_data or {}).get('collection') != collection:
+            ctx.checkpoint_data = None
+        for docs in ctx.iter_pages(lambda: ctx.db.collection(collection), page_size):
+            now = datetime.utcnow().isoformat()
+            writes = [
+                (doc.reference, {'owner_id': DEFAULT_OWNER, 'updated_at': now})
+                for doc in docs if not doc.to_dict().get('owner_id')
+            ]
+            ctx.count('changed', len(writes))
+            ctx.commit(writes)
+            ctx.checkpoint({'collection': collection, 'last_id': docs[-1].id})
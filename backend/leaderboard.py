@@ -0,0 +1,108 @@
+"""
+In-process ranking index for leaderboards and personal bests.
+
+Sessions are bucketed by (distance, bow_type, target_type) and kept in a
+list sorted by score, so the top K of a bucket is a slice and needs no
+session scan. The index is built from storage at startup and kept
+current by the session and bow routes (and by jobs that rewrite
+sessions); every bucket keeps all of its ranked sessions, so a delete
+promotes the next one without a storage read.
+"""
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+
+UNKNOWN = 'Unknown'
+
+Bucket = Tuple[str, str, str]
+RankKey = Tuple[int, str, str]  # (-total_score, created_at, session_id): best first, earliest first on ties
+
+
+def bucket_key(distance: Optional[str], bow_type: Optional[str], target_type: Optional[str]) -> Bucket:
+    return ((distance or '').strip(), bow_type or UNKNOWN, target_type or 'wa_standard')
+
+
+class LeaderboardIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.buckets: Dict[Bucket, List[RankKey]] = {}
+        self.entries: Dict[str, Tuple[Bucket, RankKey, Dict]] = {}
+        self.bow_types: Dict[str, str] = {}
+        self.sessions_by_bow: Dict[str, set] = {}
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+            self.entries.clear()
+            self.bow_types.clear()
+            self.sessions_by_bow.clear()
+
+    def set_bow(self, bow: Dict):
+        """Record a bow's type and move its sessions if the type changed"""
+        with self.lock:
+            previous = self.bow_types.get(bow['id'])
+            self.bow_types[bow['id']] = bow.get('bow_type') or UNKNOWN
+            if previous is not None and previous != self.bow_types[bow['id']]:
+                self._rebucket_bow(bow['id'])
+
+    def remove_bow(self, bow_id: str):
+        with self.lock:
+            self.bow_types.pop(bow_id, None)
+            self._rebucket_bow(bow_id)
+
+    def _rebucket_bow(self, bow_id: str):
+        for session_id in list(self.sessions_by_bow.get(bow_id, ())):
+            _, _, summary = self.entries[session_id]
+            self.remove(session_id)
+            self._insert(dict(summary, bow_type=self.bow_types.get(bow_id, UNKNOWN)))
+
+    def update(self, session: Dict):
+        """Insert or re-rank a session; sessions without rounds are not ranked"""
+        with self.lock:
+            self.remove(session['id'])
+            if not session.get('rounds'):
+                return
+            self._insert({
+                'id': session['id'],
+                'name': session.get('name', ''),
+                'total_score': session.get('total_score', 0),
+                'round_count': len(session['rounds']),
+                'bow_id': session.get('bow_id'),
+                'bow_name': session.get('bow_name'),
+                'bow_type': self.bow_types.get(session.get('bow_id'), UNKNOWN),
+                'distance': session.get('distance'),
+                'target_type': session.get('target_type') or 'wa_standard',
+                'created_at': str(session.get('created_at', '')),
+            })
+
+    def _insert(self, summary: Dict):
+        bucket = bucket_key(summary['distance'], summary['bow_type'], summary['target_type'])
+        key = (-summary['total_score'], summary['created_at'], summary['id'])
+        bisect.insort(self.buckets.setdefault(bucket, []), key)
+        self.entries[summary['id']] = (bucket, key, summary)
+        if summary['bow_id']:
+            self.sessions_by_bow.setdefault(summary['bow_id'], set()).add(summary['id'])
+
+    def remove(self, session_id: str):
+        with self.lock:
+            entry = self.entries.pop(session_id, None)
+            if entry is None:
+                return
+            bucket, key, summary = entry
+            ranking = self.buckets[bucket]
+            del ranking[bisect.bisect_left(ranking, key)]
+            if not ranking:
+                del self.buckets[bucket]
+            if summary['bow_id']:
+                self.sessions_by_bow.get(summary['bow_id'], set()).discard(session_id)
+
+    def top(self, distance: Optional[str], bow_type: Optional[str], target_type: Optional[str], k: int = 10) -> List[Dict]:
+        """Best K sessions of one bucket, O(K)"""
+        with self.lock:
+            ranking = self.buckets.get(bucket_key(distance, bow_type, target_type), [])
+            return [dict(self.entries[key[2]][2], rank=rank) for rank, key in enumerate(ranking[:k], start=1)]
+
+    def personal_bests(self) -> List[Dict]:
+        """Best session of every bucket, O(number of buckets)"""
+        with self.lock:
+            return [dict(self.entries[ranking[0][2]][2]) for ranking in self.buckets.values()]
@@ -0,0 +1,51 @@
+"""
+Owner scoping for sessions, bows and everything derived from them.
+
+Every session, bow, tombstone and rollup document carries an `owner_id`,
+and every route reads and writes only the documents of the owner named
+by the X-Owner-Id request header. List queries filter on owner_id before
+ordering, so with composite indexes on owner_id + the sort field (see
+firestore.indexes.json) their cost follows one archer's history rather
+than the whole user base. Requests without the header, and documents
+written before owners existed, belong to DEFAULT_OWNER.
+
+The owner header is not authenticated: any client can name any owner, and
+the app does not send it yet, so all of its data is DEFAULT_OWNER's. This
+is partitioning for query cost and per-archer scoping, not access control.
+Before the API is exposed to untrusted clients, the owner must come from
+real authentication (e.g. a verified sign-in token) instead of the header.
+
+Operations that span every owner (whole-collection jobs) instead require
+the X-Admin-Token header to match the ADMIN_TOKEN environment variable,
+and are disabled when it is unset.
+"""
+import hmac
+import os
+import re
+from typing import Dict, Optional
+
+from fastapi import Header, HTTPException
+
+OWNER_HEADER = 'X-Owner-Id'
+ADMIN_HEADER = 'X-Admin-Token'
+DEFAULT_OWNER = 'default'
+OWNER_PATTERN = re.compile(r"^[A-Za-z0-9_.@:-]{1,128}$")
+
+
+def owner_of(doc: Optional[Dict]) -> str:
+    return (doc or {}).get('owner_id') or DEFAULT_OWNER
+
+
+def request_owner(x_owner_id: Optional[str] = Header(None)) -> str:
+    """FastAPI dependency resolving the owner of a request (taken on trust from the header, see the module docstring)"""
+    if x_owner_id is None:
+        return DEFAULT_OWNER
+    if not OWNER_PATTERN.match(x_owner_id):
+        raise HTTPException(status_code=400, detail=f"Invalid {OWNER_HEADER} header")
+    return x_owner_id
+
+
+def request_is_admin(x_admin_token: Optional[str] = Header(None)) -> bool:
+    """FastAPI dependency: whether the request carries the configured admin token"""
+    expected = os.environ.get('ADMIN_TOKEN')
+    return bool(expected and x_admin_token and hmac.compare_digest(x_admin_token, expected))
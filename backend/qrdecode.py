@@ -0,0 +1,204 @@
+"""
+QR code decoding for scorecard PDFs exported by the app.
+
+Images embedded in a page are tried first, at their native resolution:
+scanned scorecards and codes the app places as pictures are decoded from
+their original pixels, which is both cheaper and more reliable than a
+page render. When that finds nothing (vector codes, or no images), the
+page is rendered to grayscale once. Either image goes through a chain
+of decode strategies ordered by cost: pyzbar, OpenCV's QRCodeDetector
+(single, then multi-code), and both decoders again on preprocessed copies
+(contrast equalization, Otsu and adaptive thresholding, upscaling for
+tiny print).
+The chain stops at the first strategy that finds an Arrow Tracker code,
+so clean pages cost one pyzbar call while rotated, low-contrast or small
+codes get the heavier passes instead of a second rasterization.
+
+pyzbar needs the zbar shared library; when it is missing the pyzbar
+strategies are skipped and OpenCV does the work.
+"""
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+try:
+    from pyzbar import pyzbar
+except ImportError:  # zbar is optional, OpenCV is always available
+    pyzbar = None
+
+logger = logging.getLogger(__name__)
+
+ARROW_TRACKER_TYPE = 'arrow_tracker'
+DEFAULT_ZOOM = 2.0  # 144 DPI, enough for the app's printed codes
+MIN_EMBEDDED_SIZE = 21  # pixels; a version 1 code is 21 modules wide
+QUIET_ZONE = 16  # pixels of white added around embedded images cropped tight to the code
+
+
+def parse_arrow_tracker(payload: str) -> Optional[Dict]:
+    """The decoded JSON of an Arrow Tracker code, or None for any other QR content"""
+    try:
+        data = json.loads(payload)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if isinstance(data, dict) and data.get('t') == ARROW_TRACKER_TYPE:
+        return data
+    return None
+
+
+# ---- decoders: grayscale image -> decoded payload strings ----
+
+def decode_pyzbar(image: np.ndarray) -> List[str]:
+    payloads = []
+    for symbol in pyzbar.decode(image, symbols=[pyzbar.ZBarSymbol.QRCODE]):
+        try:
+            payloads.append(symbol.data.decode('utf-8'))
+        except UnicodeDecodeError:
+            continue
+    return payloads
+
+
+_detector = cv2.QRCodeDetector()
+
+
+def decode_opencv(image: np.ndarray) -> List[str]:
+    payload, _, _ = _detector.detectAndDecode(image)
+    return [payload] if payload else []
+
+
+def decode_opencv_multi(image: np.ndarray) -> List[str]:
+    found, payloads, _, _ = _detector.detectAndDecodeMulti(image)
+    return [payload for payload in payloads if payload] if found else []
+
+
+# ---- preprocessing: grayscale image -> grayscale image ----
+
+def equalize(image: np.ndarray) -> np.ndarray:
+    """Stretch low-contrast prints"""
+    return cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(image)
+
+
+def otsu_threshold(image: np.ndarray) -> np.ndarray:
+    return cv2.threshold(cv2.GaussianBlur(image, (3, 3), 0), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+
+def adaptive_threshold(image: np.ndarray) -> np.ndarray:
+    """Binarize against the local mean, for uneven lighting and speckle noise"""
+    return cv2.adaptiveThreshold(cv2.medianBlur(image, 3), 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10)
+
+
+def upscale(image: np.ndarray) -> np.ndarray:
+    """Double the resolution so tiny modules are several pixels wide"""
+    return cv2.resize(image, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+
+
+@dataclass(frozen=True)
+class Strategy:
+    name: str
+    decode: Callable[[np.ndarray], List[str]]
+    preprocess: Tuple[Callable[[np.ndarray], np.ndarray], ...] = ()
+    needs_zbar: bool = False
+
+    @property
+    def available(self) -> bool:
+        return pyzbar is not None or not self.needs_zbar
+
+    def run(self, image: np.ndarray) -> List[str]:
+        for step in self.preprocess:
+            image = step(image)
+        return self.decode(image)
+
+
+# Cheapest first; a strategy only runs if every earlier one found no Arrow Tracker code
+STRATEGIES: Tuple[Strategy, ...] = (
+    Strategy('pyzbar', decode_pyzbar, needs_zbar=True),
+    Strategy('opencv', decode_opencv),
+    Strategy('opencv_multi', decode_opencv_multi),
+    Strategy('pyzbar_equalized', decode_pyzbar, (equalize,), needs_zbar=True),
+    Strategy('pyzbar_otsu', decode_pyzbar, (otsu_threshold,), needs_zbar=True),
+    Strategy('opencv_otsu', decode_opencv_multi, (otsu_threshold,)),
+    Strategy('opencv_adaptive', decode_opencv_multi, (adaptive_threshold,)),
+    Strategy('pyzbar_upscaled', decode_pyzbar, (upscale, otsu_threshold), needs_zbar=True),
+    Strategy('opencv_upscaled', decode_opencv_multi, (upscale, otsu_threshold)),
+)
+
+
+@dataclass
+class PageResult:
+    payloads: List[str] = field(default_factory=list)  # every distinct QR payload seen, in order
+    sessions: List[Dict] = field(default_factory=list)  # the Arrow Tracker ones, parsed
+    strategy: Optional[str] = None  # the strategy that found them
+    source: Optional[str] = None  # 'embedded' image or 'render'ed page
+
+
+def decode_image(image: np.ndarray, strategies: Tuple[Strategy, ...] = STRATEGIES) -> PageResult:
+    """Run strategies in order on a grayscale image until one finds an Arrow Tracker code"""
+    result = PageResult()
+    for strategy in strategies:
+        if not strategy.available:
+            continue
+        try:
+            payloads = strategy.run(image)
+        except cv2.error as e:
+            logger.warning(f"QR strategy {strategy.name} failed: {e}")
+            continue
+        for payload in payloads:
+            if payload in result.payloads:
+                continue
+            result.payloads.append(payload)
+            data = parse_arrow_tracker(payload)
+            if data is not None:
+                result.sessions.append(data)
+        if result.sessions:
+            result.strategy = strategy.name
+            break
+    return result
+
+
+def render_page(page, zoom: float = DEFAULT_ZOOM) -> np.ndarray:
+    """Rasterize a PyMuPDF page straight to a grayscale array"""
+    import fitz  # PyMuPDF
+
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+
+
+def embedded_images(page) -> Iterator[np.ndarray]:
+    """Grayscale arrays of the images placed on a page, padded with a white quiet zone"""
+    import fitz  # PyMuPDF
+
+    for info in page.get_images(full=True):
+        pix = fitz.Pixmap(page.parent, info[0])
+        if pix.width < MIN_EMBEDDED_SIZE or pix.height < MIN_EMBEDDED_SIZE:
+            continue
+        if pix.colorspace is None or pix.colorspace.n != 1 or pix.alpha:
+            pix = fitz.Pixmap(fitz.csGRAY, pix)
+        image = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+        yield cv2.copyMakeBorder(image, QUIET_ZONE, QUIET_ZONE, QUIET_ZONE, QUIET_ZONE, cv2.BORDER_CONSTANT, value=255)
+
+
+def decode_page(page, strategies: Tuple[Strategy, ...] = STRATEGIES, zoom: float = DEFAULT_ZOOM) -> PageResult:
+    """Decode a PyMuPDF page: its embedded images first, then a render of the whole page"""
+    result = PageResult()
+    for source, images in (('embedded', embedded_images(page)), ('render', (render_page(page, zoom),))):
+        for image in images:
+            found = decode_image(image, strategies)
+            result.payloads.extend(payload for payload in found.payloads if payload not in result.payloads)
+            result.sessions.extend(data for data in found.sessions if data not in result.sessions)
+            if found.sessions and result.strategy is None:
+                result.strategy, result.source = found.strategy, source
+        if result.sessions:
+            break
+    return result
+
+
+def decode_pdf(pdf_bytes: bytes, strategies: Tuple[Strategy, ...] = STRATEGIES, zoom: float = DEFAULT_ZOOM) -> Iterator[PageResult]:
+    """Decode every page of a PDF"""
+    import fitz  # PyMuPDF
+
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        for page in doc:
+            yield decode_page(page, strategies, zoom)
@@ -0,0 +1,367 @@
+"""
+Server-side PDF scorecard reports.
+
+The app used to build scorecard PDFs on the phone, which is slow for long
+sessions. A report is rendered here with PyMuPDF: an overview with the
+session's totals and averages, the score distribution and every round's
+shots. It carries the Arrow Tracker QR payload that /api/extract-qr reads
+back. Every generated code is decoded before it is placed on the page.
+If the cheap decoders cannot read it, the code is re-encoded at another
+error correction level, so a printed report always re-imports.
+
+Rendered PDFs are cached in memory per process, keyed by session id and
+updated_at (plus the bow type, which lives on the bow). Any edit to the
+session produces a new key. Batches of reports are rendered in a process
+pool so they do not hold up the event loop or each other.
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+import qrdecode
+import scoring
+from export import format_export_date
+
+try:
+    import qrcode
+except ImportError:  # qrcode is faster, OpenCV's encoder is always available
+    qrcode = None
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 50
+ACCENT = (0.545, 0.0, 0.0)  # the app's #8B0000
+LIGHT_ROW = (0.976, 0.976, 0.976)
+GRID = (0.867, 0.867, 0.867)
+MUTED = (0.4, 0.4, 0.4)
+
+# The names report.tsx shows for each target face
+TARGET_NAMES = {'wa_standard': 'WA Standard', 'vegas_3spot': 'Vegas 3-Spot', 'nfaa_indoor': 'WA Indoor'}
+
+QR_MODULE_PX = 8  # pixels per module in the embedded code image
+QR_QUIET_MODULES = 4
+QR_SIZE_PT = 150
+QR_CORRECTION_LEVELS = ('M', 'Q', 'L', 'H')  # tried in order until the code verifies
+# A generated code must be readable by the first pass of the extractor, not just its fallbacks
+QR_VERIFY_STRATEGIES = tuple(s for s in qrdecode.STRATEGIES if s.name in ('pyzbar', 'opencv'))
+
+CacheKey = Tuple[str, str, str]  # (session id, updated_at, bow type)
+
+
+def qr_payload(session: Dict, bow_type: str) -> str:
+    """The QR payload format the app exports and extract_qr_from_pdfs reads"""
+    return json.dumps({
+        'v': 1,
+        't': qrdecode.ARROW_TRACKER_TYPE,
+        'n': session.get('name') or session.get('id', '')[:8],
+        's': session.get('total_score', 0),
+        'b': bow_type,
+        'd': session.get('distance') or '',
+        'dt': format_export_date(session.get('created_at')),
+    }, separators=(',', ':'))
+
+
+def qr_modules(payload: str, level: str) -> np.ndarray:
+    """The code's modules as a grayscale array, one pixel per module, with a quiet zone"""
+    if qrcode is not None:
+        code = qrcode.QRCode(error_correction=getattr(qrcode.constants, f"ERROR_CORRECT_{level}"), border=QR_QUIET_MODULES)
+        code.add_data(payload)
+        code.make(fit=True)
+        return np.where(np.array(code.get_matrix()), 0, 255).astype(np.uint8)
+    params = cv2.QRCodeEncoder_Params()
+    params.correction_level = getattr(cv2, f"QRCodeEncoder_CORRECT_LEVEL_{level}")
+    modules = cv2.QRCodeEncoder.create(params).encode(payload)
+    # The encoder's own border is narrower than the 4 modules scanners expect
+    return cv2.copyMakeBorder(modules, *(QR_QUIET_MODULES,) * 4, cv2.BORDER_CONSTANT, value=255)
+
+
+def qr_image(payload: str) -> np.ndarray:
+    """A grayscale image of the payload's QR code, verified to decode"""
+    for level in QR_CORRECTION_LEVELS:
+        modules = qr_modules(payload, level)
+        image = cv2.resize(modules, None, fx=QR_MODULE_PX, fy=QR_MODULE_PX, interpolation=cv2.INTER_NEAREST)
+        if payload in qrdecode.decode_image(image, QR_VERIFY_STRATEGIES).payloads:
+            return image
+    raise ValueError("QR code for the report payload could not be verified at any correction level")
+
+
+def ring_label(ring: int) -> str:
+    if ring == scoring.X_RING:
+        return 'X'
+    if ring == scoring.MISS:
+        return 'M'
+    return str(ring)
+
+
+def session_stats(session: Dict) -> Dict:
+    rounds = session.get('rounds', [])
+    rings = [shot.get('ring', 0) for round_data in rounds for shot in round_data.get('shots', [])]
+    total = session.get('total_score', 0)
+    return {
+        'rounds': len(rounds),
+        'arrows': len(rings),
+        'total': total,
+        'per_round': total / len(rounds) if rounds else 0.0,
+        'per_arrow': total / len(rings) if rings else 0.0,
+        'xs': rings.count(scoring.X_RING),
+        'tens': sum(1 for ring in rings if ring >= 10),
+        'misses': rings.count(scoring.MISS),
+        # Highest ring first, X above 10 and misses last
+        'distribution': sorted(((ring, rings.count(ring)) for ring in set(rings)), reverse=True),
+    }
+
+
+class ReportWriter:
+    """Lays out text and tables top to bottom, starting new pages as they fill
+
+    Drawing is batched per page, one Shape for the rectangles and one
+    TextWriter per colour, and written when the page is done: committing
+    every call to the page separately re-parses its contents each time.
+    """
+
+    def __init__(self, doc, session_name: str):
+        import fitz  # PyMuPDF
+
+        self.doc = doc
+        self.session_name = session_name
+        self.fonts = {False: fitz.Font('helv'), True: fitz.Font('hebo')}
+        self.page = None
+        self.shape = None
+        self.writers = {}  # colour -> TextWriter for the current page
+        self.y = 0.0
+        self.new_page()
+
+    def new_page(self):
+        import fitz  # PyMuPDF
+
+        if self.page is not None:
+            self.write_page()
+        self.page = self.doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        self.shape = self.page.new_shape()
+        self.writers = {}
+        self.rect(fitz.Rect(0, 0, PAGE_WIDTH, 8), fill=ACCENT)
+        self.y = MARGIN
+
+    def write_page(self):
+        self.shape.commit()
+        for color, writer in self.writers.items():
+            writer.write_text(self.page, color=color)
+
+    def ensure(self, height: float):
+        if self.y + height > PAGE_HEIGHT - MARGIN:
+            self.new_page()
+
+    def rect(self, rect, fill, border=None):
+        self.shape.draw_rect(rect)
+        self.shape.finish(color=border, fill=fill, width=0.5)
+
+    def text(self, x: float, value: str, size: float = 10, bold: bool = False, color=(0, 0, 0), right: Optional[float] = None):
+        import fitz  # PyMuPDF
+
+        font = self.fonts[bold]
+        if right is not None:
+            x = right - font.text_length(value, fontsize=size)
+        if color not in self.writers:
+            self.writers[color] = fitz.TextWriter(self.page.rect)
+        self.writers[color].append((x, self.y), value, font=font, fontsize=size)
+
+    def heading(self, value: str):
+        self.ensure(40)
+        self.y += 24
+        self.text(MARGIN, value, size=14, bold=True, color=ACCENT)
+        self.y += 10
+
+    def table(self, columns: List[Tuple[str, float, bool]], rows: Iterable[List[str]], row_height: float = 18):
+        """columns are (title, width, right aligned); the header repeats on every page"""
+        import fitz  # PyMuPDF
+
+        def header():
+            self.ensure(2 * row_height)
+            self.rect(fitz.Rect(MARGIN, self.y, PAGE_WIDTH - MARGIN, self.y + row_height), fill=ACCENT)
+            self.cells(columns, [title for title, _, _ in columns], row_height, bold=True, color=(1, 1, 1))
+
+        header()
+        for index, row in enumerate(rows):
+            if self.y + row_height > PAGE_HEIGHT - MARGIN:
+                self.new_page()
+                header()
+            rect = fitz.Rect(MARGIN, self.y, PAGE_WIDTH - MARGIN, self.y + row_height)
+            self.rect(rect, fill=LIGHT_ROW if index % 2 == 0 else (1, 1, 1), border=GRID)
+            self.cells(columns, row, row_height)
+
+    def cells(self, columns, values, row_height: float, bold: bool = False, color=(0, 0, 0)):
+        top, x = self.y, MARGIN
+        self.y = top + row_height - 5
+        for (_, width, right), value in zip(columns, values):
+            self.text(x + 6, value, bold=bold, color=color, right=x + width - 6 if right else None)
+            x += width
+        self.y = top + row_height
+
+    def finish(self):
+        """Write the last page, then number every page now that the count is known"""
+        import fitz  # PyMuPDF
+
+        self.write_page()
+        generated = datetime.utcnow().strftime('%Y-%m-%d')
+        font = self.fonts[False]
+        for index, page in enumerate(self.doc):
+            label = f"Page {index + 1}/{self.doc.page_count}"
+            writer = fitz.TextWriter(page.rect)
+            writer.append((MARGIN, PAGE_HEIGHT - 25), f"Arrow Tracker - {self.session_name} - generated {generated}", font=font, fontsize=8)
+            writer.append((PAGE_WIDTH - MARGIN - font.text_length(label, fontsize=8), PAGE_HEIGHT - 25), label, font=font, fontsize=8)
+            writer.write_text(page, color=MUTED)
+
+
+def render_report(session: Dict, bow_type: str = 'Unknown') -> bytes:
+    """Render a session's scorecard PDF. Runs in the report worker processes, so it only uses its arguments."""
+    import fitz  # PyMuPDF
+
+    payload = qr_payload(session, bow_type)
+    fields = json.loads(payload)
+    name = fields['n']
+    stats = session_stats(session)
+
+    doc = fitz.open()
+    out = ReportWriter(doc, name)
+    out.y += 20
+    out.text(MARGIN, "Arrow Tracker Session Report", size=20, bold=True, color=ACCENT)
+    out.y += 22
+    out.text(MARGIN, name, size=14, bold=True)
+
+    overview_top = out.y + 16
+    qr = qr_image(payload)
+    qr_rect = fitz.Rect(PAGE_WIDTH - MARGIN - QR_SIZE_PT, overview_top, PAGE_WIDTH - MARGIN, overview_top + QR_SIZE_PT)
+    out.page.insert_image(qr_rect, stream=cv2.imencode('.png', qr)[1].tobytes())
+
+    overview = [
+        ("Date", fields['dt'] or '-'),
+        ("Bow", f"{session.get('bow_name') or '-'} ({bow_type})"),
+        ("Distance", session.get('distance') or '-'),
+        ("Target", TARGET_NAMES.get(session.get('target_type'), TARGET_NAMES[scoring.DEFAULT_TARGET_TYPE])),
+        ("Rounds", str(stats['rounds'])),
+        ("Arrows", str(stats['arrows'])),
+        ("Total score", str(stats['total'])),
+        ("Average per round", f"{stats['per_round']:.1f}"),
+        ("Average per arrow", f"{stats['per_arrow']:.2f}"),
+        ("X / 10+ / misses", f"{stats['xs']} / {stats['tens']} / {stats['misses']}"),
+    ]
+    out.y = overview_top
+    for label, value in overview:
+        out.y += 16
+        out.text(MARGIN, label, color=MUTED)
+        out.text(MARGIN + 120, value, bold=label == "Total score")
+    out.y = qr_rect.y1 + 12
+    out.text(qr_rect.x0 + 22, "Scan to import this session", size=8, color=MUTED)
+    out.y = max(out.y, overview_top + 16 * len(overview))
+
+    if stats['distribution']:
+        out.heading("Score Distribution")
+        out.table(
+            [("Ring", 120, False), ("Arrows", 120, True), ("Share", 120, True)],
+            ([ring_label(ring), str(count), f"{count / stats['arrows']:.1%}"] for ring, count in stats['distribution']),
+        )
+
+    out.heading("Rounds")
+    running = 0
+    rows = []
+    for round_data in session.get('rounds', []):
+        running += round_data.get('total_score', 0)
+        rings = [shot.get('ring', 0) for shot in round_data.get('shots', [])]
+        rows.append([
+            str(round_data.get('round_number', '')),
+            ' '.join(ring_label(ring) for ring in sorted(rings, reverse=True)),
+            str(round_data.get('total_score', 0)),
+            str(running),
+        ])
+    if rows:
+        out.table([("Round", 60, False), ("Shots", 295, False), ("Score", 70, True), ("Total", 70, True)], rows)
+    else:
+        out.y += 6
+        out.text(MARGIN, "No rounds scored yet.", color=MUTED)
+
+    out.finish()
+    pdf = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return pdf
+
+
+def cache_key(session: Dict, bow_type: str) -> CacheKey:
+    return session['id'], str(session.get('updated_at', '')), bow_type
+
+
+class ReportRenderer:
+    """An LRU cache of rendered reports in front of a lazily started process pool"""
+
+    def __init__(self, max_entries: int = 256, workers: Optional[int] = None):
+        self.max_entries = max_entries
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.entries: 'OrderedDict[CacheKey, bytes]' = OrderedDict()
+        self.lock = threading.Lock()
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def cached(self, key: CacheKey) -> Optional[bytes]:
+        with self.lock:
+            pdf = self.entries.get(key)
+            if pdf is None:
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return pdf
+
+    def store(self, key: CacheKey, pdf: bytes):
+        with self.lock:
+            self.entries[key] = pdf
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def executor(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.pool is None:
+                # Spawned, not forked: the server process runs threads (Firestore, write-behind) that fork would not carry
+                self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self.pool
+
+    async def render(self, session: Dict, bow_type: str) -> Tuple[bytes, bool]:
+        """A session's report and whether it came from the cache. A single report renders in a thread."""
+        key = cache_key(session, bow_type)
+        pdf = self.cached(key)
+        if pdf is not None:
+            return pdf, True
+        pdf = await asyncio.get_running_loop().run_in_executor(None, render_report, session, bow_type)
+        self.store(key, pdf)
+        return pdf, False
+
+    async def render_many(self, sessions: List[Tuple[Dict, str]]) -> List[bytes]:
+        """Reports for (session, bow type) pairs in order, rendering the uncached ones across the process pool"""
+        loop = asyncio.get_running_loop()
+        keys = [cache_key(session, bow_type) for session, bow_type in sessions]
+        pdfs = [self.cached(key) for key in keys]
+        missing = [index for index, pdf in enumerate(pdfs) if pdf is None]
+        if missing:
+            pool = self.executor()
+            rendered = await asyncio.gather(*(loop.run_in_executor(pool, render_report, *sessions[index]) for index in missing))
+            for index, pdf in zip(missing, rendered):
+                self.store(keys[index], pdf)
+                pdfs[index] = pdf
+        return pdfs
+
+    def metrics(self) -> Dict:
+        with self.lock:
+            return dict(self.stats, cached=len(self.entries), workers=self.workers, pool_started=self.pool is not None)
+
+    def shutdown(self):
+        with self.lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,194 @@
+"""
+Precomputed time-series rollups for progress charts.
+
+Each (owner, bow, distance, year) has one document in the `rollups`
+collection holding daily, weekly and monthly buckets of arrow statistics:
+
+    {'owner_id', 'bow_id', 'distance', 'year',
+     'day':   {'2026-03-14': {'sum', 'count', 'sumsq', 'ends', 'sessions', 'score', 'hist': {'10': n, ...}}},
+     'week':  {'2026-03-09': {...}},   # keyed by the Monday of the week
+     'month': {'2026-03': {...}}}
+
+sum, count, sumsq, ends and hist describe arrows; score is the sessions'
+points, which also counts rounds recorded as a total only (e.g. from a
+CSV import) that have no arrows or ends.
+
+Buckets are dated by the session's created_at, and sit in the document
+of its year. A week that runs past New Year is therefore split between
+two documents under the same Monday key; merge_periods adds the halves
+back together when given both years' documents. Writes apply the
+difference between a session's previous and new contents as Firestore
+increments, so a round update costs one rollup write and a year of chart
+data is a single document read.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from owners import owner_of
+
+ROLLUP_COLLECTION = 'rollups'
+GRANULARITIES = ('day', 'week', 'month')
+STAT_FIELDS = ('sum', 'count', 'sumsq', 'ends', 'sessions', 'score')
+NO_BOW = '_none'
+NO_DISTANCE = '_none'
+
+DocKey = Tuple[str, str, str, int]  # (owner_id, bow_id, distance, year)
+
+
+def rollup_doc_id(owner_id: str, bow_id: Optional[str], distance: Optional[str], year: int) -> str:
+    distance = (distance or NO_DISTANCE).strip().replace('/', '-') or NO_DISTANCE
+    return f"{owner_id}|{year}|{bow_id or NO_BOW}|{distance}"
+
+
+def parse_created_at(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    return None
+
+
+def period_keys(day: datetime) -> Dict[str, str]:
+    monday = day - timedelta(days=day.weekday())
+    return {
+        'day': day.strftime('%Y-%m-%d'),
+        'week': monday.strftime('%Y-%m-%d'),
+        'month': day.strftime('%Y-%m'),
+    }
+
+
+def session_stats(session: Optional[Dict]) -> Optional[Tuple[DocKey, Dict]]:
+    """The document key and arrow statistics a session contributes, or None"""
+    if not session or not session.get('rounds'):
+        return None
+    created_at = parse_created_at(session.get('created_at'))
+    if created_at is None:
+        return None
+    stats = {'sum': 0, 'count': 0, 'sumsq': 0, 'ends': 0, 'sessions': 1, 'score': 0, 'hist': defaultdict(int)}
+    for round_data in session['rounds']:
+        shots = round_data.get('shots') or []
+        if not shots:
+            stats['score'] += round_data.get('total_score') or 0
+            continue
+        stats['ends'] += 1
+        for shot in shots:
+            ring = shot.get('ring') or 0
+            value = 10 if ring == 11 else ring
+            stats['score'] += value
+            stats['sum'] += value
+            stats['count'] += 1
+            stats['sumsq'] += value * value
+            stats['hist'][str(ring)] += 1
+    key = (
+        owner_of(session),
+        session.get('bow_id') or NO_BOW,
+        (session.get('distance') or NO_DISTANCE).strip() or NO_DISTANCE,
+        created_at.year,
+    )
+    return key, {'periods': period_keys(created_at), 'stats': stats}
+
+
+def _add(deltas: Dict, key: DocKey, contribution: Dict, sign: int):
+    doc = deltas.setdefault(key, {g: {} for g in GRANULARITIES})
+    for granularity, period in contribution['periods'].items():
+        bucket = doc[granularity].setdefault(period, {'hist': defaultdict(int)})
+        for field in STAT_FIELDS:
+            bucket[field] = bucket.get(field, 0) + sign * contribution['stats'][field]
+        for ring, n in contribution['stats']['hist'].items():
+            bucket['hist'][ring] += sign * n
+
+
+def _prune(deltas: Dict) -> Dict:
+    """Drop zero increments so unchanged sessions cost no write"""
+    pruned = {}
+    for key, doc in deltas.items():
+        kept = {}
+        for granularity, periods in doc.items():
+            for period, bucket in periods.items():
+                values = {f: bucket[f] for f in STAT_FIELDS if bucket.get(f)}
+                hist = {ring: n for ring, n in bucket['hist'].items() if n}
+                if hist:
+                    values['hist'] = hist
+                if values:
+                    kept.setdefault(granularity, {})[period] = values
+        if kept:
+            pruned[key] = kept
+    return pruned
+
+
+def session_deltas(before: Optional[Dict], after: Optional[Dict]) -> Dict[DocKey, Dict]:
+    """Per-document nested increments that turn `before`'s contribution into `after`'s"""
+    deltas = {}
+    for session, sign in ((before, -1), (after, 1)):
+        contribution = session_stats(session)
+        if contribution is not None:
+            _add(deltas, contribution[0], contribution[1], sign)
+    return _prune(deltas)
+
+
+def accumulate(sessions: Iterable[Dict], totals: Optional[Dict] = None) -> Dict[DocKey, Dict]:
+    """Add the contributions of sessions to running totals (used to rebuild from scratch)"""
+    totals = {} if totals is None else totals
+    for session in sessions:
+        contribution = session_stats(session)
+        if contribution is not None:
+            _add(totals, contribution[0], contribution[1], 1)
+    return totals
+
+
+def rollup_documents(rollups: Dict[DocKey, Dict], increment=None):
+    """(document id, body) pairs for rollups; values are wrapped with `increment` when given
+
+    `increment` is firestore.Increment for delta writes, passed in so this
+    module stays free of the Firebase import; full rebuilds write plain values.
+    """
+    wrap = increment or (lambda value: value)
+    for (owner_id, bow_id, distance, year), doc in _prune(rollups).items():
+        body = {'owner_id': owner_id, 'bow_id': bow_id, 'distance': distance, 'year': year}
+        for granularity, periods in doc.items():
+            body[granularity] = {
+                period: {
+                    field: ({ring: wrap(n) for ring, n in value.items()} if field == 'hist' else wrap(value))
+                    for field, value in bucket.items()
+                }
+                for period, bucket in periods.items()
+            }
+        yield rollup_doc_id(owner_id, bow_id, distance, year), body
+
+
+def apply_deltas(db, deltas: Dict[DocKey, Dict], increment):
+    """Write increments with one merged set per rollup document"""
+    for doc_id, body in rollup_documents(deltas, increment):
+        db.collection(ROLLUP_COLLECTION).document(doc_id).set(body, merge=True)
+
+
+def merge_periods(docs: Iterable[Dict], granularity: str, year: Optional[int] = None) -> Dict[str, Dict]:
+    """Combine one granularity of several rollup documents and add arrow mean/stddev and session_mean per period
+
+    With `year`, only periods whose key falls in that year are kept, e.g.
+    the weeks of a year read from its own and the following year's documents.
+    """
+    merged = {}
+    for doc in docs:
+        for period, bucket in (doc.get(granularity) or {}).items():
+            if year is not None and not period.startswith(f"{year}-"):
+                continue
+            target = merged.setdefault(period, {field: 0 for field in STAT_FIELDS})
+            target.setdefault('hist', {})
+            for field in STAT_FIELDS:
+                target[field] += bucket.get(field, 0)
+            for ring, n in (bucket.get('hist') or {}).items():
+                target['hist'][ring] = target['hist'].get(ring, 0) + n
+    merged = {period: bucket for period, bucket in merged.items() if bucket['sessions']}
+    for bucket in merged.values():
+        bucket['session_mean'] = round(bucket['score'] / bucket['sessions'], 3)
+        bucket['hist'] = {ring: n for ring, n in bucket['hist'].items() if n}
+        count = bucket['count']
+        bucket['mean'] = round(bucket['sum'] / count, 3) if count else 0
+        variance = bucket['sumsq'] / count - (bucket['sum'] / count) ** 2 if count else 0
+        bucket['stddev'] = round(max(variance, 0) ** 0.5, 3)
+    return dict(sorted(merged.items()))
@@ -0,0 +1,198 @@
+"""
+Server-side scoring of arrow positions for the supported target faces.
+
+Shot coordinates are normalized to the target image the app renders
+(0..1 on both axes, face centred at 0.5 with a radius of 0.475), the same
+convention as calculateScore in frontend/app/scoring.tsx. A ring value of
+11 is an X: it is stored as 11 so X counts can be kept, and scores 10.
+
+Ring lookups are vectorized: squared ring radii are precomputed per target
+face and line-cutter allowance, and whole batches of shots are scored
+with a single searchsorted call.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+TARGET_CENTER = 0.5
+TARGET_RADIUS = 0.475
+X_RING = 11
+MISS = 0
+VALID_RINGS = range(MISS, X_RING + 1)
+DEFAULT_TARGET_TYPE = 'wa_standard'
+
+
+@dataclass(frozen=True)
+class TargetFace:
+    """Ring boundaries as fractions of the face radius, innermost first, and the ring scored inside each"""
+    radii: Tuple[float, ...]
+    rings: Tuple[int, ...]
+
+
+TARGET_FACES: Dict[str, TargetFace] = {
+    'wa_standard': TargetFace(
+        radii=(0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+        rings=(X_RING, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1),
+    ),
+    'vegas_3spot': TargetFace(
+        radii=(0.1, 0.2, 0.4, 0.6, 0.8, 1.0),
+        rings=(X_RING, 10, 9, 8, 7, 6),
+    ),
+    'nfaa_indoor': TargetFace(
+        radii=(0.1, 0.2, 0.4, 0.6, 0.8, 1.0),
+        rings=(X_RING, 10, 9, 8, 7, 6),
+    ),
+}
+
+
+def get_target_face(target_type: str) -> TargetFace:
+    """Look up a target face, falling back to the WA standard face like the app does"""
+    return TARGET_FACES.get(target_type or DEFAULT_TARGET_TYPE, TARGET_FACES[DEFAULT_TARGET_TYPE])
+
+
+@lru_cache(maxsize=64)
+def ring_table(target_type: str, arrow_radius: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Squared ring radii (normalized image units) and ring values, with a miss appended
+
+    An arrow scores the higher ring when its shaft touches the line, so
+    each boundary is widened by `arrow_radius` (a fraction of the face
+    radius) before squaring. With arrow_radius=0 a shot exactly on a line
+    still scores the higher ring, matching the app.
+    """
+    face = get_target_face(target_type)
+    radii = (np.asarray(face.radii, dtype=np.float64) + arrow_radius) * TARGET_RADIUS
+    squared = radii * radii
+    rings = np.asarray(face.rings + (MISS,), dtype=np.int8)
+    squared.setflags(write=False)
+    rings.setflags(write=False)
+    return squared, rings
+
+
+def score_shots(x, y, target_type: str = DEFAULT_TARGET_TYPE, arrow_radius: float = 0.0) -> np.ndarray:
+    """Ring values for arrays of normalized shot positions on one target face"""
+    dx = np.asarray(x, dtype=np.float64) - TARGET_CENTER
+    dy = np.asarray(y, dtype=np.float64) - TARGET_CENTER
+    squared, rings = ring_table(target_type, arrow_radius)
+    return rings[np.searchsorted(squared, dx * dx + dy * dy, side='left')]
+
+
+def score_batch(x, y, target_types: Sequence[str], arrow_radius: float = 0.0) -> np.ndarray:
+    """Ring values for shots spread over several target faces (one target type per shot)"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    faces, codes = np.unique(np.asarray(target_types), return_inverse=True)
+    result = np.zeros(x.shape, dtype=np.int8)
+    for code, target_type in enumerate(faces):
+        mask = codes == code
+        result[mask] = score_shots(x[mask], y[mask], str(target_type), arrow_radius)
+    return result
+
+
+def points(rings) -> np.ndarray:
+    """Points for ring values, with X counted as 10"""
+    rings = np.asarray(rings)
+    return np.where(rings == X_RING, 10, rings)
+
+
+def has_position(x, y) -> np.ndarray:
+    """Shots entered without a target position (manual scores, padding) are stored at 0,0"""
+    return (np.asarray(x) != 0) | (np.asarray(y) != 0)
+
+
+def score_round(shots: Iterable[dict], target_type: str = DEFAULT_TARGET_TYPE) -> Tuple[List[int], int, List[bool]]:
+    """Ring values, round total and which rings were computed, for shot dicts
+
+    Shots that carry a ring keep it: the app sends rings the archer
+    corrected by hand and pads missing arrows as misses at the centre.
+    Shots sent without one are scored from their x/y position, and only
+    those are flagged as computed. Raises ValueError for a sent ring
+    outside MISS..X_RING, the values the app's ring editor offers on every face.
+    """
+    shots = list(shots)
+    for shot in shots:
+        ring = shot.get('ring')
+        if ring is not None and (isinstance(ring, bool) or not isinstance(ring, (int, float)) or ring not in VALID_RINGS):
+            raise ValueError(f"Invalid ring {ring!r}: rings run from {MISS} (miss) to {X_RING} (X)")
+    rings = np.array([shot.get('ring') if shot.get('ring') is not None else -1 for shot in shots], dtype=np.int8)
+    unscored = rings < 0
+    if unscored.any():
+        x = np.array([shot.get('x', 0) for shot in shots], dtype=np.float64)
+        y = np.array([shot.get('y', 0) for shot in shots], dtype=np.float64)
+        rings[unscored] = score_shots(x[unscored], y[unscored], target_type)
+    return rings.tolist(), int(points(rings).sum()), unscored.tolist()
+
+
+def rescore_sessions(sessions: List[dict]) -> List[dict]:
+    """Recompute rings from x/y and all totals for a page of sessions, in place
+
+    Every shot on the page is scored in one vectorized call, but only
+    rings the server computed from x/y (shots stored with
+    scored_from_position) are replaced: sent rings may be corrections or
+    padded misses, and shots without the flag, including all written before
+    it existed, keep their ring. Rounds without shots (score-only rounds,
+    e.g. from a CSV import) keep their stored total. Returns one diff per
+    session whose positioned rings disagree with x/y or whose totals
+    changed, in the form
+    {'session_id', 'rings': [{'round_id', 'shot_id', 'old', 'new', 'computed'}],
+     'rounds': [{'round_id', 'old', 'new'}], 'total_score': {'old', 'new'}},
+    where ring entries with computed=False were reported but not applied.
+    """
+    shot_refs = []
+    round_refs = []
+    round_keys, xs, ys, old_rings, computed, target_types = [], [], [], [], [], []
+    for session in sessions:
+        target_type = session.get('target_type') or DEFAULT_TARGET_TYPE
+        for round_data in session.get('rounds', []):
+            round_refs.append((session, round_data))
+            for shot in round_data.get('shots', []):
+                shot_refs.append((session, round_data, shot))
+                round_keys.append(len(round_refs) - 1)
+                xs.append(shot.get('x', 0))
+                ys.append(shot.get('y', 0))
+                old_rings.append(shot.get('ring') if shot.get('ring') is not None else 0)
+                computed.append(bool(shot.get('scored_from_position')))
+                target_types.append(target_type)
+
+    diffs = {}
+
+    def diff_for(session):
+        return diffs.setdefault(session.get('id'), {
+            'session_id': session.get('id'), 'rings': [], 'rounds': [], 'total_score': None,
+        })
+
+    round_totals = np.zeros(len(round_refs), dtype=np.int64)
+    if shot_refs:
+        old = np.asarray(old_rings, dtype=np.int16)
+        scored = np.where(has_position(xs, ys), score_batch(xs, ys, target_types), old)
+        applied = np.asarray(computed, dtype=bool)
+        for i in np.flatnonzero(scored != old):
+            session, round_data, shot = shot_refs[i]
+            diff_for(session)['rings'].append({
+                'round_id': round_data.get('id'), 'shot_id': shot.get('id'),
+                'old': int(old[i]), 'new': int(scored[i]), 'computed': bool(applied[i]),
+            })
+            if applied[i]:
+                shot['ring'] = int(scored[i])
+        new = np.where(applied, scored, old)
+        round_totals = np.bincount(round_keys, weights=points(new), minlength=len(round_refs)).astype(np.int64)
+    has_shots = np.zeros(len(round_refs), dtype=bool)
+    has_shots[round_keys] = True
+    stored_totals = np.array([round_data.get('total_score') or 0 for _, round_data in round_refs], dtype=np.int64)
+    round_totals = np.where(has_shots, round_totals, stored_totals)
+
+    session_totals = {}
+    for (session, round_data), total in zip(round_refs, round_totals.tolist()):
+        if round_data.get('total_score') != total:
+            diff_for(session)['rounds'].append({'round_id': round_data.get('id'), 'old': round_data.get('total_score'), 'new': total})
+            round_data['total_score'] = total
+        session_totals[session.get('id')] = session_totals.get(session.get('id'), 0) + total
+
+    for session in sessions:
+        total = session_totals.get(session.get('id'), 0)
+        if session.get('total_score') != total:
+            diff_for(session)['total_score'] = {'old': session.get('total_score'), 'new': total}
+            session['total_score'] = total
+
+    return list(diffs.values())
@@ -0,0 +1,158 @@
+"""
+In-process inverted index for searching sessions and bows.
+
+Session name, bow name and distance, and bow name, type and notes are
+tokenized into a postings map (token -> {document: field weight}). A
+sorted vocabulary gives prefix lookups with bisect, so the last word of a
+query matches as you type. Like the leaderboard, the index is built from
+storage at startup and kept current by the create/update/delete routes.
+"""
+import bisect
+import heapq
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[0-9a-zà-ÿ]+")
+
+SESSION_FIELDS = (('name', 3), ('bow_name', 2), ('distance', 1))
+BOW_FIELDS = (('name', 3), ('bow_type', 2), ('notes', 1))
+
+DocKey = Tuple[str, str]  # (kind, id)
+
+# Up to this many completions, a prefix is matched by probing their postings;
+# beyond it, by scanning each candidate document's own tokens
+PREFIX_PROBE_TOKENS = 8
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return TOKEN_PATTERN.findall(str(text).lower()) if text else []
+
+
+class SearchIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.postings: Dict[str, Dict[DocKey, int]] = {}
+        self.vocabulary: List[str] = []
+        self.documents: Dict[DocKey, Tuple[Dict[str, int], Dict]] = {}
+
+    def clear(self):
+        with self.lock:
+            self.postings.clear()
+            self.vocabulary.clear()
+            self.documents.clear()
+
+    def _add(self, key: DocKey, fields, source: Dict, summary: Dict):
+        weights: Dict[str, int] = {}
+        for field, weight in fields:
+            for token in tokenize(source.get(field)):
+                weights[token] = max(weights.get(token, 0), weight)
+        with self.lock:
+            self.remove(*key)
+            for token, weight in weights.items():
+                if token not in self.postings:
+                    self.postings[token] = {}
+                    bisect.insort(self.vocabulary, token)
+                self.postings[token][key] = weight
+            self.documents[key] = (weights, summary)
+
+    def add_session(self, session: Dict):
+        self._add(('session', session['id']), SESSION_FIELDS, session, {
+            'kind': 'session',
+            'id': session['id'],
+            'name': session.get('name', ''),
+            'bow_name': session.get('bow_name'),
+            'distance': session.get('distance'),
+            'total_score': session.get('total_score', 0),
+            'created_at': str(session.get('created_at', '')),
+        })
+
+    def add_bow(self, bow: Dict):
+        self._add(('bow', bow['id']), BOW_FIELDS, bow, {
+            'kind': 'bow',
+            'id': bow['id'],
+            'name': bow.get('name', ''),
+            'bow_type': bow.get('bow_type'),
+            'notes': bow.get('notes', ''),
+            'created_at': str(bow.get('created_at', '')),
+        })
+
+    def remove(self, kind: str, doc_id: str):
+        with self.lock:
+            entry = self.documents.pop((kind, doc_id), None)
+            if entry is None:
+                return
+            for token in entry[0]:
+                postings = self.postings[token]
+                postings.pop((kind, doc_id), None)
+                if not postings:
+                    del self.postings[token]
+                    del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+
+    def _prefix_tokens(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + '\uffff', lo=start)
+        return self.vocabulary[start:end]
+
+    def search(self, query: str, kind: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """Documents matching every query word (the last one as a prefix), best first
+
+        A document scores the field weight of each word it matches, doubled
+        for whole-word matches; ties go to the most recent document. Terms
+        are intersected smallest posting list first, so the cost follows
+        the rarest word rather than the index size.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        *whole_words, prefix = words
+        with self.lock:
+            prefix_tokens = self._prefix_tokens(prefix)
+            terms = [(len(self.postings.get(word, ())), False, word) for word in whole_words]
+            terms.append((sum(len(self.postings[token]) for token in prefix_tokens), True, prefix))
+            terms.sort()
+
+            scores: Optional[Dict[DocKey, int]] = None
+            for size, is_prefix, word in terms:
+                if not size:
+                    return []
+                if scores is None and is_prefix:
+                    scores = {}
+                    for token in prefix_tokens:
+                        factor = 2 if token == prefix else 1
+                        for key, weight in self.postings[token].items():
+                            scores[key] = max(scores.get(key, 0), weight * factor)
+                elif scores is None:
+                    scores = {key: weight * 2 for key, weight in self.postings[word].items()}
+                elif is_prefix:
+                    matched = {}
+                    few_tokens = len(prefix_tokens) <= PREFIX_PROBE_TOKENS
+                    for key, score in scores.items():
+                        if few_tokens:
+                            weights = ((self.postings[token].get(key, 0), token) for token in prefix_tokens)
+                        else:
+                            weights = ((weight, token) for token, weight in self.documents[key][0].items() if token.startswith(prefix))
+                        best = max((weight * (2 if token == prefix else 1) for weight, token in weights), default=0)
+                        if best:
+                            matched[key] = score + best
+                    scores = matched
+                else:
+                    postings = self.postings[word]
+                    scores = {key: score + postings[key] * 2 for key, score in scores.items() if key in postings}
+                if not scores:
+                    return []
+
+            if kind is not None:
+                scores = {key: score for key, score in scores.items() if key[0] == kind}
+            ranked = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], self.documents[item[0]][1]['created_at']))
+            return [dict(self.documents[key][1], score=score) for key, score in ranked]
+
+    def autocomplete(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """Indexed words starting with the last word of `prefix`, most frequent first"""
+        words = tokenize(prefix)
+        if not words:
+            return []
+        with self.lock:
+            terms = [(token, len(self.postings[token])) for token in self._prefix_tokens(words[-1])]
+        terms.sort(key=lambda term: (-term[1], term[0]))
+        return [{'term': token, 'count': count} for token, count in terms[:limit]]
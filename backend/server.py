@@ -1,16 +1,42 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 import uuid
 from datetime import datetime
+import base64
+import copy
+import io
+from dataclasses import asdict
 import json
+import zipfile
 import firebase_admin
 from firebase_admin import credentials, firestore
+from compression import CompressionMiddleware, preferred_option
+import csvimport
+import export
+import scoring
+from jobs import JOB_COLLECTION, MAX_BATCH_WRITES, job_manager
+from leaderboard import LeaderboardIndex
+from search import SearchIndex
+from writebehind import WriteBehindBuffer
+from idempotency import IdempotencyStore, idempotent
+from broker import SessionBroker
+from owners import ADMIN_HEADER, DEFAULT_OWNER, OWNER_HEADER, owner_of, request_is_admin, request_owner
+from report import ReportRenderer
+import rollups
+
+try:
+    import msgpack
+except ImportError:  # MessagePack responses are optional, JSON is always served
+    msgpack = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -60,6 +86,7 @@ class Shot(BaseModel):
     y: float
     ring: int
     confirmed: bool = False
+    scored_from_position: bool = False  # ring computed by the server from x/y; only these are rescored
 
 class Round(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -70,6 +97,7 @@ class Round(BaseModel):
 
 class Session(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    owner_id: str = DEFAULT_OWNER
     name: str = ""
     bow_id: Optional[str] = None
     bow_name: Optional[str] = None
@@ -97,6 +125,7 @@ class UpdateSessionRequest(BaseModel):
 
 class Bow(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    owner_id: str = DEFAULT_OWNER
     name: str
     bow_type: str
     draw_weight: Optional[float] = None
@@ -126,6 +155,30 @@ class AddRoundRequest(BaseModel):
 class UpdateRoundRequest(BaseModel):
     shots: List[dict]
 
+# ============== Content Negotiation ==============
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+JSON_MEDIA_TYPE = "application/json"
+
+def negotiated_response(http_request: Request, payload):
+    """Encode session/round/shot payloads as MessagePack when the client's Accept header prefers it to JSON"""
+    accept = http_request.headers.get("accept", "")
+    media_types = (JSON_MEDIA_TYPE, *MSGPACK_MEDIA_TYPES) if msgpack is not None else (JSON_MEDIA_TYPE,)
+    content = jsonable_encoder(payload)
+    # Both encodings vary with Accept, so caches must not serve one for the other
+    if preferred_option(accept, media_types) in MSGPACK_MEDIA_TYPES:
+        return Response(content=msgpack.packb(content, use_bin_type=True), media_type=MSGPACK_MEDIA_TYPES[0], headers={"Vary": "Accept"})
+    return JSONResponse(content=content, headers={"Vary": "Accept"})
+
+# ============== Idempotency ==============
+
+# Responses of creates sent with an Idempotency-Key, replayed when the app retries
+idempotency_store = IdempotencyStore(
+    ttl=float(os.environ.get('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600))),
+    max_entries=int(os.environ.get('IDEMPOTENCY_MAX_KEYS', '10000')),
+    scope_header=OWNER_HEADER,
+)
+
 # ============== API Routes ==============
 
 @api_router.get("/")
@@ -136,11 +189,120 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+# In-process indexes, one per owner, built from storage at startup and kept current by the routes below
+leaderboards: Dict[str, LeaderboardIndex] = {}
+search_indexes: Dict[str, SearchIndex] = {}
+
+def owner_leaderboard(owner_id: str) -> LeaderboardIndex:
+    return leaderboards.get(owner_id) or leaderboards.setdefault(owner_id, LeaderboardIndex())
+
+def owner_search_index(owner_id: str) -> SearchIndex:
+    return search_indexes.get(owner_id) or search_indexes.setdefault(owner_id, SearchIndex())
+
+def session_changed(session: dict, previous: Optional[dict] = None):
+    """Update indexes and rollups after a session document is written"""
+    owner_leaderboard(owner_of(session)).update(session)
+    owner_search_index(owner_of(session)).add_session(session)
+    rollups.apply_deltas(db, rollups.session_deltas(previous, session), firestore.Increment)
+
+def session_removed(session: dict):
+    """Drop a deleted session from indexes and rollups"""
+    owner_leaderboard(owner_of(session)).remove(session['id'])
+    owner_search_index(owner_of(session)).remove('session', session['id'])
+    rollups.apply_deltas(db, rollups.session_deltas(session, None), firestore.Increment)
+
+def bow_changed(bow: dict):
+    """Update in-process indexes after a bow document is written"""
+    owner_leaderboard(owner_of(bow)).set_bow(bow)
+    owner_search_index(owner_of(bow)).add_bow(bow)
+
+def bow_removed(bow: dict):
+    """Drop a deleted bow from in-process indexes"""
+    owner_leaderboard(owner_of(bow)).remove_bow(bow['id'])
+    owner_search_index(owner_of(bow)).remove('bow', bow['id'])
+
+job_manager.session_listeners.append(session_changed)
+
+def persist_buffered_session(session: dict, previous: Optional[dict]):
+    """Write a session coalesced by the write-behind buffer
+
+    Only the fields round edits change are written over the stored
+    document, so fields another writer set since the edit was read (e.g. a
+    bow rename job) are kept, and indexes and rollups move from what is stored.
+    """
+    doc_ref = db.collection('sessions').document(session['id'])
+    doc = doc_ref.get()
+    if not doc.exists:
+        return
+    stored = doc.to_dict()
+    fields = {
+        'rounds': session['rounds'],
+        'total_score': session['total_score'],
+        'updated_at': datetime.utcnow().isoformat(),
+    }
+    doc_ref.update(fields)
+    session_changed(dict(stored, **fields), stored)
+
+# Round edits are buffered for up to this long and written once; 0 writes every edit immediately
+write_buffer = WriteBehindBuffer(
+    delay=float(os.environ.get('WRITE_BEHIND_DELAY_MS', '0')) / 1000,
+    persist=persist_buffered_session,
+)
+job_manager.flush_session = write_buffer.flush
+
+def rebuild_indexes():
+    """Build in-process indexes from one scan of bows and sessions"""
+    leaderboards.clear()
+    search_indexes.clear()
+    for bow in iter_collection('bows'):
+        bow_changed(bow)
+    for session in iter_collection('sessions'):
+        owner_leaderboard(owner_of(session)).update(session)
+        owner_search_index(owner_of(session)).add_session(session)
+    logger.info(
+        f"Indexes built for {len(search_indexes)} owners: "
+        f"{sum(len(index.entries) for index in leaderboards.values())} ranked sessions, "
+        f"{sum(len(index.documents) for index in search_indexes.values())} searchable documents"
+    )
+
+def build_round_shots(shots_data: List[dict], target_type: Optional[str]):
+    """Build a round's shots and total, scoring shots that have a position from x/y"""
+    try:
+        rings, round_total, computed = scoring.score_round(shots_data, target_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    shots = [
+        Shot(x=shot_data.get('x', 0), y=shot_data.get('y', 0), ring=ring, confirmed=True, scored_from_position=scored)
+        for shot_data, ring, scored in zip(shots_data, rings, computed)
+    ]
+    
+    while len(shots) < 3:
+        shots.append(Shot(x=0, y=0, ring=0, confirmed=True))
+    
+    return shots, round_total
+
+def owned_doc(collection: str, doc_id: str, owner_id: str):
+    """Fetch a document of the request's owner; other owners' documents are reported as missing"""
+    doc_ref = db.collection(collection).document(doc_id)
+    doc = doc_ref.get()
+    if not doc.exists or owner_of(doc.to_dict()) != owner_id:
+        raise HTTPException(status_code=404, detail=f"{collection[:-1].capitalize()} not found")
+    return doc_ref, doc
+
+def buffered_session(session_id: str, owner_id: str) -> Optional[dict]:
+    """A session's unpersisted write-behind state, if it has one and belongs to the owner"""
+    session = write_buffer.get(session_id)
+    if session is not None and owner_of(session) != owner_id:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
 # Session Management Endpoints
 @api_router.post("/sessions")
-async def create_session(request: CreateSessionRequest):
+@idempotent(idempotency_store)
+async def create_session(request: CreateSessionRequest, http_request: Request, owner_id: str = Depends(request_owner)):
     """Create a new scoring session"""
     session = Session(
+        owner_id=owner_id,
         name=request.name or f"Session {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}",
         bow_id=request.bow_id,
         bow_name=request.bow_name,
@@ -157,49 +319,38 @@ async def create_session(request: CreateSessionRequest):
             round_data['created_at'] = round_data['created_at'].isoformat()
     
     db.collection('sessions').document(session.id).set(session_dict)
-    return session_dict
+    session_changed(session_dict)
+    return negotiated_response(http_request, session_dict)
 
 @api_router.get("/sessions")
-async def get_sessions():
+async def get_sessions(http_request: Request, owner_id: str = Depends(request_owner)):
     """Get all scoring sessions"""
-    sessions_ref = db.collection('sessions').order_by('created_at', direction=firestore.Query.DESCENDING).limit(100)
+    sessions_ref = db.collection('sessions').where('owner_id', '==', owner_id).order_by('created_at', direction=firestore.Query.DESCENDING).limit(100)
     sessions = []
     for doc in sessions_ref.stream():
-        sessions.append(doc.to_dict())
-    return sessions
+        sessions.append(write_buffer.get(doc.id) or doc.to_dict())
+    return negotiated_response(http_request, sessions)
 
 @api_router.get("/sessions/{session_id}")
-async def get_session(session_id: str):
+async def get_session(session_id: str, http_request: Request, owner_id: str = Depends(request_owner)):
     """Get a specific session"""
-    doc = db.collection('sessions').document(session_id).get()
-    if not doc.exists:
-        raise HTTPException(status_code=404, detail="Session not found")
-    return doc.to_dict()
+    buffered = buffered_session(session_id, owner_id)
+    if buffered is not None:
+        return negotiated_response(http_request, buffered)
+    _, doc = owned_doc('sessions', session_id, owner_id)
+    return negotiated_response(http_request, doc.to_dict())
 
 @api_router.post("/sessions/{session_id}/rounds")
-async def add_round(session_id: str, request: AddRoundRequest):
+@idempotent(idempotency_store)
+async def add_round(session_id: str, request: AddRoundRequest, http_request: Request, owner_id: str = Depends(request_owner)):
     """Add a round to a session"""
-    doc_ref = db.collection('sessions').document(session_id)
-    doc = doc_ref.get()
-    if not doc.exists:
-        raise HTTPException(status_code=404, detail="Session not found")
+    write_buffer.flush(session_id)
+    doc_ref, doc = owned_doc('sessions', session_id, owner_id)
     
     session = doc.to_dict()
+    previous = doc.to_dict()
     
-    shots = []
-    round_total = 0
-    for shot_data in request.shots:
-        shot = Shot(
-            x=shot_data.get('x', 0),
-            y=shot_data.get('y', 0),
-            ring=shot_data.get('ring', 0),
-            confirmed=True
-        )
-        shots.append(shot)
-        round_total += shot.ring
-    
-    while len(shots) < 3:
-        shots.append(Shot(x=0, y=0, ring=0, confirmed=True))
+    shots, round_total = build_round_shots(request.shots, session.get('target_type'))
     
     new_round = Round(
         round_number=request.round_number,
@@ -215,39 +366,30 @@ async def add_round(session_id: str, request: AddRoundRequest):
     session['updated_at'] = datetime.utcnow().isoformat()
     
     doc_ref.set(session)
-    return session
+    session_changed(session, previous)
+    publish_round(session, new_round_dict, 'round_added')
+    return negotiated_response(http_request, session)
 
 @api_router.put("/sessions/{session_id}/rounds/{round_id}")
-async def update_round(session_id: str, round_id: str, request: UpdateRoundRequest):
+async def update_round(session_id: str, round_id: str, request: UpdateRoundRequest, http_request: Request, owner_id: str = Depends(request_owner)):
     """Update a specific round"""
     doc_ref = db.collection('sessions').document(session_id)
-    doc = doc_ref.get()
-    if not doc.exists:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = doc.to_dict()
+    session = buffered_session(session_id, owner_id)
+    if session is None:
+        _, doc = owned_doc('sessions', session_id, owner_id)
+        session = doc.to_dict()
+    previous = copy.deepcopy(session)
+    session = copy.deepcopy(session)
     
     round_found = False
     for i, round_data in enumerate(session['rounds']):
         if round_data['id'] == round_id:
             round_found = True
-            shots = []
-            round_total = 0
-            for shot_data in request.shots:
-                shot = Shot(
-                    x=shot_data.get('x', 0),
-                    y=shot_data.get('y', 0),
-                    ring=shot_data.get('ring', 0),
-                    confirmed=True
-                )
-                shots.append(shot)
-                round_total += shot.ring
-            
-            while len(shots) < 3:
-                shots.append(Shot(x=0, y=0, ring=0, confirmed=True))
+            shots, round_total = build_round_shots(request.shots, session.get('target_type'))
             
             session['rounds'][i]['shots'] = [s.dict() for s in shots]
             session['rounds'][i]['total_score'] = round_total
+            updated_round = session['rounds'][i]
             break
     
     if not round_found:
@@ -256,28 +398,34 @@ async def update_round(session_id: str, round_id: str, request: UpdateRoundReque
     session['total_score'] = sum(r['total_score'] for r in session['rounds'])
     session['updated_at'] = datetime.utcnow().isoformat()
     
-    doc_ref.set(session)
-    return session
+    if write_buffer.enabled:
+        write_buffer.put(session, previous)
+    else:
+        doc_ref.set(session)
+        session_changed(session, previous)
+    publish_round(session, updated_round, 'round_updated')
+    return negotiated_response(http_request, session)
 
 @api_router.delete("/sessions/{session_id}")
-async def delete_session(session_id: str):
+async def delete_session(session_id: str, owner_id: str = Depends(request_owner)):
     """Delete a session"""
-    doc_ref = db.collection('sessions').document(session_id)
-    doc = doc_ref.get()
-    if not doc.exists:
-        raise HTTPException(status_code=404, detail="Session not found")
+    buffered_session(session_id, owner_id)
+    write_buffer.discard(session_id)
+    doc_ref, doc = owned_doc('sessions', session_id, owner_id)
     doc_ref.delete()
+    record_tombstone('sessions', session_id, owner_id)
+    session_removed(doc.to_dict())
+    session_broker.publish(session_id, {'type': 'session_deleted'})
     return {"message": "Session deleted"}
 
 @api_router.put("/sessions/{session_id}")
-async def update_session(session_id: str, request: UpdateSessionRequest):
+async def update_session(session_id: str, request: UpdateSessionRequest, http_request: Request, owner_id: str = Depends(request_owner)):
     """Update a session's details"""
-    doc_ref = db.collection('sessions').document(session_id)
-    doc = doc_ref.get()
-    if not doc.exists:
-        raise HTTPException(status_code=404, detail="Session not found")
+    write_buffer.flush(session_id)
+    doc_ref, doc = owned_doc('sessions', session_id, owner_id)
     
     session = doc.to_dict()
+    previous = doc.to_dict()
     
     if request.name is not None:
         session['name'] = request.name
@@ -299,14 +447,77 @@ async def update_session(session_id: str, request: UpdateSessionRequest):
     session['updated_at'] = datetime.utcnow().isoformat()
     
     doc_ref.set(session)
-    return session
+    session_changed(session, previous)
+    return negotiated_response(http_request, session)
+
+@api_router.get("/write-behind/stats")
+async def get_write_behind_stats():
+    """Get how many round edits the write-behind buffer coalesced"""
+    return write_buffer.metrics()
+
+# ============== Live Scoring Events ==============
+
+session_broker = SessionBroker(queue_size=int(os.environ.get('LIVE_EVENT_QUEUE_SIZE', '64')))
+LIVE_KEEPALIVE_SECONDS = 15
+
+def publish_round(session: dict, round_data: dict, event_type: str):
+    """Push a new or changed end to the session's live subscribers"""
+    session_broker.publish(session['id'], {
+        'type': event_type,
+        'round': round_data,
+        'total_score': session['total_score'],
+        'updated_at': session['updated_at'],
+    })
+
+def server_sent_event(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(jsonable_encoder(event))}\n\n"
+
+@api_router.get("/sessions/{session_id}/events")
+async def session_events(session_id: str, owner_id: str = Depends(request_owner)):
+    """Stream a session's new and changed ends as server-sent events
+
+    The first event is a `snapshot` of the whole session; after that only
+    `round_added` / `round_updated` ends are sent. A `resync` event means
+    the client fell behind and should fetch the session again, and the
+    stream ends with `session_deleted`.
+    """
+    subscription = session_broker.subscribe(session_id)
+    try:
+        session = buffered_session(session_id, owner_id)
+        if session is None:
+            session = owned_doc('sessions', session_id, owner_id)[1].to_dict()
+    except HTTPException:
+        session_broker.unsubscribe(subscription)
+        raise
+
+    async def event_stream():
+        try:
+            yield server_sent_event({'type': 'snapshot', 'session_id': session_id, 'session': session})
+            while True:
+                event = await subscription.next_event(LIVE_KEEPALIVE_SECONDS)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield server_sent_event(event)
+                if event['type'] == 'session_deleted':
+                    return
+        finally:
+            session_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # ============== Bow Management Endpoints ==============
 
 @api_router.post("/bows")
-async def create_bow(request: CreateBowRequest):
+@idempotent(idempotency_store)
+async def create_bow(request: CreateBowRequest, http_request: Request, owner_id: str = Depends(request_owner)):
     """Create a new bow"""
     bow = Bow(
+        owner_id=owner_id,
         name=request.name,
         bow_type=request.bow_type,
         draw_weight=request.draw_weight,
@@ -318,34 +529,41 @@ async def create_bow(request: CreateBowRequest):
     bow_dict['updated_at'] = bow_dict['updated_at'].isoformat()
     
     db.collection('bows').document(bow.id).set(bow_dict)
+    bow_changed(bow_dict)
     return bow_dict
 
 @api_router.get("/bows")
-async def get_bows():
+async def get_bows(owner_id: str = Depends(request_owner)):
     """Get all bows"""
-    bows_ref = db.collection('bows').order_by('created_at', direction=firestore.Query.DESCENDING).limit(100)
+    bows_ref = db.collection('bows').where('owner_id', '==', owner_id).order_by('created_at', direction=firestore.Query.DESCENDING).limit(100)
     bows = []
     for doc in bows_ref.stream():
         bows.append(doc.to_dict())
     return bows
 
 @api_router.get("/bows/{bow_id}")
-async def get_bow(bow_id: str):
+async def get_bow(bow_id: str, owner_id: str = Depends(request_owner)):
     """Get a specific bow"""
-    doc = db.collection('bows').document(bow_id).get()
-    if not doc.exists:
-        raise HTTPException(status_code=404, detail="Bow not found")
+    _, doc = owned_doc('bows', bow_id, owner_id)
     return doc.to_dict()
 
+def start_bow_propagation(bow_id: str, owner_id: str):
+    """Start a job that updates the bow name copied onto its owner's sessions"""
+    return job_manager.create(db, 'propagate_bow', {
+        'bow_id': bow_id,
+        'owner_id': owner_id,
+        'page_size': 200,
+        'max_reads_per_second': 500,
+        'max_writes_per_second': 100,
+    }, owner_id)
+
 @api_router.put("/bows/{bow_id}")
-async def update_bow(bow_id: str, request: UpdateBowRequest):
+async def update_bow(bow_id: str, request: UpdateBowRequest, owner_id: str = Depends(request_owner)):
     """Update a bow"""
-    doc_ref = db.collection('bows').document(bow_id)
-    doc = doc_ref.get()
-    if not doc.exists:
-        raise HTTPException(status_code=404, detail="Bow not found")
+    doc_ref, doc = owned_doc('bows', bow_id, owner_id)
     
     bow = doc.to_dict()
+    renamed = request.name is not None and request.name != bow.get('name')
     
     if request.name is not None:
         bow['name'] = request.name
@@ -361,17 +579,485 @@ async def update_bow(bow_id: str, request: UpdateBowRequest):
     bow['updated_at'] = datetime.utcnow().isoformat()
     
     doc_ref.set(bow)
+    bow_changed(bow)
+    if renamed:
+        job = start_bow_propagation(bow_id, owner_id)
+        return dict(bow, propagation_job_id=job['id'])
     return bow
 
 @api_router.delete("/bows/{bow_id}")
-async def delete_bow(bow_id: str):
+async def delete_bow(bow_id: str, owner_id: str = Depends(request_owner)):
     """Delete a bow"""
-    doc_ref = db.collection('bows').document(bow_id)
-    doc = doc_ref.get()
-    if not doc.exists:
-        raise HTTPException(status_code=404, detail="Bow not found")
+    doc_ref, doc = owned_doc('bows', bow_id, owner_id)
     doc_ref.delete()
-    return {"message": "Bow deleted"}
+    record_tombstone('bows', bow_id, owner_id)
+    bow_removed(doc.to_dict())
+    job = start_bow_propagation(bow_id, owner_id)
+    return {"message": "Bow deleted", "propagation_job_id": job['id']}
+
+# ============== Scoring ==============
+
+# Widest line-cutter allowance, as a fraction of the face radius (a 9.3 mm shaft on a 20 cm face is ~0.05)
+MAX_ARROW_RADIUS = 0.1
+
+class ScoreShotsRequest(BaseModel):
+    target_type: Optional[str] = "wa_standard"
+    shots: List[dict]
+    arrow_radius: float = Field(0.0, ge=0, le=MAX_ARROW_RADIUS)
+
+@api_router.post("/score")
+async def score_shots(request: ScoreShotsRequest):
+    """Score a batch of x/y shot positions on a target face"""
+    if request.target_type and request.target_type not in scoring.TARGET_FACES:
+        raise HTTPException(status_code=400, detail=f"Unknown target type: {request.target_type}")
+    x = [shot.get('x', 0) for shot in request.shots]
+    y = [shot.get('y', 0) for shot in request.shots]
+    rings = scoring.score_shots(x, y, request.target_type, request.arrow_radius)
+    return {
+        "target_type": request.target_type,
+        "rings": rings.tolist(),
+        "total_score": int(scoring.points(rings).sum()),
+    }
+
+# ============== Leaderboards ==============
+
+@api_router.get("/leaderboard")
+async def get_leaderboard(
+    distance: Optional[str] = None,
+    bow_type: Optional[str] = None,
+    target_type: Optional[str] = "wa_standard",
+    limit: int = Query(10, ge=1, le=100),
+    owner_id: str = Depends(request_owner),
+):
+    """Get the top scoring sessions for a distance / bow type / target type"""
+    write_buffer.flush_all()
+    return owner_leaderboard(owner_id).top(distance, bow_type, target_type, limit)
+
+@api_router.get("/personal-bests")
+async def get_personal_bests(owner_id: str = Depends(request_owner)):
+    """Get the best session for every distance / bow type / target type"""
+    write_buffer.flush_all()
+    return owner_leaderboard(owner_id).personal_bests()
+
+# ============== Search ==============
+
+@api_router.get("/search")
+async def search(q: str, kind: Optional[str] = None, limit: int = Query(20, ge=1, le=100), owner_id: str = Depends(request_owner)):
+    """Search session names, bow names, distances and bow notes"""
+    if kind not in (None, 'session', 'bow'):
+        raise HTTPException(status_code=400, detail=f"Unsupported search kind: {kind}")
+    return owner_search_index(owner_id).search(q, kind, limit)
+
+@api_router.get("/search/autocomplete")
+async def autocomplete(prefix: str, limit: int = Query(10, ge=1, le=50), owner_id: str = Depends(request_owner)):
+    """Suggest indexed words completing the last word of a prefix"""
+    return owner_search_index(owner_id).autocomplete(prefix, limit)
+
+# ============== Progress Rollups ==============
+
+@api_router.get("/rollups")
+async def get_rollups(
+    year: int,
+    granularity: str = 'week',
+    bow_id: Optional[str] = None,
+    distance: Optional[str] = None,
+    owner_id: str = Depends(request_owner),
+):
+    """Get daily, weekly or monthly arrow statistics for a year of progress charts
+
+    With both bow_id and distance this is a single document read; leaving
+    either out merges the matching documents for that year. Weeks are the
+    ones whose Monday falls in the year, so the following year's documents
+    are merged in for the days of a last week that runs past New Year.
+    """
+    write_buffer.flush_all()
+    if granularity not in rollups.GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"Unsupported granularity: {granularity}")
+    docs = []
+    for doc_year in ((year, year + 1) if granularity == 'week' else (year,)):
+        if bow_id is not None and distance is not None:
+            doc = db.collection(rollups.ROLLUP_COLLECTION).document(rollups.rollup_doc_id(owner_id, bow_id, distance, doc_year)).get()
+            docs.extend([doc.to_dict()] if doc.exists else [])
+        else:
+            query = db.collection(rollups.ROLLUP_COLLECTION).where('owner_id', '==', owner_id).where('year', '==', doc_year)
+            if bow_id is not None:
+                query = query.where('bow_id', '==', bow_id)
+            if distance is not None:
+                query = query.where('distance', '==', distance.strip() or rollups.NO_DISTANCE)
+            docs.extend(doc.to_dict() for doc in query.stream())
+    return {
+        "year": year,
+        "granularity": granularity,
+        "bow_id": bow_id,
+        "distance": distance,
+        "periods": rollups.merge_periods(docs, granularity, year),
+    }
+
+# ============== Background Jobs ==============
+
+class RescoreJobRequest(BaseModel):
+    dry_run: bool = True
+    all_owners: bool = False
+    page_size: int = Field(200, ge=1, le=500)
+    max_reads_per_second: float = 500
+    max_writes_per_second: float = 100
+
+def require_admin(is_admin: bool):
+    if not is_admin:
+        raise HTTPException(status_code=403, detail=f"Jobs over all owners require the {ADMIN_HEADER} header")
+
+def job_owner(all_owners: bool, owner_id: str, is_admin: bool) -> Optional[str]:
+    """The owner a new job is scoped to; None (every owner) needs the admin token"""
+    if not all_owners:
+        return owner_id
+    require_admin(is_admin)
+    return None
+
+def visible_job(job_id: str, owner_id: str, is_admin: bool) -> dict:
+    """A job started for the request's owner; other owners' and all-owner jobs are reported as missing"""
+    doc = db.collection(JOB_COLLECTION).document(job_id).get()
+    if not doc.exists:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job = doc.to_dict()
+    if not is_admin and job.get('owner_id') != owner_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@api_router.post("/jobs/rescore")
+async def start_rescore_job(request: RescoreJobRequest, owner_id: str = Depends(request_owner), is_admin: bool = Depends(request_is_admin)):
+    """Start a backfill that recomputes rings and totals across the owner's sessions, or all sessions"""
+    scope = job_owner(request.all_owners, owner_id, is_admin)
+    return job_manager.create(db, 'rescore', request.dict(exclude={'all_owners'}), scope)
+
+class RebuildRollupsJobRequest(BaseModel):
+    all_owners: bool = False
+    page_size: int = Field(200, ge=1, le=500)
+    max_reads_per_second: float = 500
+    max_writes_per_second: float = 100
+
+@api_router.post("/jobs/rollups")
+async def start_rebuild_rollups_job(request: RebuildRollupsJobRequest, owner_id: str = Depends(request_owner), is_admin: bool = Depends(request_is_admin)):
+    """Start a job that rebuilds the owner's progress rollups, or all of them, from sessions"""
+    scope = job_owner(request.all_owners, owner_id, is_admin)
+    return job_manager.create(db, 'rebuild_rollups', request.dict(exclude={'all_owners'}), scope)
+
+class AssignOwnerJobRequest(BaseModel):
+    page_size: int = Field(200, ge=1, le=500)
+    max_reads_per_second: float = 500
+    max_writes_per_second: float = 100
+
+@api_router.post("/jobs/assign-owner")
+async def start_assign_owner_job(request: AssignOwnerJobRequest, is_admin: bool = Depends(request_is_admin)):
+    """Start a job that gives documents without an owner to the default owner"""
+    require_admin(is_admin)
+    return job_manager.create(db, 'assign_owner', request.dict())
+
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str, owner_id: str = Depends(request_owner), is_admin: bool = Depends(request_is_admin)):
+    """Get a job's status, counters, checkpoint and dry-run diff"""
+    return visible_job(job_id, owner_id, is_admin)
+
+@api_router.post("/jobs/{job_id}/resume")
+async def resume_job(job_id: str, owner_id: str = Depends(request_owner), is_admin: bool = Depends(request_is_admin)):
+    """Resume a cancelled, failed or interrupted job from its last checkpoint"""
+    job = visible_job(job_id, owner_id, is_admin)
+    if job_manager.is_running(job_id):
+        raise HTTPException(status_code=409, detail="Job is already running")
+    if job['status'] == 'completed':
+        raise HTTPException(status_code=409, detail="Job already completed")
+    return job_manager.start(db, job)
+
+@api_router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, owner_id: str = Depends(request_owner), is_admin: bool = Depends(request_is_admin)):
+    """Stop a running job after its current page"""
+    visible_job(job_id, owner_id, is_admin)
+    if not job_manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job is not running")
+    return {"message": "Job cancellation requested"}
+
+# ============== Delta Sync ==============
+
+SYNC_COLLECTIONS = ('sessions', 'bows')
+SYNC_PAGE_SIZE = 200
+
+def record_tombstone(collection: str, doc_id: str, owner_id: str):
+    """Remember a deleted document so the owner's other devices can drop it on their next sync"""
+    db.collection('tombstones').document(doc_id).set({
+        'id': doc_id,
+        'owner_id': owner_id,
+        'collection': collection,
+        'updated_at': datetime.utcnow().isoformat(),
+    })
+
+def encode_sync_cursor(updated_at: str, doc_id: str) -> str:
+    """Encode a (updated_at, id) position as an opaque cursor string"""
+    raw = json.dumps([updated_at, doc_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_sync_cursor(cursor: str):
+    """Decode a cursor produced by encode_sync_cursor"""
+    try:
+        updated_at, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid sync cursor: {str(e)}")
+    return updated_at, doc_id
+
+def changed_since(collection: str, owner_id: str, position, limit: int):
+    """An owner's documents of a collection ordered by (updated_at, id) strictly after position"""
+    query = db.collection(collection).where('owner_id', '==', owner_id).order_by('updated_at').order_by('id')
+    if position is not None:
+        query = query.start_after({'updated_at': position[0], 'id': position[1]})
+    return [doc.to_dict() for doc in query.limit(limit).stream()]
+
+@api_router.get("/sync")
+async def sync_changes(since: Optional[str] = None, limit: int = Query(SYNC_PAGE_SIZE, ge=1, le=500), owner_id: str = Depends(request_owner)):
+    """Get sessions and bows created, modified or deleted since a sync cursor
+
+    Every document carries `updated_at`, and deletes leave a tombstone, so
+    the (updated_at, id) pair gives a single total order across sessions,
+    bows and tombstones. Each collection is read from the cursor position
+    (requires composite indexes on owner_id + updated_at + id) and the merged page is
+    cut at `limit`; anything past the cut is read again on the next page.
+    """
+    write_buffer.flush_all()
+    position = decode_sync_cursor(since) if since else None
+
+    changes = []
+    for collection in SYNC_COLLECTIONS + ('tombstones',):
+        for item in changed_since(collection, owner_id, position, limit + 1):
+            changes.append((item['updated_at'], item['id'], collection, item))
+    changes.sort(key=lambda change: (change[0], change[1]))
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    result = {collection: [] for collection in SYNC_COLLECTIONS}
+    result['deleted'] = {collection: [] for collection in SYNC_COLLECTIONS}
+    for _, _, collection, item in changes:
+        if collection == 'tombstones':
+            result['deleted'][item['collection']].append(item['id'])
+        else:
+            result[collection].append(item)
+
+    if changes:
+        last_updated_at, last_id = changes[-1][0], changes[-1][1]
+        result['cursor'] = encode_sync_cursor(last_updated_at, last_id)
+    else:
+        result['cursor'] = since
+    result['has_more'] = has_more
+    return result
+
+# ============== Export ==============
+
+EXPORT_PAGE_SIZE = 500
+
+def iter_collection(collection: str, order_field: str = 'created_at', page_size: int = EXPORT_PAGE_SIZE, owner_id: Optional[str] = None,
+                    fields: Optional[List[str]] = None):
+    """Yield every document of a collection (or of one owner's part of it), reading one page at a time
+
+    With `fields`, only those fields (which must include `order_field`) are read.
+    """
+    query = db.collection(collection)
+    if owner_id is not None:
+        query = query.where('owner_id', '==', owner_id)
+    if fields is not None:
+        query = query.select(fields)
+    query = query.order_by(order_field).limit(page_size)
+    last_doc = None
+    while True:
+        page = query.start_after(last_doc) if last_doc is not None else query
+        docs = list(page.stream())
+        for doc in docs:
+            yield doc.to_dict()
+        if len(docs) < page_size:
+            return
+        last_doc = docs[-1]
+
+@api_router.get("/export")
+async def export_sessions(format: str = 'csv', detail: str = 'session', owner_id: str = Depends(request_owner)):
+    """Stream every session, round and shot of the owner as CSV, NDJSON or Parquet
+
+    `detail=session` writes one row per session in the test_import.csv
+    layout (Date,Name,BowType,TotalScore first); `detail=shot` writes one
+    row per shot. Parquet is always shot-level.
+    """
+    write_buffer.flush_all()
+    if format not in export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    if detail not in ('session', 'shot'):
+        raise HTTPException(status_code=400, detail=f"Unsupported export detail: {detail}")
+    if format == 'parquet' and export.pq is None:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+
+    # Bows are few, so their types are loaded up front for the BowType column
+    bow_types = {bow['id']: bow.get('bow_type', 'Unknown') for bow in iter_collection('bows', owner_id=owner_id)}
+    writer = export.EXPORT_WRITERS[format]
+    filename = f"arrow_tracker_export_{datetime.utcnow().strftime('%Y%m%d')}.{format}"
+    return StreamingResponse(
+        writer(iter_collection('sessions', owner_id=owner_id), bow_types, detail),
+        media_type=export.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+# ============== CSV Import ==============
+
+def import_bow(owner_id: str, bow_type: str, bows_by_type: Dict[str, dict], summary: csvimport.ImportSummary) -> dict:
+    """The owner's first bow of a type, created when they have none"""
+    bow = bows_by_type.get(bow_type)
+    if bow is None:
+        bow = Bow(owner_id=owner_id, name=bow_type, bow_type=bow_type, notes="Created by CSV import").dict()
+        bow['created_at'] = bow['created_at'].isoformat()
+        bow['updated_at'] = bow['updated_at'].isoformat()
+        db.collection('bows').document(bow['id']).set(bow)
+        bow_changed(bow)
+        bows_by_type[bow_type] = bow
+        summary.bows_created.append(bow['name'])
+    return bow
+
+def write_import_batch(owner_id: str, rows: csvimport.ValidRows, existing: set, bows_by_type: Dict[str, dict], summary: csvimport.ImportSummary):
+    """Create sessions for the validated rows not already imported, with batched commits"""
+    # Rows are validated already, so every session is a copy of one model's fields with its own ids
+    template = Session(owner_id=owner_id).dict()
+    template['updated_at'] = datetime.utcnow().isoformat()
+    round_template = Round(round_number=1).dict()
+    sessions = []
+    for date, name, score, bow_type, distance, target_type in zip(
+            rows.dates, rows.names, rows.scores, rows.bow_types, rows.distances, rows.target_types):
+        key = csvimport.dedupe_key(date, name, score)
+        if key in existing:
+            summary.duplicates += 1
+            continue
+        existing.add(key)
+        bow = import_bow(owner_id, bow_type, bows_by_type, summary) if bow_type != csvimport.UNKNOWN_BOW_TYPE else None
+        created_at = f"{date}T00:00:00"
+        # One score-only round carries the total, like the app's own CSV import
+        round_dict = dict(round_template, id=str(uuid.uuid4()), shots=[], total_score=score, created_at=created_at)
+        sessions.append(dict(
+            template,
+            id=str(uuid.uuid4()),
+            name=name,
+            bow_id=bow['id'] if bow else None,
+            bow_name=bow['name'] if bow else None,
+            distance=distance or None,
+            target_type=target_type,
+            rounds=[round_dict],
+            total_score=score,
+            created_at=created_at,
+        ))
+
+    for start in range(0, len(sessions), MAX_BATCH_WRITES):
+        batch = db.batch()
+        for session in sessions[start:start + MAX_BATCH_WRITES]:
+            batch.set(db.collection('sessions').document(session['id']), session)
+        batch.commit()
+    for session in sessions:
+        owner_leaderboard(owner_id).update(session)
+        owner_search_index(owner_id).add_session(session)
+    # One rollup write per document for the whole batch instead of one per session
+    rollups.apply_deltas(db, rollups.accumulate(sessions), firestore.Increment)
+    summary.imported += len(sessions)
+
+def import_state(owner_id: str):
+    """Dedupe keys of the owner's sessions and their first bow of each type"""
+    existing = {
+        csvimport.dedupe_key(str(session.get('created_at', '')), session.get('name', ''), session.get('total_score', 0))
+        for session in iter_collection('sessions', owner_id=owner_id, fields=['created_at', 'name', 'total_score'])
+    }
+    bows_by_type = {}
+    for bow in iter_collection('bows', owner_id=owner_id):
+        bows_by_type.setdefault(bow.get('bow_type'), bow)
+    return existing, bows_by_type
+
+@api_router.post("/import/csv")
+@idempotent(idempotency_store, streamed=True)
+async def import_csv(http_request: Request, owner_id: str = Depends(request_owner)):
+    """Import sessions from a CSV file streamed as the request body
+
+    Rows are parsed, validated and written a batch at a time. A row with
+    the date, name and score of an existing session (or of an earlier
+    row) is skipped, so uploading the same file again imports nothing; a
+    retry with the same Idempotency-Key gets the first upload's summary.
+    """
+    write_buffer.flush_all()
+    existing, bows_by_type = await run_in_threadpool(import_state, owner_id)
+    summary = csvimport.ImportSummary()
+    columns = None
+    async for lines, rows in csvimport.csv_batches(http_request.stream()):
+        if columns is None:
+            columns = csvimport.find_columns(rows[0])
+            missing = [name for name in ('date', 'name', 'score') if name not in columns]
+            if missing:
+                raise HTTPException(status_code=400, detail=f"CSV header has no {', '.join(missing)} column")
+            lines, rows = lines[1:], rows[1:]
+            if not rows:
+                continue
+        summary.rows += len(rows)
+        valid, errors = csvimport.validate_batch(lines, rows, columns)
+        summary.add_errors(errors, len(rows) - len(valid))
+        await run_in_threadpool(write_import_batch, owner_id, valid, existing, bows_by_type, summary)
+    if columns is None:
+        raise HTTPException(status_code=400, detail="CSV is empty")
+    return asdict(summary)
+
+# ============== Reports ==============
+
+MAX_BATCH_REPORTS = 100
+
+report_renderer = ReportRenderer(
+    max_entries=int(os.environ.get('REPORT_CACHE_SIZE', '256')),
+    workers=int(os.environ.get('REPORT_WORKERS', '0')) or None,
+)
+
+class BatchReportRequest(BaseModel):
+    session_ids: List[str]
+
+def report_source(session_id: str, owner_id: str):
+    """A session as persisted, and its bow type, to render a report from"""
+    buffered_session(session_id, owner_id)
+    write_buffer.flush(session_id)
+    _, doc = owned_doc('sessions', session_id, owner_id)
+    session = doc.to_dict()
+    bow_type = 'Unknown'
+    if session.get('bow_id'):
+        bow_doc = db.collection('bows').document(session['bow_id']).get()
+        if bow_doc.exists:
+            bow_type = bow_doc.to_dict().get('bow_type', 'Unknown')
+    return session, bow_type
+
+@api_router.get("/sessions/{session_id}/report")
+async def get_session_report(session_id: str, owner_id: str = Depends(request_owner)):
+    """Render a session's scorecard PDF"""
+    session, bow_type = report_source(session_id, owner_id)
+    pdf, cached = await report_renderer.render(session, bow_type)
+    return Response(content=pdf, media_type="application/pdf", headers={
+        "Content-Disposition": f'inline; filename="arrow_tracker_report_{session_id}.pdf"',
+        "X-Report-Cache": "hit" if cached else "miss",
+    })
+
+@api_router.post("/reports")
+async def get_batch_reports(request: BatchReportRequest, owner_id: str = Depends(request_owner)):
+    """Render several sessions' scorecard PDFs in the worker pool and return them as a zip"""
+    session_ids = list(dict.fromkeys(request.session_ids))
+    if not session_ids:
+        raise HTTPException(status_code=400, detail="No sessions requested")
+    if len(session_ids) > MAX_BATCH_REPORTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_REPORTS} reports per request")
+
+    pdfs = await report_renderer.render_many([report_source(session_id, owner_id) for session_id in session_ids])
+    archive = io.BytesIO()
+    # The PDFs are already deflated, so they are stored as they are
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_STORED) as zf:
+        for session_id, pdf in zip(session_ids, pdfs):
+            zf.writestr(f"arrow_tracker_report_{session_id}.pdf", pdf)
+    filename = f"arrow_tracker_reports_{datetime.utcnow().strftime('%Y%m%d')}.zip"
+    return Response(content=archive.getvalue(), media_type="application/zip", headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+    })
+
+@api_router.get("/reports/stats")
+async def get_report_stats():
+    """Report cache and worker pool counters"""
+    return report_renderer.metrics()
 
 # ============== PDF Text Extraction ==============
 
@@ -404,14 +1090,9 @@ class QRExtractResponse(BaseModel):
 async def extract_qr_from_pdfs(request: QRExtractRequest):
     """Extract QR codes from multiple PDF files and return decoded archer data"""
     import base64
-    import tempfile
-    import json
     
     try:
-        import fitz  # PyMuPDF
-        import cv2
-        import numpy as np
-        from pyzbar.pyzbar import decode
+        import qrdecode
         
         all_sessions = []
         total_qr_found = 0
@@ -421,56 +1102,21 @@ async def extract_qr_from_pdfs(request: QRExtractRequest):
                 # Decode base64 PDF
                 pdf_bytes = base64.b64decode(pdf_base64)
                 
-                # Open PDF from bytes
-                doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-                
-                for page_num in range(len(doc)):
-                    page = doc[page_num]
-                    
-                    # Render page to image with higher resolution for better QR detection
-                    zoom = 2.0
-                    mat = fitz.Matrix(zoom, zoom)
-                    pix = page.get_pixmap(matrix=mat)
-                    
-                    # Convert to numpy array for OpenCV
-                    img_data = np.frombuffer(pix.samples, dtype=np.uint8)
-                    img_data = img_data.reshape(pix.height, pix.width, pix.n)
-                    
-                    # Convert to BGR for OpenCV if needed
-                    if pix.n == 4:  # RGBA
-                        img_cv = cv2.cvtColor(img_data, cv2.COLOR_RGBA2BGR)
-                    elif pix.n == 3:  # RGB
-                        img_cv = cv2.cvtColor(img_data, cv2.COLOR_RGB2BGR)
-                    else:
-                        img_cv = img_data
-                    
-                    # Decode QR codes
-                    qr_codes = decode(img_cv)
+                for page_num, page in enumerate(qrdecode.decode_pdf(pdf_bytes)):
+                    total_qr_found += len(page.payloads)
+                    if page.strategy is not None:
+                        logger.info(f"PDF {pdf_index} page {page_num}: {len(page.sessions)} Arrow Tracker QR codes via {page.strategy} ({page.source})")
                     
-                    for qr in qr_codes:
-                        try:
-                            qr_data = qr.data.decode('utf-8')
-                            total_qr_found += 1
-                            
-                            # Parse JSON data from QR code
-                            data = json.loads(qr_data)
-                            
-                            # Check if it's our Arrow Tracker QR code
-                            if data.get('t') == 'arrow_tracker':
-                                session = ExtractedSession(
-                                    date=data.get('dt', ''),
-                                    name=data.get('n', 'Unknown'),
-                                    bowType=data.get('b', 'Unknown'),
-                                    score=data.get('s', 0),
-                                    distance=data.get('d', '')
-                                )
-                                all_sessions.append(session)
-                                logger.info(f"Extracted QR: {session.name} - {session.score} pts")
-                        except (json.JSONDecodeError, UnicodeDecodeError) as e:
-                            logger.warning(f"QR decode error: {e}")
-                            continue
-                
-                doc.close()
+                    for data in page.sessions:
+                        session = ExtractedSession(
+                            date=data.get('dt', ''),
+                            name=data.get('n', 'Unknown'),
+                            bowType=data.get('b', 'Unknown'),
+                            score=data.get('s', 0),
+                            distance=data.get('d', '')
+                        )
+                        all_sessions.append(session)
+                        logger.info(f"Extracted QR: {session.name} - {session.score} pts")
                 
             except Exception as pdf_error:
                 logger.error(f"Error processing PDF {pdf_index}: {pdf_error}")
@@ -586,9 +1232,54 @@ async def extract_pdf_text(request: PDFExtractRequest):
             error=str(e)
         )
 
+# Fixed id of the assign-owner run made at startup, so later startups see it completed
+OWNER_MIGRATION_JOB_ID = 'assign-owner'
+
+def migrate_unowned_documents():
+    """Give documents written before owners existed to the default owner, unless done already
+
+    Runs to completion (resuming an interrupted run) before the app serves
+    requests, so owner-scoped lists, sync and export never skip them. When
+    documents were migrated, rollups are rebuilt under owner-scoped ids.
+    """
+    doc = db.collection(JOB_COLLECTION).document(OWNER_MIGRATION_JOB_ID).get()
+    job = doc.to_dict() if doc.exists else None
+    if job is not None and job['status'] == 'completed':
+        return
+    if job is None:
+        job = job_manager.new('assign_owner', {'page_size': 500}, job_id=OWNER_MIGRATION_JOB_ID)
+        db.collection(JOB_COLLECTION).document(job['id']).set(job)
+    job = job_manager.run(db, job)
+    if job['status'] != 'completed':
+        raise RuntimeError(f"Owner migration {job['status']}: {job['error']}")
+    changed = job['counters'].get('changed', 0)
+    logger.info(f"Owner migration gave {changed} documents to '{DEFAULT_OWNER}'")
+    if changed:
+        job_manager.create(db, 'rebuild_rollups', RebuildRollupsJobRequest().dict(exclude={'all_owners'}))
+
+@app.on_event("startup")
+async def startup_build_indexes():
+    if db is None:
+        return
+    await run_in_threadpool(migrate_unowned_documents)
+    await run_in_threadpool(rebuild_indexes)
+
+@app.on_event("shutdown")
+async def shutdown_flush_write_buffer():
+    await run_in_threadpool(write_buffer.flush_all)
+
+@app.on_event("shutdown")
+async def shutdown_report_workers():
+    report_renderer.shutdown()
+
 # Include the router in the main app
 app.include_router(api_router)
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get('COMPRESSION_MIN_SIZE', '1024')),
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
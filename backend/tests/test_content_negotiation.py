@@ -0,0 +1,116 @@
+"""
+Backend tests for response compression and MessagePack content negotiation
+Tests the /api/sessions endpoints with Accept and Accept-Encoding headers
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://range-keeper-1.preview.emergentagent.com')
+
+
+@pytest.fixture
+def session_with_rounds():
+    """Create a session large enough to cross the compression threshold"""
+    response = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Compression"})
+    assert response.status_code == 200
+    session = response.json()
+    for round_number in range(1, 11):
+        requests.post(
+            f"{BASE_URL}/api/sessions/{session['id']}/rounds",
+            json={"round_number": round_number, "shots": [{"x": 0.5, "y": 0.53, "ring": 10}] * 6}
+        )
+    yield session
+    requests.delete(f"{BASE_URL}/api/sessions/{session['id']}")
+
+
+class TestCompression:
+    """Test gzip/brotli compression of large responses"""
+
+    def test_large_response_is_gzipped(self, session_with_rounds):
+        """Sessions with many rounds should be gzip encoded when accepted"""
+        response = requests.get(
+            f"{BASE_URL}/api/sessions/{session_with_rounds['id']}",
+            headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 200
+        assert response.headers.get("Content-Encoding") == "gzip"
+        assert len(response.json()["rounds"]) == 10
+
+    def test_q_values_are_respected(self, session_with_rounds):
+        """An encoding refused with q=0 should not be used; any q > 0 allows it"""
+        url = f"{BASE_URL}/api/sessions/{session_with_rounds['id']}"
+        refused = requests.get(url, headers={"Accept-Encoding": "gzip;q=0, br;q=0"})
+        assert refused.status_code == 200
+        assert "Content-Encoding" not in refused.headers
+        allowed = requests.get(url, headers={"Accept-Encoding": "gzip; q=0.5"})
+        assert allowed.headers.get("Content-Encoding") == "gzip"
+
+    def test_highest_q_encoding_is_chosen(self, session_with_rounds):
+        """An encoding accepted with a lower q should lose to one with a higher q"""
+        response = requests.get(
+            f"{BASE_URL}/api/sessions/{session_with_rounds['id']}",
+            headers={"Accept-Encoding": "br;q=0.1, gzip;q=1"}
+        )
+        assert response.headers.get("Content-Encoding") == "gzip"
+
+    def test_small_response_is_not_compressed(self):
+        """Responses below the size threshold should be sent as-is"""
+        response = requests.get(f"{BASE_URL}/api/health", headers={"Accept-Encoding": "gzip, br"})
+        assert response.status_code == 200
+        assert "Content-Encoding" not in response.headers
+
+
+class TestMessagePack:
+    """Test Accept-based MessagePack encoding of session payloads"""
+
+    def test_session_as_msgpack(self, session_with_rounds):
+        """Accept: application/msgpack should return the same session as JSON"""
+        msgpack = pytest.importorskip("msgpack")
+        response = requests.get(
+            f"{BASE_URL}/api/sessions/{session_with_rounds['id']}",
+            headers={"Accept": "application/msgpack"}
+        )
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("application/msgpack")
+        data = msgpack.unpackb(response.content)
+        assert data["id"] == session_with_rounds["id"]
+        assert data["total_score"] == 600
+
+    def test_msgpack_refused_with_q_zero(self, session_with_rounds):
+        """application/msgpack;q=0 should get JSON"""
+        response = requests.get(
+            f"{BASE_URL}/api/sessions/{session_with_rounds['id']}",
+            headers={"Accept": "application/msgpack;q=0, application/json"}
+        )
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("application/json")
+
+    def test_highest_q_media_type_is_chosen(self, session_with_rounds):
+        """JSON accepted with a higher q than MessagePack should get JSON"""
+        response = requests.get(
+            f"{BASE_URL}/api/sessions/{session_with_rounds['id']}",
+            headers={"Accept": "application/json, application/msgpack;q=0.1"}
+        )
+        assert response.headers["Content-Type"].startswith("application/json")
+        assert "Accept" in response.headers["Vary"]
+
+    def test_named_msgpack_beats_wildcard(self, session_with_rounds):
+        """MessagePack listed by name should win over JSON covered only by */*"""
+        pytest.importorskip("msgpack")
+        response = requests.get(
+            f"{BASE_URL}/api/sessions/{session_with_rounds['id']}",
+            headers={"Accept": "application/msgpack, */*"}
+        )
+        assert response.headers["Content-Type"].startswith("application/msgpack")
+        assert "Accept" in response.headers["Vary"]
+
+    def test_json_remains_default(self, session_with_rounds):
+        """Without an Accept header the API should keep returning JSON"""
+        response = requests.get(f"{BASE_URL}/api/sessions/{session_with_rounds['id']}")
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("application/json")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
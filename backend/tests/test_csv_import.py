@@ -0,0 +1,197 @@
+"""
+Backend tests for the streaming CSV import
+Tests POST /api/import/csv with the test_import.csv layout, validation and deduplication
+"""
+import pytest
+import requests
+import os
+import time
+import uuid
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://range-keeper-1.preview.emergentagent.com')
+
+TEST_IMPORT_CSV = """Date,Name,BowType,TotalScore
+2/24/2026,John Smith,Recurve,285
+2/24/2026,Jane Doe,Compound,310
+2/25/2026,Bob Wilson,Barebow,245
+"""
+
+
+@pytest.fixture
+def owner():
+    """An owner no other test uses, with their sessions and bows removed afterwards"""
+    headers = {"X-Owner-Id": f"test-{uuid.uuid4().hex[:8]}"}
+    yield headers
+    for session in requests.get(f"{BASE_URL}/api/sessions", headers=headers).json():
+        requests.delete(f"{BASE_URL}/api/sessions/{session['id']}", headers=headers)
+    for bow in requests.get(f"{BASE_URL}/api/bows", headers=headers).json():
+        requests.delete(f"{BASE_URL}/api/bows/{bow['id']}", headers=headers)
+
+
+def import_csv(body, headers):
+    return requests.post(
+        f"{BASE_URL}/api/import/csv",
+        data=body,
+        headers={**headers, "Content-Type": "text/csv"},
+        timeout=120
+    )
+
+
+def chunked(text, size=64):
+    """A streamed (chunked transfer) request body"""
+    data = text.encode()
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+class TestCsvImport:
+    """Test /api/import/csv"""
+
+    def test_import_test_csv(self, owner):
+        """The repo's test_import.csv layout should create one session per row"""
+        response = import_csv(TEST_IMPORT_CSV, owner)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["rows"] == 3
+        assert data["imported"] == 3
+        assert data["duplicates"] == 0
+        assert data["invalid"] == 0
+        assert sorted(data["bows_created"]) == ["Barebow", "Compound", "Recurve"]
+
+        sessions = {s["name"]: s for s in requests.get(f"{BASE_URL}/api/sessions", headers=owner).json()}
+        assert set(sessions) == {"John Smith", "Jane Doe", "Bob Wilson"}
+        assert sessions["Jane Doe"]["total_score"] == 310
+        assert sessions["Jane Doe"]["created_at"].startswith("2026-02-24")
+        assert sessions["Jane Doe"]["bow_name"] == "Compound"
+
+    def test_reimport_is_deduplicated(self, owner):
+        """Uploading the same file twice should import nothing the second time"""
+        import_csv(TEST_IMPORT_CSV, owner)
+        data = import_csv(TEST_IMPORT_CSV, owner).json()
+        assert data["imported"] == 0
+        assert data["duplicates"] == 3
+        assert data["bows_created"] == []
+        assert len(requests.get(f"{BASE_URL}/api/sessions", headers=owner).json()) == 3
+
+    def test_duplicate_rows_within_file(self, owner):
+        """Rows repeating an earlier row's date, name and score should be skipped"""
+        body = TEST_IMPORT_CSV + "2026-02-24,John Smith,Recurve,285\n"
+        data = import_csv(body, owner).json()
+        assert data["imported"] == 3
+        assert data["duplicates"] == 1
+
+    def test_export_reimports_as_duplicates(self, owner):
+        """A session-level export should be recognized as already imported"""
+        import_csv(TEST_IMPORT_CSV, owner)
+        exported = requests.get(f"{BASE_URL}/api/export?format=csv", headers=owner).content
+        data = import_csv(exported, owner).json()
+        assert data["rows"] == 3
+        assert data["duplicates"] == 3
+        assert data["imported"] == 0
+
+    def test_invalid_rows_are_reported(self, owner):
+        """Bad dates, scores and bow types should be skipped and reported by line"""
+        body = (
+            "Date,Name,BowType,TotalScore\n"
+            "2/30/2026,Bad Date,Recurve,280\n"
+            "3/1/2026,Zero Score,Recurve,0\n"
+            "3/2/2026,\"Quoted, Name\",Crossbow,12\n"
+            "\n"
+            "3/3/2026,Good Row,,199\n"
+        )
+        data = import_csv(body, owner).json()
+        assert data["rows"] == 4
+        assert data["imported"] == 1
+        assert data["invalid"] == 3
+        errors = {e["line"]: e["error"] for e in data["errors"]}
+        assert "invalid date" in errors[2]
+        assert "positive integer" in errors[3]
+        assert "unknown bow type" in errors[4]
+
+        sessions = requests.get(f"{BASE_URL}/api/sessions", headers=owner).json()
+        assert [s["name"] for s in sessions] == ["Good Row"]
+        assert sessions[0]["bow_id"] is None
+
+    def test_streamed_upload_in_chunks(self, owner):
+        """A chunked upload spanning several validation batches should be read and deduplicated throughout"""
+        rows, distinct = 12000, 40
+
+        def body():
+            content = "Date,Name,BowType,TotalScore\n" + "".join(
+                f"{1 + k % 12}/{1 + k % 28}/2025,Streamed Archer {k},Recurve,{100 + k}\n"
+                for k in (i % distinct for i in range(rows))
+            )
+            data = content.encode()
+            # Fixed-size chunks end mid-line, so records are reassembled across chunk boundaries
+            for start in range(0, len(data), 4096):
+                yield data[start:start + 4096]
+
+        data = import_csv(body(), owner).json()
+        assert data["rows"] == rows
+        assert data["imported"] == distinct
+        assert data["duplicates"] == rows - distinct
+        assert data["bows_created"] == ["Recurve"]
+
+    def test_stray_quote_in_unquoted_field(self, owner):
+        """A quote inside an unquoted value should not swallow the following lines"""
+        body = "Date,Name,BowType,TotalScore\n" + "".join(
+            f"3/{day}/2026,Archer 6'2\" tall,Recurve,{200 + day}\n" for day in range(1, 21)
+        )
+        data = import_csv(chunked(body, 16), owner).json()
+        assert data["rows"] == 20
+        assert data["imported"] == 20
+        sessions = requests.get(f"{BASE_URL}/api/sessions", headers=owner).json()
+        assert {s["name"] for s in sessions} == {"Archer 6'2\" tall"}
+
+    def test_imported_totals_survive_rescore(self, owner):
+        """Score-only rounds should keep their total when sessions are rescored"""
+        import_csv(TEST_IMPORT_CSV, owner)
+        session_ids = {s["id"] for s in requests.get(f"{BASE_URL}/api/sessions", headers=owner).json()}
+        job = requests.post(f"{BASE_URL}/api/jobs/rescore", json={"dry_run": True}, headers=owner).json()
+        deadline = time.time() + 60
+        while job["status"] in ("pending", "running") and time.time() < deadline:
+            time.sleep(0.2)
+            job = requests.get(f"{BASE_URL}/api/jobs/{job['id']}", headers=owner).json()
+        assert job["status"] == "completed"
+        assert job["counters"]["scanned"] == len(session_ids)
+        assert not [d for d in job["diff"] if d["session_id"] in session_ids]
+
+    def test_imported_totals_reach_rollups(self, owner):
+        """Score-only rounds should add their totals to session scores, not to arrow statistics"""
+        import_csv(TEST_IMPORT_CSV, owner)
+        response = requests.get(f"{BASE_URL}/api/rollups", params={"year": 2026, "granularity": "month"}, headers=owner)
+        bucket = response.json()["periods"]["2026-02"]
+        assert bucket["sessions"] == 3
+        assert bucket["score"] == 285 + 310 + 245
+        assert bucket["session_mean"] == 280.0
+        assert bucket["ends"] == 0
+        assert bucket["count"] == 0
+
+    def test_retry_with_idempotency_key_replays_summary(self, owner):
+        """A retried upload with the same key should get the first summary back"""
+        headers = {**owner, "Idempotency-Key": str(uuid.uuid4())}
+        first = import_csv(chunked(TEST_IMPORT_CSV), headers)
+        retry = import_csv(chunked(TEST_IMPORT_CSV), headers)
+        assert first.status_code == 200
+        assert retry.status_code == 200
+        assert retry.headers.get("Idempotent-Replayed") == "true"
+        assert retry.json() == first.json()
+        assert retry.json()["imported"] == 3
+        assert len(requests.get(f"{BASE_URL}/api/sessions", headers=owner).json()) == 3
+
+    def test_idempotency_key_reused_with_other_file(self, owner):
+        """Reusing a key for a different upload should return 422"""
+        headers = {**owner, "Idempotency-Key": str(uuid.uuid4())}
+        import_csv(chunked(TEST_IMPORT_CSV), headers)
+        other = TEST_IMPORT_CSV + "2/26/2026,Ann Lee,Longbow,198\n"
+        assert import_csv(chunked(other), headers).status_code == 422
+        assert len(requests.get(f"{BASE_URL}/api/sessions", headers=owner).json()) == 3
+
+    def test_missing_columns(self, owner):
+        response = import_csv("Date,Archer\n2/24/2026,John Smith\n", owner)
+        assert response.status_code == 400
+        assert "score" in response.json()["detail"]
+
+    def test_empty_upload(self, owner):
+        response = import_csv("", owner)
+        assert response.status_code == 400
@@ -0,0 +1,61 @@
+"""
+Backend tests for the streaming session export
+Tests the /api/export endpoint in CSV and NDJSON formats
+"""
+import pytest
+import requests
+import os
+import json
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://range-keeper-1.preview.emergentagent.com')
+
+
+@pytest.fixture
+def exported_session():
+    """Create a session with one scored round"""
+    session = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Export", "distance": "18m"}).json()
+    requests.post(
+        f"{BASE_URL}/api/sessions/{session['id']}/rounds",
+        json={"round_number": 1, "shots": [{"x": 0.5, "y": 0.57, "ring": 9}] * 3}
+    )
+    yield session
+    requests.delete(f"{BASE_URL}/api/sessions/{session['id']}")
+
+
+class TestExportEndpoint:
+    """Test /api/export streaming downloads"""
+
+    def test_csv_matches_import_layout(self, exported_session):
+        """Session-level CSV should start with the test_import.csv columns"""
+        response = requests.get(f"{BASE_URL}/api/export", params={"format": "csv"})
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/csv")
+        lines = response.text.splitlines()
+        assert lines[0].startswith("Date,Name,BowType,TotalScore")
+        row = next(line for line in lines if exported_session["id"] in line)
+        assert row.split(",")[1:4] == ["TEST_Export", "Unknown", "27"]
+
+    def test_csv_shot_detail(self, exported_session):
+        """Shot-level CSV should have one row per shot"""
+        response = requests.get(f"{BASE_URL}/api/export", params={"format": "csv", "detail": "shot"})
+        assert response.status_code == 200
+        rows = [line for line in response.text.splitlines() if exported_session["id"] in line]
+        assert len(rows) == 3
+
+    def test_ndjson_contains_full_sessions(self, exported_session):
+        """NDJSON should contain one full session document per line"""
+        response = requests.get(f"{BASE_URL}/api/export", params={"format": "ndjson"})
+        assert response.status_code == 200
+        sessions = [json.loads(line) for line in response.text.splitlines()]
+        session = next(s for s in sessions if s["id"] == exported_session["id"])
+        assert session["total_score"] == 27
+        assert len(session["rounds"][0]["shots"]) == 3
+
+    def test_unsupported_format(self):
+        """Unknown formats should return 400"""
+        response = requests.get(f"{BASE_URL}/api/export", params={"format": "xml"})
+        assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,75 @@
+"""
+Backend tests for Idempotency-Key handling
+Tests that retried creates with the same key are replayed instead of duplicated
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://range-keeper-1.preview.emergentagent.com')
+
+
+def key_header():
+    return {"Idempotency-Key": str(uuid.uuid4())}
+
+
+class TestIdempotency:
+    """Test replay of create_session, add_round and create_bow"""
+
+    def test_retried_session_create_is_replayed(self):
+        """The same key and body should return the first session, not a new one"""
+        headers = key_header()
+        first = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Idempotent"}, headers=headers)
+        retry = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Idempotent"}, headers=headers)
+        try:
+            assert first.status_code == 200
+            assert retry.status_code == 200
+            assert retry.json()["id"] == first.json()["id"]
+            assert retry.headers.get("Idempotent-Replayed") == "true"
+        finally:
+            requests.delete(f"{BASE_URL}/api/sessions/{first.json()['id']}")
+
+    def test_retried_round_is_added_once(self):
+        """Replaying add_round should not append a second round"""
+        session = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Idempotent Round"}).json()
+        try:
+            headers = key_header()
+            body = {"round_number": 1, "shots": [{"x": 0, "y": 0, "ring": 9}] * 3}
+            requests.post(f"{BASE_URL}/api/sessions/{session['id']}/rounds", json=body, headers=headers)
+            retry = requests.post(f"{BASE_URL}/api/sessions/{session['id']}/rounds", json=body, headers=headers)
+            assert len(retry.json()["rounds"]) == 1
+
+            stored = requests.get(f"{BASE_URL}/api/sessions/{session['id']}").json()
+            assert len(stored["rounds"]) == 1
+            assert stored["total_score"] == 27
+        finally:
+            requests.delete(f"{BASE_URL}/api/sessions/{session['id']}")
+
+    def test_keys_are_scoped_by_route(self):
+        """The same key on a different route should not replay"""
+        headers = key_header()
+        bow = requests.post(f"{BASE_URL}/api/bows", json={"name": "TEST_Idempotent Bow", "bow_type": "Recurve"}, headers=headers)
+        session = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Idempotent Scope"}, headers=headers)
+        try:
+            assert bow.status_code == 200
+            assert session.status_code == 200
+            assert "Idempotent-Replayed" not in session.headers
+            assert session.json()["id"] != bow.json()["id"]
+        finally:
+            requests.delete(f"{BASE_URL}/api/bows/{bow.json()['id']}")
+            requests.delete(f"{BASE_URL}/api/sessions/{session.json()['id']}")
+
+    def test_key_reused_with_different_body(self):
+        """Reusing a key for a different request should return 422"""
+        headers = key_header()
+        first = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Idempotent A"}, headers=headers)
+        try:
+            response = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Idempotent B"}, headers=headers)
+            assert response.status_code == 422
+        finally:
+            requests.delete(f"{BASE_URL}/api/sessions/{first.json()['id']}")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
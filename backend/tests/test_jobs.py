@@ -0,0 +1,194 @@
+"""
+Backend tests for background jobs
+Tests the /api/jobs endpoints with the rescore backfill
+"""
+import pytest
+import requests
+import os
+import time
+import uuid
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://range-keeper-1.preview.emergentagent.com')
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+
+def wait_for_job(job_id, timeout=60, headers=None):
+    """Poll a job until it leaves the running state"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = requests.get(f"{BASE_URL}/api/jobs/{job_id}", headers=headers).json()
+        if job["status"] not in ("pending", "running"):
+            return job
+        time.sleep(0.5)
+    pytest.fail(f"Job {job_id} did not finish in {timeout}s")
+
+
+class TestRescoreJob:
+    """Test /api/jobs/rescore diffs and writes"""
+
+    @pytest.fixture
+    def owner(self):
+        return {"X-Owner-Id": f"test-{uuid.uuid4().hex[:8]}"}
+
+    def test_dry_run_reports_sent_rings_as_kept(self, owner):
+        """A sent ring that disagrees with x/y should be reported but not applied"""
+        session = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Rescore"}, headers=owner).json()
+        try:
+            requests.post(
+                f"{BASE_URL}/api/sessions/{session['id']}/rounds",
+                json={"round_number": 1, "shots": [{"x": 0.5, "y": 0.5, "ring": 5}]}, headers=owner
+            )
+            response = requests.post(f"{BASE_URL}/api/jobs/rescore", json={"dry_run": True}, headers=owner)
+            assert response.status_code == 200
+            job = wait_for_job(response.json()["id"], headers=owner)
+            assert job["status"] == "completed"
+            assert job["counters"]["rings_kept"] == 1
+            assert not job["counters"].get("changed")
+
+            diff = next(d for d in job["diff"] if d["session_id"] == session["id"])
+            assert diff["rings"] == [{
+                "round_id": diff["rings"][0]["round_id"], "shot_id": diff["rings"][0]["shot_id"],
+                "old": 5, "new": 11, "computed": False,
+            }]
+            assert diff["total_score"] is None
+        finally:
+            requests.delete(f"{BASE_URL}/api/sessions/{session['id']}", headers=owner)
+
+    def test_write_keeps_sent_and_padded_rings(self, owner):
+        """A real run should not turn corrections or padded misses at the centre into X"""
+        session = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Rescore"}, headers=owner).json()
+        try:
+            stored = requests.post(
+                f"{BASE_URL}/api/sessions/{session['id']}/rounds",
+                json={"round_number": 1, "shots": [
+                    {"x": 0.5, "y": 0.5, "ring": 5},
+                    {"x": 0.5, "y": 0.5, "ring": 0},
+                    {"x": 0.5, "y": 0.5},
+                ]}, headers=owner
+            ).json()
+            assert [s["scored_from_position"] for s in stored["rounds"][0]["shots"]] == [False, False, True]
+
+            job = requests.post(f"{BASE_URL}/api/jobs/rescore", json={"dry_run": False}, headers=owner).json()
+            job = wait_for_job(job["id"], headers=owner)
+            assert job["status"] == "completed"
+            assert not job["counters"].get("rings_changed")
+
+            stored = requests.get(f"{BASE_URL}/api/sessions/{session['id']}", headers=owner).json()
+            assert [s["ring"] for s in stored["rounds"][0]["shots"]] == [5, 0, 11]
+            assert stored["total_score"] == 15
+        finally:
+            requests.delete(f"{BASE_URL}/api/sessions/{session['id']}", headers=owner)
+
+    def test_completed_job_cannot_resume(self):
+        """Resuming a completed job should return 409"""
+        job = requests.post(f"{BASE_URL}/api/jobs/rescore", json={"dry_run": True}).json()
+        wait_for_job(job["id"])
+        response = requests.post(f"{BASE_URL}/api/jobs/{job['id']}/resume")
+        assert response.status_code == 409
+
+    def test_unknown_job(self):
+        """Unknown job ids should return 404"""
+        response = requests.get(f"{BASE_URL}/api/jobs/does-not-exist")
+        assert response.status_code == 404
+
+
+class TestBowPropagation:
+    """Test that bow renames and deletes reach the bow's sessions"""
+
+    def test_rename_then_delete(self):
+        """Renaming should copy the name onto sessions; deleting should detach them"""
+        bow = requests.post(f"{BASE_URL}/api/bows", json={"name": "TEST_Old Name", "bow_type": "Recurve"}).json()
+        sessions = [
+            requests.post(
+                f"{BASE_URL}/api/sessions",
+                json={"name": f"TEST_Propagate {i}", "bow_id": bow["id"], "bow_name": "TEST_Old Name"}
+            ).json()
+            for i in range(3)
+        ]
+        try:
+            response = requests.put(f"{BASE_URL}/api/bows/{bow['id']}", json={"name": "TEST_New Name"})
+            assert response.status_code == 200
+            job = wait_for_job(response.json()["propagation_job_id"])
+            assert job["status"] == "completed"
+            assert job["counters"]["changed"] == 3
+            for session in sessions:
+                stored = requests.get(f"{BASE_URL}/api/sessions/{session['id']}").json()
+                assert stored["bow_name"] == "TEST_New Name"
+
+            response = requests.delete(f"{BASE_URL}/api/bows/{bow['id']}")
+            job = wait_for_job(response.json()["propagation_job_id"])
+            assert job["status"] == "completed"
+            for session in sessions:
+                stored = requests.get(f"{BASE_URL}/api/sessions/{session['id']}").json()
+                assert stored["bow_id"] is None
+                assert stored["bow_name"] == "TEST_New Name"
+        finally:
+            for session in sessions:
+                requests.delete(f"{BASE_URL}/api/sessions/{session['id']}")
+
+    def test_update_without_rename_starts_no_job(self):
+        """Changing fields that sessions do not copy should not start a job"""
+        bow = requests.post(f"{BASE_URL}/api/bows", json={"name": "TEST_Same", "bow_type": "Recurve"}).json()
+        try:
+            response = requests.put(f"{BASE_URL}/api/bows/{bow['id']}", json={"name": "TEST_Same", "notes": "new string"})
+            assert response.status_code == 200
+            assert "propagation_job_id" not in response.json()
+        finally:
+            requests.delete(f"{BASE_URL}/api/bows/{bow['id']}")
+
+
+class TestJobOwnership:
+    """Test that jobs are scoped to the owner that started them"""
+
+    @pytest.fixture
+    def owners(self):
+        return ({"X-Owner-Id": f"test-{uuid.uuid4().hex[:8]}"}, {"X-Owner-Id": f"test-{uuid.uuid4().hex[:8]}"})
+
+    def test_rescore_covers_only_own_sessions(self, owners):
+        """An owner's rescore should not scan another owner's sessions"""
+        alice, bob = owners
+        session = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Rescore Alice"}, headers=alice).json()
+        try:
+            job = requests.post(f"{BASE_URL}/api/jobs/rescore", json={"dry_run": True}, headers=bob).json()
+            assert job["owner_id"] == bob["X-Owner-Id"]
+            job = wait_for_job(job["id"], headers=bob)
+            assert job["status"] == "completed"
+            assert job["counters"].get("scanned", 0) == 0
+            assert not job.get("diff")
+        finally:
+            requests.delete(f"{BASE_URL}/api/sessions/{session['id']}", headers=alice)
+
+    def test_other_owner_cannot_see_job(self, owners):
+        """Reading, resuming or cancelling another owner's job should return 404"""
+        alice, bob = owners
+        job = requests.post(f"{BASE_URL}/api/jobs/rescore", json={"dry_run": True}, headers=alice).json()
+        assert requests.get(f"{BASE_URL}/api/jobs/{job['id']}", headers=bob).status_code == 404
+        assert requests.post(f"{BASE_URL}/api/jobs/{job['id']}/resume", headers=bob).status_code == 404
+        assert requests.post(f"{BASE_URL}/api/jobs/{job['id']}/cancel", headers=bob).status_code == 404
+        assert wait_for_job(job["id"], headers=alice)["status"] == "completed"
+
+    def test_all_owner_jobs_need_admin_token(self, owners):
+        """Jobs spanning every owner should be refused without the admin token"""
+        alice, _ = owners
+        assert requests.post(f"{BASE_URL}/api/jobs/rescore", json={"all_owners": True, "dry_run": False}, headers=alice).status_code == 403
+        assert requests.post(f"{BASE_URL}/api/jobs/rollups", json={"all_owners": True}, headers=alice).status_code == 403
+        assert requests.post(f"{BASE_URL}/api/jobs/assign-owner", json={}, headers=alice).status_code == 403
+        wrong_token = dict(alice, **{"X-Admin-Token": "not-the-token"})
+        assert requests.post(f"{BASE_URL}/api/jobs/assign-owner", json={}, headers=wrong_token).status_code == 403
+
+    @pytest.mark.skipif(not ADMIN_TOKEN, reason="ADMIN_TOKEN not set")
+    def test_admin_runs_all_owner_jobs(self, owners):
+        """An all-owner job should be readable with the admin token only"""
+        alice, _ = owners
+        admin = {"X-Admin-Token": ADMIN_TOKEN}
+        response = requests.post(f"{BASE_URL}/api/jobs/rescore", json={"all_owners": True, "dry_run": True}, headers=admin)
+        assert response.status_code == 200
+        job = response.json()
+        assert job["owner_id"] is None
+        assert wait_for_job(job["id"], headers=admin)["status"] == "completed"
+        assert requests.get(f"{BASE_URL}/api/jobs/{job['id']}", headers=alice).status_code == 404
+        assert requests.get(f"{BASE_URL}/api/jobs/{job['id']}").status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,68 @@
+"""
+Backend tests for leaderboards and personal bests
+Tests the /api/leaderboard and /api/personal-bests endpoints
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://range-keeper-1.preview.emergentagent.com')
+
+
+@pytest.fixture
+def ranked_sessions():
+    """Three scored sessions at a distance no other test uses"""
+    distance = f"TEST_{uuid.uuid4().hex[:8]}"
+    created = []
+    for name, ring in (("TEST_Low", 6), ("TEST_High", 9), ("TEST_Mid", 8)):
+        session = requests.post(
+            f"{BASE_URL}/api/sessions",
+            json={"name": name, "distance": distance, "target_type": "wa_standard"}
+        ).json()
+        requests.post(
+            f"{BASE_URL}/api/sessions/{session['id']}/rounds",
+            json={"round_number": 1, "shots": [{"x": 0, "y": 0, "ring": ring}] * 3}
+        )
+        created.append(session)
+    yield distance, created
+    for session in created:
+        requests.delete(f"{BASE_URL}/api/sessions/{session['id']}")
+
+
+class TestLeaderboard:
+    """Test /api/leaderboard ranking"""
+
+    def test_top_sessions_in_score_order(self, ranked_sessions):
+        """Leaderboard should list the bucket's best sessions first"""
+        distance, _ = ranked_sessions
+        response = requests.get(
+            f"{BASE_URL}/api/leaderboard",
+            params={"distance": distance, "bow_type": "Unknown", "limit": 2}
+        )
+        assert response.status_code == 200
+        entries = response.json()
+        assert [e["name"] for e in entries] == ["TEST_High", "TEST_Mid"]
+        assert [e["rank"] for e in entries] == [1, 2]
+
+    def test_delete_promotes_next_session(self, ranked_sessions):
+        """Deleting the best session should move the next one to rank 1"""
+        distance, created = ranked_sessions
+        requests.delete(f"{BASE_URL}/api/sessions/{created[1]['id']}")
+        entries = requests.get(
+            f"{BASE_URL}/api/leaderboard",
+            params={"distance": distance, "bow_type": "Unknown"}
+        ).json()
+        assert [e["name"] for e in entries] == ["TEST_Mid", "TEST_Low"]
+
+    def test_personal_best_per_bucket(self, ranked_sessions):
+        """Personal bests should contain the best session of the bucket"""
+        distance, _ = ranked_sessions
+        response = requests.get(f"{BASE_URL}/api/personal-bests")
+        assert response.status_code == 200
+        best = [e for e in response.json() if e["distance"] == distance]
+        assert [e["name"] for e in best] == ["TEST_High"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
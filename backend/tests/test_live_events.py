@@ -0,0 +1,70 @@
+"""
+Backend tests for live scoring events
+Tests the /api/sessions/{id}/events server-sent event stream
+"""
+import pytest
+import requests
+import os
+import json
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://range-keeper-1.preview.emergentagent.com')
+
+
+def read_events(lines, count):
+    """Read `count` server-sent events as (type, data) pairs, skipping keepalives"""
+    events = []
+    event_type = None
+    for line in lines:
+        if line.startswith("event: "):
+            event_type = line[len("event: "):]
+        elif line.startswith("data: "):
+            events.append((event_type, json.loads(line[len("data: "):])))
+            if len(events) == count:
+                return events
+    return events
+
+
+class TestLiveEvents:
+    """Test that round writes are pushed to session subscribers"""
+
+    def test_rounds_are_pushed(self):
+        """Subscribers should get a snapshot, then only the ends that change"""
+        session = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Live"}).json()
+        stream = requests.get(f"{BASE_URL}/api/sessions/{session['id']}/events", stream=True, timeout=10)
+        try:
+            assert stream.status_code == 200
+            assert stream.headers["content-type"].startswith("text/event-stream")
+            lines = stream.iter_lines(decode_unicode=True)
+            [(event_type, snapshot)] = read_events(lines, 1)
+            assert event_type == "snapshot"
+            assert snapshot["session"]["id"] == session["id"]
+
+            added = requests.post(
+                f"{BASE_URL}/api/sessions/{session['id']}/rounds",
+                json={"round_number": 1, "shots": [{"x": 0, "y": 0, "ring": 8}] * 3}
+            ).json()
+            round_id = added["rounds"][0]["id"]
+            requests.put(
+                f"{BASE_URL}/api/sessions/{session['id']}/rounds/{round_id}",
+                json={"shots": [{"x": 0, "y": 0, "ring": 10}] * 3}
+            )
+            requests.delete(f"{BASE_URL}/api/sessions/{session['id']}")
+
+            events = read_events(lines, 3)
+            assert [e[0] for e in events] == ["round_added", "round_updated", "session_deleted"]
+            assert events[0][1]["round"]["id"] == round_id
+            assert events[0][1]["total_score"] == 24
+            assert events[1][1]["round"]["total_score"] == 30
+            assert "rounds" not in events[1][1]
+        finally:
+            stream.close()
+            requests.delete(f"{BASE_URL}/api/sessions/{session['id']}")
+
+    def test_unknown_session(self):
+        """Subscribing to a missing session should return 404"""
+        response = requests.get(f"{BASE_URL}/api/sessions/does-not-exist/events", timeout=10)
+        assert response.status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
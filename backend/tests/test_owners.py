@@ -0,0 +1,92 @@
+"""
+Backend tests for owner scoping
+Tests that the X-Owner-Id header partitions sessions, bows and derived data
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://range-keeper-1.preview.emergentagent.com')
+
+
+@pytest.fixture
+def owners():
+    """Two owners no other test uses"""
+    return ({"X-Owner-Id": f"test-{uuid.uuid4().hex[:8]}"}, {"X-Owner-Id": f"test-{uuid.uuid4().hex[:8]}"})
+
+
+@pytest.fixture
+def owned_session(owners):
+    """A scored session of the first owner"""
+    alice, _ = owners
+    session = requests.post(
+        f"{BASE_URL}/api/sessions",
+        json={"name": "TEST_Owned", "distance": "18m"},
+        headers=alice
+    ).json()
+    requests.post(
+        f"{BASE_URL}/api/sessions/{session['id']}/rounds",
+        json={"round_number": 1, "shots": [{"x": 0, "y": 0, "ring": 9}] * 3},
+        headers=alice
+    )
+    yield session
+    requests.delete(f"{BASE_URL}/api/sessions/{session['id']}", headers=alice)
+
+
+class TestOwnerScoping:
+    """Test that one owner cannot see or change another owner's data"""
+
+    def test_session_is_stamped_with_owner(self, owners, owned_session):
+        """Created sessions should carry the request's owner"""
+        assert owned_session["owner_id"] == owners[0]["X-Owner-Id"]
+
+    def test_lists_are_per_owner(self, owners, owned_session):
+        """Only the owner's list should contain the session"""
+        alice, bob = owners
+        alice_ids = [s["id"] for s in requests.get(f"{BASE_URL}/api/sessions", headers=alice).json()]
+        bob_ids = [s["id"] for s in requests.get(f"{BASE_URL}/api/sessions", headers=bob).json()]
+        assert alice_ids == [owned_session["id"]]
+        assert bob_ids == []
+
+    def test_other_owner_gets_404(self, owners, owned_session):
+        """Reads and writes by another owner should behave as if the session did not exist"""
+        _, bob = owners
+        session_url = f"{BASE_URL}/api/sessions/{owned_session['id']}"
+        assert requests.get(session_url, headers=bob).status_code == 404
+        assert requests.put(session_url, json={"name": "Taken"}, headers=bob).status_code == 404
+        assert requests.delete(session_url, headers=bob).status_code == 404
+
+    def test_derived_data_is_per_owner(self, owners, owned_session):
+        """Sync, search and personal bests should only show the owner's session"""
+        alice, bob = owners
+        assert [s["id"] for s in requests.get(f"{BASE_URL}/api/sync", headers=alice).json()["sessions"]] == [owned_session["id"]]
+        assert requests.get(f"{BASE_URL}/api/sync", headers=bob).json()["sessions"] == []
+
+        assert len(requests.get(f"{BASE_URL}/api/search", params={"q": "owned"}, headers=alice).json()) == 1
+        assert requests.get(f"{BASE_URL}/api/search", params={"q": "owned"}, headers=bob).json() == []
+
+        assert [e["id"] for e in requests.get(f"{BASE_URL}/api/personal-bests", headers=alice).json()] == [owned_session["id"]]
+        assert requests.get(f"{BASE_URL}/api/personal-bests", headers=bob).json() == []
+
+    def test_idempotency_keys_are_per_owner(self, owners):
+        """The same Idempotency-Key from two owners should create two sessions"""
+        key = str(uuid.uuid4())
+        created = [
+            requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Key"}, headers=dict(owner, **{"Idempotency-Key": key})).json()
+            for owner in owners
+        ]
+        try:
+            assert created[0]["id"] != created[1]["id"]
+        finally:
+            for owner, session in zip(owners, created):
+                requests.delete(f"{BASE_URL}/api/sessions/{session['id']}", headers=owner)
+
+    def test_invalid_owner_header(self):
+        """Owner ids with separators or spaces should return 400"""
+        response = requests.get(f"{BASE_URL}/api/sessions", headers={"X-Owner-Id": "a/b c"})
+        assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -149,6 +149,73 @@ class TestExtractQRWithValidPDF:
         assert session["bowType"] == "Compound"
         assert session["distance"] == "50m"
 
+    def _extract(self, pdf_bytes):
+        response = requests.post(
+            f"{BASE_URL}/api/extract-qr",
+            json={"pdfs_base64": [base64.b64encode(pdf_bytes).decode('utf-8')]},
+            headers={"Content-Type": "application/json"},
+            timeout=60
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    def _qr_matrix(self, name):
+        import json
+        import qrcode
+
+        qr = qrcode.QRCode(border=4)
+        qr.add_data(json.dumps({"v": 1, "t": "arrow_tracker", "n": name, "s": 512,
+                                "b": "Recurve", "d": "70m", "dt": "2/14/2026"}))
+        qr.make(fit=True)
+        return qr.get_matrix()
+
+    def test_extract_qr_from_faded_rotated_scan(self):
+        """A rotated, low-contrast scanned code should still be decoded"""
+        try:
+            import cv2
+            import fitz  # PyMuPDF
+            import numpy as np
+        except ImportError:
+            pytest.skip("PyMuPDF/OpenCV not available for test PDF generation")
+
+        modules = np.where(np.array(self._qr_matrix("Faded Scan Archer")), 0, 255).astype(np.uint8)
+        image = cv2.resize(modules, (400, 400), interpolation=cv2.INTER_NEAREST)
+        image = cv2.copyMakeBorder(image, 100, 100, 100, 100, cv2.BORDER_CONSTANT, value=255)
+        matrix = cv2.getRotationMatrix2D((300, 300), 30, 1.0)
+        image = cv2.warpAffine(image, matrix, (600, 600), borderValue=255)
+        image = (255 - (255 - image.astype(np.float32)) * 0.4).astype(np.uint8)
+
+        doc = fitz.open()
+        page = doc.new_page(width=612, height=792)
+        page.insert_image(fitz.Rect(50, 50, 250, 250), stream=cv2.imencode('.png', image)[1].tobytes())
+        data = self._extract(doc.tobytes())
+        doc.close()
+
+        assert data.get("total_qr_found") == 1
+        assert [s["name"] for s in data["sessions"]] == ["Faded Scan Archer"]
+
+    def test_extract_qr_drawn_as_vectors(self):
+        """A code drawn as vector shapes, with no embedded image, is found from the page render"""
+        try:
+            import fitz  # PyMuPDF
+        except ImportError:
+            pytest.skip("PyMuPDF not available for test PDF generation")
+
+        doc = fitz.open()
+        page = doc.new_page(width=612, height=792)
+        cell = 4
+        for y, row in enumerate(self._qr_matrix("Vector Archer")):
+            for x, dark in enumerate(row):
+                if dark:
+                    page.draw_rect(fitz.Rect(50 + x * cell, 50 + y * cell, 50 + (x + 1) * cell, 50 + (y + 1) * cell),
+                                   color=None, fill=(0, 0, 0))
+        data = self._extract(doc.tobytes())
+        doc.close()
+
+        assert data.get("total_qr_found") == 1
+        assert data["sessions"][0]["name"] == "Vector Archer"
+        assert data["sessions"][0]["score"] == 512
+
 
 class TestRootEndpoint:
     """Test root API endpoint"""
@@ -0,0 +1,142 @@
+"""
+Backend tests for server-side scorecard reports
+Tests GET /api/sessions/{id}/report, the report cache and POST /api/reports batches
+"""
+import base64
+import io
+import os
+import uuid
+import zipfile
+
+import pytest
+import requests
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://range-keeper-1.preview.emergentagent.com')
+
+
+@pytest.fixture
+def owner():
+    return {"X-Owner-Id": f"test-{uuid.uuid4().hex[:8]}"}
+
+
+@pytest.fixture
+def scored_session(owner):
+    """A session with a compound bow and two rounds"""
+    bow = requests.post(
+        f"{BASE_URL}/api/bows",
+        json={"name": "TEST_Report Bow", "bow_type": "Compound"},
+        headers=owner
+    ).json()
+    session = requests.post(
+        f"{BASE_URL}/api/sessions",
+        json={"name": "TEST_Report", "distance": "50m", "bow_id": bow["id"], "bow_name": bow["name"]},
+        headers=owner
+    ).json()
+    for round_number in (1, 2):
+        requests.post(
+            f"{BASE_URL}/api/sessions/{session['id']}/rounds",
+            json={"round_number": round_number, "shots": [{"x": 0.5, "y": 0.53, "ring": 10}, {"x": 0.5, "y": 0.67, "ring": 7}]},
+            headers=owner
+        )
+    yield session
+    requests.delete(f"{BASE_URL}/api/sessions/{session['id']}", headers=owner)
+    requests.delete(f"{BASE_URL}/api/bows/{bow['id']}", headers=owner)
+
+
+class TestSessionReport:
+    """Test GET /api/sessions/{id}/report"""
+
+    def test_report_is_a_pdf(self, owner, scored_session):
+        """The report should be served inline as a PDF"""
+        response = requests.get(f"{BASE_URL}/api/sessions/{scored_session['id']}/report", headers=owner, timeout=60)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/pdf"
+        assert response.headers["content-disposition"].startswith("inline")
+        assert response.content.startswith(b"%PDF")
+
+    def test_report_qr_code_reimports(self, owner, scored_session):
+        """The report's QR code should be read back by /api/extract-qr"""
+        pdf = requests.get(f"{BASE_URL}/api/sessions/{scored_session['id']}/report", headers=owner, timeout=60).content
+        response = requests.post(
+            f"{BASE_URL}/api/extract-qr",
+            json={"pdfs_base64": [base64.b64encode(pdf).decode('utf-8')]},
+            timeout=60
+        )
+        data = response.json()
+        assert data["success"] == True
+        assert len(data["sessions"]) == 1
+        extracted = data["sessions"][0]
+        assert extracted["name"] == "TEST_Report"
+        assert extracted["score"] == 34
+        assert extracted["bowType"] == "Compound"
+        assert extracted["distance"] == "50m"
+
+    def test_report_is_cached_until_session_changes(self, owner, scored_session):
+        """A second request should hit the cache; a new round should render again"""
+        url = f"{BASE_URL}/api/sessions/{scored_session['id']}/report"
+        first = requests.get(url, headers=owner, timeout=60)
+        second = requests.get(url, headers=owner, timeout=60)
+        assert first.headers["x-report-cache"] == "miss"
+        assert second.headers["x-report-cache"] == "hit"
+        assert second.content == first.content
+
+        requests.post(
+            f"{BASE_URL}/api/sessions/{scored_session['id']}/rounds",
+            json={"round_number": 3, "shots": [{"x": 0.5, "y": 0.57, "ring": 9}]},
+            headers=owner
+        )
+        third = requests.get(url, headers=owner, timeout=60)
+        assert third.headers["x-report-cache"] == "miss"
+
+    def test_report_of_other_owner_not_found(self, scored_session):
+        """Another owner's session should not be reported"""
+        response = requests.get(
+            f"{BASE_URL}/api/sessions/{scored_session['id']}/report",
+            headers={"X-Owner-Id": f"test-{uuid.uuid4().hex[:8]}"}
+        )
+        assert response.status_code == 404
+
+    def test_report_missing_session(self, owner):
+        response = requests.get(f"{BASE_URL}/api/sessions/{uuid.uuid4()}/report", headers=owner)
+        assert response.status_code == 404
+
+
+class TestBatchReports:
+    """Test POST /api/reports"""
+
+    def test_batch_returns_zip_of_reports(self, owner, scored_session):
+        """Each requested session should have a PDF in the archive"""
+        other = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Report Empty"}, headers=owner).json()
+        try:
+            response = requests.post(
+                f"{BASE_URL}/api/reports",
+                json={"session_ids": [scored_session["id"], other["id"], scored_session["id"]]},
+                headers=owner,
+                timeout=120
+            )
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "application/zip"
+            with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+                names = zf.namelist()
+                assert names == [f"arrow_tracker_report_{scored_session['id']}.pdf", f"arrow_tracker_report_{other['id']}.pdf"]
+                assert all(zf.read(name).startswith(b"%PDF") for name in names)
+        finally:
+            requests.delete(f"{BASE_URL}/api/sessions/{other['id']}", headers=owner)
+
+    def test_batch_rejects_unknown_session(self, owner, scored_session):
+        response = requests.post(
+            f"{BASE_URL}/api/reports",
+            json={"session_ids": [scored_session["id"], str(uuid.uuid4())]},
+            headers=owner
+        )
+        assert response.status_code == 404
+
+    def test_batch_rejects_empty_request(self, owner):
+        response = requests.post(f"{BASE_URL}/api/reports", json={"session_ids": []}, headers=owner)
+        assert response.status_code == 400
+
+    def test_report_stats(self):
+        response = requests.get(f"{BASE_URL}/api/reports/stats")
+        assert response.status_code == 200
+        data = response.json()
+        assert {"hits", "misses", "cached", "workers"} <= set(data)
@@ -0,0 +1,96 @@
+"""
+Backend tests for progress chart rollups
+Tests the /api/rollups endpoint as rounds are added, edited and deleted
+"""
+import pytest
+import requests
+import os
+import uuid
+from datetime import datetime
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://range-keeper-1.preview.emergentagent.com')
+
+
+@pytest.fixture
+def distance():
+    """A distance label no other session uses, so rollups start empty"""
+    return f"TEST_{uuid.uuid4().hex[:8]}"
+
+
+def month_rollup(distance):
+    now = datetime.utcnow()
+    response = requests.get(
+        f"{BASE_URL}/api/rollups",
+        params={"year": now.year, "granularity": "month", "distance": distance}
+    )
+    assert response.status_code == 200
+    return response.json()["periods"].get(now.strftime("%Y-%m"))
+
+
+class TestRollups:
+    """Test incremental rollup maintenance"""
+
+    def test_rollups_follow_round_writes(self, distance):
+        """Adding, editing and deleting rounds should keep the month bucket exact"""
+        session = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Rollup", "distance": distance}).json()
+        round_data = requests.post(
+            f"{BASE_URL}/api/sessions/{session['id']}/rounds",
+            json={"round_number": 1, "shots": [{"x": 0, "y": 0, "ring": 11}, {"x": 0, "y": 0, "ring": 9}, {"x": 0, "y": 0, "ring": 7}]}
+        ).json()["rounds"][0]
+
+        bucket = month_rollup(distance)
+        assert bucket["sum"] == 26
+        assert bucket["count"] == 3
+        assert bucket["ends"] == 1
+        assert bucket["score"] == 26
+        assert bucket["session_mean"] == 26.0
+        assert bucket["hist"] == {"11": 1, "9": 1, "7": 1}
+
+        requests.put(
+            f"{BASE_URL}/api/sessions/{session['id']}/rounds/{round_data['id']}",
+            json={"shots": [{"x": 0, "y": 0, "ring": 8}] * 3}
+        )
+        bucket = month_rollup(distance)
+        assert bucket["sum"] == 24
+        assert bucket["sumsq"] == 192
+        assert bucket["mean"] == 8.0
+        assert bucket["hist"] == {"8": 3}
+
+        requests.delete(f"{BASE_URL}/api/sessions/{session['id']}")
+        assert month_rollup(distance) is None
+
+    def test_week_across_new_year(self, distance):
+        """A week running past New Year should be whole in the year of its Monday and absent from the next"""
+        sessions = []
+        try:
+            for created_at in ("2025-12-31T10:00:00", "2026-01-02T10:00:00"):
+                session = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Rollup", "distance": distance}).json()
+                sessions.append(session)
+                requests.post(
+                    f"{BASE_URL}/api/sessions/{session['id']}/rounds",
+                    json={"round_number": 1, "shots": [{"x": 0, "y": 0, "ring": 9}] * 3}
+                )
+                requests.put(f"{BASE_URL}/api/sessions/{session['id']}", json={"created_at": created_at})
+
+            def weeks(year):
+                return requests.get(
+                    f"{BASE_URL}/api/rollups",
+                    params={"year": year, "granularity": "week", "distance": distance}
+                ).json()["periods"]
+
+            week = weeks(2025)["2025-12-29"]
+            assert week["sessions"] == 2
+            assert week["count"] == 6
+            assert "2025-12-29" not in weeks(2026)
+        finally:
+            for session in sessions:
+                requests.delete(f"{BASE_URL}/api/sessions/{session['id']}")
+
+    def test_unsupported_granularity(self):
+        """Unknown granularities should return 400"""
+        response = requests.get(f"{BASE_URL}/api/rollups", params={"year": 2026, "granularity": "hour"})
+        assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,110 @@
+"""
+Backend tests for server-side scoring
+Tests the /api/score endpoint and ring computation in add_round
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://range-keeper-1.preview.emergentagent.com')
+
+# Target face radius in normalized image coordinates (see scoring.TARGET_RADIUS)
+RADIUS = 0.475
+
+
+def at(fraction):
+    """A shot straight below the centre at `fraction` of the face radius"""
+    return {"x": 0.5, "y": 0.5 + RADIUS * fraction}
+
+
+class TestScoreEndpoint:
+    """Test /api/score batch scoring"""
+
+    def test_wa_standard_rings(self):
+        """Shots on a WA face should score X, 10, 9 ... and miss outside the face"""
+        shots = [at(0.0), at(0.07), at(0.15), at(0.95), at(1.05)]
+        response = requests.post(f"{BASE_URL}/api/score", json={"target_type": "wa_standard", "shots": shots})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["rings"] == [11, 10, 9, 1, 0]
+        assert data["total_score"] == 30
+
+    def test_line_cutter_scores_higher_ring(self):
+        """A shot exactly on a line should score the higher ring"""
+        response = requests.post(f"{BASE_URL}/api/score", json={"target_type": "vegas_3spot", "shots": [at(0.4)]})
+        assert response.status_code == 200
+        assert response.json()["rings"] == [9]
+
+    def test_arrow_radius_widens_rings(self):
+        """A shaft overlapping the line should score the higher ring"""
+        response = requests.post(
+            f"{BASE_URL}/api/score",
+            json={"target_type": "wa_standard", "shots": [at(0.21)], "arrow_radius": 0.02}
+        )
+        assert response.status_code == 200
+        assert response.json()["rings"] == [9]
+
+    def test_arrow_radius_out_of_range(self):
+        """Negative or implausibly large arrow radii should be rejected"""
+        for arrow_radius in (-2, -0.01, 0.5):
+            response = requests.post(
+                f"{BASE_URL}/api/score",
+                json={"target_type": "wa_standard", "shots": [{"x": 0.99, "y": 0.99}], "arrow_radius": arrow_radius}
+            )
+            assert response.status_code == 422, arrow_radius
+
+    def test_unknown_target_type(self):
+        """Unknown target faces should return 400"""
+        response = requests.post(f"{BASE_URL}/api/score", json={"target_type": "bogus", "shots": []})
+        assert response.status_code == 400
+
+
+class TestRoundScoring:
+    """Test ring computation when rounds are added without rings"""
+
+    def test_add_round_scores_unringed_shots(self):
+        """Shots without a ring should be scored from x/y; sent rings are kept"""
+        session = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Scoring"}).json()
+        try:
+            response = requests.post(
+                f"{BASE_URL}/api/sessions/{session['id']}/rounds",
+                json={"round_number": 1, "shots": [at(0.0), at(0.15), {"x": 0, "y": 0, "ring": 7}]}
+            )
+            assert response.status_code == 200
+            data = response.json()
+            assert [shot["ring"] for shot in data["rounds"][0]["shots"]] == [11, 9, 7]
+            assert data["total_score"] == 26
+        finally:
+            requests.delete(f"{BASE_URL}/api/sessions/{session['id']}")
+
+    def test_add_round_keeps_sent_rings_with_positions(self):
+        """Corrected rings and padded misses sent with a position should be stored as sent"""
+        session = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Scoring"}).json()
+        try:
+            response = requests.post(
+                f"{BASE_URL}/api/sessions/{session['id']}/rounds",
+                json={"round_number": 1, "shots": [dict(at(0.0), ring=5), dict(at(0.95), ring=10), {"x": 0.5, "y": 0.5, "ring": 0}]}
+            )
+            assert response.status_code == 200
+            data = response.json()
+            assert [shot["ring"] for shot in data["rounds"][0]["shots"]] == [5, 10, 0]
+            assert data["total_score"] == 15
+        finally:
+            requests.delete(f"{BASE_URL}/api/sessions/{session['id']}")
+
+    def test_add_round_rejects_invalid_rings(self):
+        """Rings outside 0-11 should return 400; any ring in range is accepted on every face"""
+        session = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Scoring", "target_type": "vegas_3spot"}).json()
+        try:
+            url = f"{BASE_URL}/api/sessions/{session['id']}/rounds"
+            for ring in (99, 40000, -1, 12, 7.5, "10"):
+                response = requests.post(url, json={"round_number": 1, "shots": [{"x": 0, "y": 0, "ring": ring}]})
+                assert response.status_code == 400, ring
+            response = requests.post(url, json={"round_number": 1, "shots": [{"x": 0.5, "y": 0.5, "ring": 3}]})
+            assert response.status_code == 200
+            assert response.json()["rounds"][0]["shots"][0]["ring"] == 3
+        finally:
+            requests.delete(f"{BASE_URL}/api/sessions/{session['id']}")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
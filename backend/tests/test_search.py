@@ -0,0 +1,71 @@
+"""
+Backend tests for session and bow search
+Tests the /api/search and /api/search/autocomplete endpoints
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://range-keeper-1.preview.emergentagent.com')
+
+
+@pytest.fixture
+def tag():
+    """A unique word so results only contain documents created by the test"""
+    return f"zq{uuid.uuid4().hex[:8]}"
+
+
+class TestSearch:
+    """Test /api/search ranking and index maintenance"""
+
+    def test_search_sessions_by_name_prefix(self, tag):
+        """Every query word must match, and the last one may be a prefix"""
+        league = requests.post(f"{BASE_URL}/api/sessions", json={"name": f"Indoor 18m league {tag}"}).json()
+        practice = requests.post(f"{BASE_URL}/api/sessions", json={"name": f"Indoor practice {tag}"}).json()
+        try:
+            response = requests.get(f"{BASE_URL}/api/search", params={"q": f"{tag} indoor lea"})
+            assert response.status_code == 200
+            assert [r["id"] for r in response.json()] == [league["id"]]
+
+            results = requests.get(f"{BASE_URL}/api/search", params={"q": f"{tag} indoor"}).json()
+            assert {r["id"] for r in results} == {league["id"], practice["id"]}
+        finally:
+            requests.delete(f"{BASE_URL}/api/sessions/{league['id']}")
+            requests.delete(f"{BASE_URL}/api/sessions/{practice['id']}")
+
+    def test_bow_notes_are_searchable(self, tag):
+        """Bow notes should be indexed and removed with the bow"""
+        bow = requests.post(
+            f"{BASE_URL}/api/bows",
+            json={"name": "TEST_Search Bow", "bow_type": "Recurve", "notes": f"new limbs {tag}"}
+        ).json()
+        results = requests.get(f"{BASE_URL}/api/search", params={"q": f"limbs {tag}", "kind": "bow"}).json()
+        assert [r["id"] for r in results] == [bow["id"]]
+
+        requests.delete(f"{BASE_URL}/api/bows/{bow['id']}")
+        assert requests.get(f"{BASE_URL}/api/search", params={"q": tag}).json() == []
+
+    def test_renamed_session_is_reindexed(self, tag):
+        """Updating a session's name should replace its indexed words"""
+        session = requests.post(f"{BASE_URL}/api/sessions", json={"name": f"Before {tag}"}).json()
+        try:
+            requests.put(f"{BASE_URL}/api/sessions/{session['id']}", json={"name": f"After {tag}"})
+            assert requests.get(f"{BASE_URL}/api/search", params={"q": f"before {tag}"}).json() == []
+            assert len(requests.get(f"{BASE_URL}/api/search", params={"q": f"after {tag}"}).json()) == 1
+        finally:
+            requests.delete(f"{BASE_URL}/api/sessions/{session['id']}")
+
+    def test_autocomplete(self, tag):
+        """Autocomplete should suggest indexed words for a prefix"""
+        session = requests.post(f"{BASE_URL}/api/sessions", json={"name": f"League {tag}"}).json()
+        try:
+            response = requests.get(f"{BASE_URL}/api/search/autocomplete", params={"prefix": tag[:6]})
+            assert response.status_code == 200
+            assert {"term": tag, "count": 1} in response.json()
+        finally:
+            requests.delete(f"{BASE_URL}/api/sessions/{session['id']}")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
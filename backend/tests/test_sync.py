@@ -0,0 +1,80 @@
+"""
+Backend tests for the delta sync feed
+Tests the /api/sync endpoint with cursors and tombstones
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('EXPO_PUBLIC_BACKEND_URL', 'https://range-keeper-1.preview.emergentagent.com')
+
+
+def drain(cursor=None, limit=200):
+    """Follow the sync feed until has_more is false, returning all pages"""
+    pages = []
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["since"] = cursor
+        response = requests.get(f"{BASE_URL}/api/sync", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        pages.append(page)
+        cursor = page["cursor"]
+        if not page["has_more"]:
+            return pages, cursor
+
+
+class TestSyncEndpoint:
+    """Test /api/sync changes feed"""
+
+    def test_sync_response_structure(self):
+        """Sync should return sessions, bows, deletes and a cursor"""
+        response = requests.get(f"{BASE_URL}/api/sync", params={"limit": 1})
+        assert response.status_code == 200
+        data = response.json()
+        assert isinstance(data["sessions"], list)
+        assert isinstance(data["bows"], list)
+        assert set(data["deleted"].keys()) == {"sessions", "bows"}
+        assert "cursor" in data
+        assert isinstance(data["has_more"], bool)
+
+    def test_sync_returns_only_changes_since_cursor(self):
+        """After draining the feed only new changes and deletes should appear"""
+        _, cursor = drain()
+
+        session = requests.post(f"{BASE_URL}/api/sessions", json={"name": "TEST_Sync"}).json()
+        pages, cursor = drain(cursor)
+        synced_ids = [s["id"] for page in pages for s in page["sessions"]]
+        assert synced_ids == [session["id"]]
+
+        requests.delete(f"{BASE_URL}/api/sessions/{session['id']}")
+        pages, cursor = drain(cursor)
+        deleted_ids = [i for page in pages for i in page["deleted"]["sessions"]]
+        assert deleted_ids == [session["id"]]
+
+        pages, _ = drain(cursor)
+        assert pages[0]["sessions"] == [] and pages[0]["deleted"]["sessions"] == []
+
+    def test_sync_pages_do_not_skip_documents(self):
+        """Paging with a small limit should deliver every new session exactly once"""
+        _, cursor = drain()
+        created = [
+            requests.post(f"{BASE_URL}/api/sessions", json={"name": f"TEST_SyncPage_{i}"}).json()["id"]
+            for i in range(5)
+        ]
+        pages, _ = drain(cursor, limit=2)
+        synced_ids = [s["id"] for page in pages for s in page["sessions"]]
+        assert sorted(synced_ids) == sorted(created)
+
+        for session_id in created:
+            requests.delete(f"{BASE_URL}/api/sessions/{session_id}")
+
+    def test_sync_invalid_cursor(self):
+        """A malformed cursor should return 400"""
+        response = requests.get(f"{BASE_URL}/api/sync", params={"since": "not-a-cursor"})
+        assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,129 @@
+"""
+Write-behind buffer that coalesces rapid round edits into one session write.
+
+During live scoring update_round is called after every arrow correction.
+With a delay configured, the route leaves the updated session here instead
+of writing it; later edits replace the buffered copy, reads are served from
+it, and a flusher thread writes the latest state once the delay since the
+first buffered edit has passed. The delay is an upper bound: further edits
+never postpone a flush. Routes that change a session some other way flush
+(or discard) it first, and so do background jobs before they rewrite a
+page of sessions; reads of data derived from scores (leaderboards,
+rollups, sync, export) flush everything pending, and so does shutdown.
+
+The buffer is per process, which matches the single uvicorn worker in the
+Procfile; with several workers an edit could be buffered in one worker
+while another serves a stale read.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    def __init__(self, delay: float, persist: Callable[[Dict, Optional[Dict]], None]):
+        """`persist(session, previous)` writes a session; `previous` is its last persisted state"""
+        self.delay = delay
+        self.persist = persist
+        self.lock = threading.Condition()
+        self.pending: Dict[str, Dict] = {}
+        self.flushing: Dict[str, Dict] = {}
+        self.thread: Optional[threading.Thread] = None
+        self.stats = {'buffered': 0, 'flushed': 0, 'discarded': 0, 'failed': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.delay > 0
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        """The newest unpersisted state of a session, or None"""
+        with self.lock:
+            entry = self.pending.get(session_id) or self.flushing.get(session_id)
+            return dict(entry['session']) if entry else None
+
+    def put(self, session: Dict, previous: Dict):
+        """Buffer a session; `previous` is the state it was read in"""
+        with self.lock:
+            entry = self.pending.get(session['id'])
+            if entry is None:
+                in_flight = self.flushing.get(session['id'])
+                entry = self.pending[session['id']] = {
+                    'previous': in_flight['session'] if in_flight else previous,
+                    'due': time.monotonic() + self.delay,
+                }
+            entry['session'] = session
+            self.stats['buffered'] += 1
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self.thread.start()
+            self.lock.notify()
+
+    def flush(self, session_id: str) -> bool:
+        """Persist a session's buffered state now, waiting for an in-flight flush first
+
+        Returns whether the session was written (here or by the flush waited
+        for), so a caller holding an earlier read knows to read it again.
+        """
+        written = False
+        with self.lock:
+            while session_id in self.flushing:
+                written = True
+                self.lock.wait()
+            entry = self.pending.pop(session_id, None)
+            if entry is None:
+                return written
+            self.flushing[session_id] = entry
+        outcome = 'flushed'
+        try:
+            self.persist(entry['session'], entry['previous'])
+        except Exception as e:
+            outcome = 'failed'
+            logger.error(f"Write-behind flush of session {session_id} failed: {e}")
+        finally:
+            with self.lock:
+                self.stats[outcome] += 1
+                del self.flushing[session_id]
+                self.lock.notify_all()
+        return True
+
+    def discard(self, session_id: str):
+        """Drop a session's buffered state, e.g. because it is being deleted"""
+        with self.lock:
+            while session_id in self.flushing:
+                self.lock.wait()
+            if self.pending.pop(session_id, None) is not None:
+                self.stats['discarded'] += 1
+
+    def flush_all(self):
+        with self.lock:
+            session_ids = list(self.pending)
+        for session_id in session_ids:
+            self.flush(session_id)
+
+    def metrics(self) -> Dict:
+        with self.lock:
+            return dict(
+                self.stats,
+                enabled=self.enabled,
+                delay_ms=int(self.delay * 1000),
+                pending=len(self.pending),
+                writes_saved=self.stats['buffered'] - self.stats['flushed'] - self.stats['failed'] - len(self.pending) - len(self.flushing),
+            )
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while not self.pending:
+                    if not self.lock.wait(timeout=60):
+                        self.thread = None
+                        return
+                now = time.monotonic()
+                due = [session_id for session_id, entry in self.pending.items() if entry['due'] <= now]
+                if not due:
+                    self.lock.wait(timeout=min(entry['due'] for entry in self.pending.values()) - now)
+                    continue
+            for session_id in due:
+                self.flush(session_id)